@@ -0,0 +1,5 @@
+"""
+Evaluation and analysis scripts. They import each other as top-level
+modules; ``scripts.cli:main`` (the ``llm-health-eval`` command) puts this
+directory on ``sys.path`` first.
+"""
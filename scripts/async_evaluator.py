@@ -0,0 +1,211 @@
+"""
+Asynchronous, rate-limited evaluation engine for LLM judge calls.
+
+Replaces the one-prompt-at-a-time ``time.sleep(2)`` loop with a pool of
+concurrent requests that share a token-bucket rate limiter (requests per
+minute and tokens per minute) and retry 429/5xx errors with jittered
+exponential backoff.
+
+Point ``api_base`` at a local stub that mimics ``/v1/chat/completions`` to
+exercise the engine without spending API credits.
+"""
+
+import asyncio
+import os
+import random
+import time
+
+import openai
+from dotenv import load_dotenv
+
+from call_metrics import call_context, get_sink
+from llm_cache import CacheMissError, get_cache
+
+# Load environment variables
+load_dotenv()
+openai.api_key = os.getenv("OPENAI_API_KEY")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+
+class TokenBucket:
+    """Token bucket that refills continuously at ``rate_per_minute``"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        """Wait until ``amount`` tokens are available, then consume them"""
+        # A single request larger than the bucket could never be served
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """Combined requests-per-minute and tokens-per-minute budget"""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    async def acquire(self, token_count):
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(token_count)
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """Rough token estimate (~4 characters per token) for rate budgeting"""
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 4 * len(messages)
+    return prompt_tokens + (max_tokens or 0)
+
+
+def is_retryable(error):
+    """Return True for rate-limit, server-side and transient network errors"""
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    status = getattr(error, "http_status", None)
+    return status in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=60.0):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class AsyncEvaluator:
+    """Run chat-completion judge calls concurrently under a shared rate limit"""
+
+    def __init__(self, model="gpt-4", max_concurrency=8, requests_per_minute=500,
+                 tokens_per_minute=40000, max_retries=5, base_delay=1.0,
+                 max_delay=60.0, temperature=0, max_tokens=None,
+                 api_base=None, api_key=None, request_timeout=120, cache=None,
+                 system_prompt=None):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.api_base = api_base
+        self.api_key = api_key
+        self.request_timeout = request_timeout
+        self.cache = cache if cache is not None else get_cache()
+        # Sent ahead of every prompt so all requests share one cacheable prefix
+        self.system_prompt = system_prompt
+
+    async def _create(self, messages):
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "request_timeout": self.request_timeout,
+        }
+        if self.max_tokens is not None:
+            params["max_tokens"] = self.max_tokens
+        if self.api_base:
+            params["api_base"] = self.api_base
+        if self.api_key:
+            params["api_key"] = self.api_key
+        return await openai.ChatCompletion.acreate(**params)
+
+    def _record(self, messages, started, retries, response=None, error=None):
+        usage = (response or {}).get("usage") or {}
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        estimated = False
+        if response is not None and (prompt_tokens is None or completion_tokens is None):
+            prompt_tokens = estimate_tokens(messages)
+            completion_tokens = len(response.choices[0].message.content or "") // 4
+            estimated = True
+        get_sink().record(self.model, time.monotonic() - started, prompt_tokens, completion_tokens,
+                          retries=retries, provider="openai", error=str(error) if error else None,
+                          tokens_estimated=estimated, cached_tokens=cached_tokens)
+
+    async def complete(self, messages, semaphore, limiter):
+        """Send one chat completion, retrying transient failures"""
+        try:
+            key, cached = self.cache.lookup(self.model, messages, self.temperature, self.max_tokens)
+        except CacheMissError as e:
+            print(f"Error during evaluation: {e}")
+            return None
+        if cached is not None:
+            return cached
+
+        token_estimate = estimate_tokens(messages, self.max_tokens)
+        started = None
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                await limiter.acquire(token_estimate)
+                # Latency covers the first attempt through the last retry
+                started = started if started is not None else time.monotonic()
+                try:
+                    response = await self._create(messages)
+                    content = response.choices[0].message.content.strip()
+                    self._record(messages, started, attempt, response)
+                    self.cache.put(key, self.model, content)
+                    return content
+                except Exception as e:
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        self._record(messages, started, attempt, error=e)
+                        print(f"Error during evaluation: {e}")
+                        return None
+                    error = e
+            delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+            print(f"  Retrying in {delay:.1f}s after error: {error}")
+            await asyncio.sleep(delay)
+        return None
+
+    async def evaluate_many(self, prompts, on_result=None, contexts=None):
+        """
+        Evaluate all prompts concurrently; results keep the input order.
+
+        ``on_result(index, content)`` is called as each evaluation finishes
+        so callers can persist results incrementally. ``contexts[index]``
+        tags that prompt's call metrics (see ``call_metrics.call_context``).
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+
+        async def run_one(index, prompt):
+            # Each gathered task runs in its own copy of the context
+            with call_context(**(contexts[index] if contexts else {})):
+                messages = [{"role": "user", "content": prompt}]
+                if self.system_prompt:
+                    messages.insert(0, {"role": "system", "content": self.system_prompt})
+                content = await self.complete(messages, semaphore, limiter)
+            if on_result is not None:
+                on_result(index, content)
+            return content
+
+        return await asyncio.gather(*(run_one(i, prompt) for i, prompt in enumerate(prompts)))
+
+    def run(self, prompts, on_result=None, contexts=None):
+        """Synchronous entry point for scripts"""
+        return asyncio.run(self.evaluate_many(prompts, on_result, contexts))
@@ -0,0 +1,121 @@
+"""
+Batched judging: score every candidate response to a question in one call.
+
+The single-response judge prompt repeats the question and ground truth for
+every model. ``judge_batch`` instead sends them once together with all
+candidate responses and asks for a strict JSON object keyed by response
+label:
+
+    {"response_1": {"factual_accuracy": 4, "clarity": 5, "neutrality": 5,
+                    "helpfulness": 4, "justification": "..."}, ...}
+
+Responses are shown to the judge as ``response_1``, ``response_2``, ... so
+model names cannot sway the scores; the labels are mapped back to model
+names afterwards. Each entry needs an integer 1-5 for every criterion and a
+non-empty justification. Models whose entry is missing or malformed are
+returned as failures so the caller can fall back to single-response judging
+for just those items.
+"""
+
+import json
+
+from judge_parser import extract_json_object, parse_error, parse_judgment_dict
+from judge_prompts import judge_messages, judge_prompt_version
+from providers import complete
+
+# Static part of the batch judge prompt, sent as the system message
+BATCH_JUDGE_INSTRUCTIONS = """You are an evaluator assessing AI-generated health responses.
+
+Using a 1 to 5 scale, evaluate EACH response you are given based on:
+1. Factual Accuracy – Is the response factually correct compared to the ground truth?
+2. Clarity – Is the response clearly written and easy to understand?
+3. Neutrality – Is it unbiased and culturally sensitive?
+4. Helpfulness – Does it provide useful and safe information?
+
+Score each response independently. Respond with a single JSON object and
+nothing else, with one key per response (the keys are listed after the
+responses). Each value must be an object of the form:
+{"factual_accuracy": <1-5>, "clarity": <1-5>, "neutrality": <1-5>, "helpfulness": <1-5>, "justification": "<brief explanation>"}"""
+
+
+def response_labels(models):
+    """Anonymous ``{label: model}`` in the given order: ``response_1``, ``response_2``, ..."""
+    return {f"response_{i}": model for i, model in enumerate(models, 1)}
+
+
+def build_batch_evaluation_prompt(question, responses, ground_truth):
+    """Build the per-question part of the batch prompt covering every ``{label: response}``"""
+    blocks = "\n\n".join(f"### {label}\n{response}" for label, response in responses.items())
+    keys = ", ".join(json.dumps(label) for label in responses)
+    return f"""Question: {question}
+
+Ground Truth Reference: {ground_truth}
+
+AI Responses:
+
+{blocks}
+
+Required keys: {keys}
+"""
+
+
+BATCH_PROMPT_VERSION = judge_prompt_version(
+    build_batch_evaluation_prompt("{question}", {"response_1": "{response}"}, "{ground_truth}"),
+    BATCH_JUDGE_INSTRUCTIONS,
+)
+
+
+def validate_batch_output(text, keys):
+    """
+    Split a batch judge output into per-key results.
+
+    Returns ``(entries, failures)``: ``entries`` maps each key with a valid
+    entry to its ``(Judgment, raw_entry_json)``; ``failures`` maps every
+    other key to a list of structured parse errors.
+    """
+    payload = extract_json_object(text) if isinstance(text, str) else None
+    if payload is None:
+        error = parse_error("batch", "invalid_json", (text or "")[:200])
+        return {}, {key: [error] for key in keys}
+
+    entries, failures = {}, {}
+    for key in keys:
+        entry = payload.get(key)
+        if not isinstance(entry, dict):
+            failures[key] = [parse_error(key, "missing_entry")]
+            continue
+        judgment = parse_judgment_dict(entry)
+        errors = list(judgment.errors)
+        if not isinstance(entry.get("justification"), str) or not entry["justification"].strip():
+            errors.append(parse_error("justification", "missing"))
+        if errors:
+            failures[key] = errors
+        else:
+            entries[key] = (judgment, json.dumps(entry))
+    return entries, failures
+
+
+def judge_batch(question, responses, ground_truth, model="gpt-4", json_mode=False):
+    """
+    Score all ``{model_name: response}`` for one question with a single call.
+
+    ``json_mode`` requests ``response_format={"type": "json_object"}``, which
+    only newer chat models support. Returns ``(entries, failures)`` as
+    ``validate_batch_output`` does, keyed by model name; a failed request
+    fails every model.
+    """
+    labels = response_labels(responses)
+    prompt = build_batch_evaluation_prompt(question, {label: responses[name] for label, name in labels.items()},
+                                           ground_truth)
+    messages = judge_messages(prompt, BATCH_JUDGE_INSTRUCTIONS)
+    kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+
+    try:
+        text = complete(model, messages, 0, None, **kwargs)
+    except Exception as e:
+        print(f"Error during batch evaluation: {e}")
+        error = parse_error("batch", "request_failed", str(e))
+        return {}, {name: [error] for name in responses}
+    entries, failures = validate_batch_output(text, list(labels))
+    return ({labels[label]: entry for label, entry in entries.items()},
+            {labels[label]: errors for label, errors in failures.items()})
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of the ``--execution batch`` modes against the mock server.
+
+Runs ``restructure_evaluations --execution batch`` and ``compare_models
+--execution batch`` in a scratch directory against the Batch API stub in
+``mock_llm_server.py``, once with a share of batch items failing and once
+with every batch job failing. Each run must poll the job through its
+in-progress states, send only the failed items to the live endpoint, end
+with every (question, model) judged, and submit nothing on a re-run. A
+last check interrupts ``run_batch`` while its job is in flight and re-runs
+it with more requests: the first job must be collected, and only the new
+requests submitted.
+Nothing is cached and nothing is written to the real data directory.
+
+Usage:
+    python scripts/batch_smoke_test.py
+    python scripts/batch_smoke_test.py --questions 10 --batch-error-rate 0.3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Sets the cache/metrics environment before any script module loads
+from benchmark_throughput import use_mock_provider, write_questions
+
+import openai
+from mock_llm_server import start_mock_server
+
+
+def run_restructure(workdir):
+    from restructure_evaluations import restructure_evaluations
+
+    restructure_evaluations(execution="batch", poll_interval=0.01, data_path=workdir / "data",
+                            store_dir=workdir / "store", batch_dir=workdir / "batches")
+    with open(workdir / "data" / "questions.json") as f:
+        expected = sum(len(q.get("aiResponse", {})) for q in json.load(f))
+    with open(workdir / "store" / "evaluations.jsonl") as f:
+        judged = {(r["question_id"], r["model"]) for r in map(json.loads, f) if r.get("factual_accuracy")}
+    return expected, len(judged)
+
+
+def run_compare_models(workdir):
+    from compare_models import run_model_comparison
+    from providers import get_registry
+
+    run_model_comparison(execution="batch", poll_interval=0.01, data_dir=workdir / "data",
+                         store_dir=workdir / "store", batch_dir=workdir / "batches")
+    with open(workdir / "data" / "questions.json") as f:
+        expected = len(json.load(f)) * len(get_registry().model_set("comparison"))
+    with open(workdir / "data" / "model_comparison_results.json") as f:
+        judged = {(r["question_id"], r["model"]) for r in json.load(f) if r.get("factual_accuracy")}
+    return expected, len(judged)
+
+
+TARGETS = {
+    "restructure": run_restructure,
+    "compare_models": run_compare_models,
+}
+SCENARIOS = {
+    "item_errors": lambda error_rate: {"batch_error_rate": error_rate, "batch_failure_rate": 0.0},
+    "failed_job": lambda error_rate: {"batch_error_rate": 0.0, "batch_failure_rate": 1.0},
+}
+
+
+def check_changed_requests(n_requests, seed):
+    """Interrupt a batch, re-run with more requests; returns its measurements and problems"""
+    from openai_batch import chat_request, run_batch
+
+    server, mock_config = start_mock_server(latency="fixed:0.01", seed=seed, batch_error_rate=0.0)
+    openai.api_base = f"http://127.0.0.1:{server.server_port}/v1"
+    requests = [chat_request(i, "gpt-3.5-turbo", [{"role": "user", "content": f"Health question {i}?"}])
+                for i in range(2 * n_requests)]
+    answered = {}
+    problems = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            try:
+                run_batch(requests[:n_requests], "changed", answered.__setitem__, batch_dir=tmp,
+                          poll_interval=0.01, timeout=0)
+                problems.append("first run was not interrupted")
+            except TimeoutError:
+                pass
+            failures = run_batch(requests, "changed", answered.__setitem__, batch_dir=tmp, poll_interval=0.01)
+        stats = mock_config.snapshot()
+    finally:
+        server.shutdown()
+
+    if failures or len(answered) != len(requests):
+        problems.append(f"{len(answered)}/{len(requests)} answered")
+    if stats["batches"] != 2 or stats["batch_items"] != len(requests):
+        problems.append(f"{stats['batch_items']} items submitted in {stats['batches']} jobs "
+                        f"for {len(requests)} requests")
+    if stats["ok"]:
+        problems.append(f"{stats['ok']} live calls")
+    return {"batches": stats["batches"], "batch_items": stats["batch_items"], "problems": problems}
+
+
+def check(target, scenario, n_questions, error_rate, seed):
+    """Run one target twice in a fresh directory; returns its measurements and problems"""
+    server, mock_config = start_mock_server(latency="fixed:0.01", seed=seed,
+                                            **SCENARIOS[scenario](error_rate))
+    api_base = f"http://127.0.0.1:{server.server_port}/v1"
+    # openai_batch talks to the Batch API through openai-python's base URL
+    openai.api_base = api_base
+    problems = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            write_questions(workdir / "data", n_questions)
+            # Failed batch items fall back to live calls on the same server
+            use_mock_provider(api_base, 8, config_dir=tmp)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                expected, judged = TARGETS[target](workdir)
+            first = mock_config.snapshot()
+            with contextlib.redirect_stdout(io.StringIO()):
+                TARGETS[target](workdir)
+            second = mock_config.snapshot()
+    finally:
+        server.shutdown()
+
+    if judged != expected:
+        problems.append(f"{judged}/{expected} judged")
+    if not first["batches"]:
+        problems.append("no batch submitted")
+    if scenario == "item_errors" and ": in_progress" not in output.getvalue():
+        problems.append("job never reported in_progress")
+    if scenario == "item_errors" and not first["batch_item_errors"] and error_rate > 0:
+        problems.append("no batch item failed")
+    if scenario == "failed_job" and first["batches_failed"] != first["batches"]:
+        problems.append("a batch job did not fail")
+    # The first batch fails or completes before anything is retried live
+    if target == "restructure" and first["ok"] != first["batch_item_errors"] + (
+            first["batch_items"] if scenario == "failed_job" else 0):
+        problems.append(f"{first['ok']} live calls for {first['batch_item_errors']} failed items")
+    if not first["ok"] and (first["batch_item_errors"] or first["batches_failed"]):
+        problems.append("failed items were not retried live")
+    if second["batches"] != first["batches"] or second["requests"] != first["requests"]:
+        problems.append("re-run submitted new work")
+    return {
+        "target": target,
+        "scenario": scenario,
+        "judged": f"{judged}/{expected}",
+        "batches": first["batches"],
+        "batch_items": first["batch_items"],
+        "item_errors": first["batch_item_errors"],
+        "live_calls": first["ok"],
+        "problems": problems,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the Batch API execution modes against the mock server")
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"Comma-separated: {', '.join(TARGETS)}")
+    parser.add_argument("--questions", type=int, default=6, help="Questions per run (cycled from data/questions.json)")
+    parser.add_argument("--batch-error-rate", type=float, default=0.2, help="Share of batch items that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    targets = [t for t in args.targets.split(",") if t]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+
+    print("\n📦 BATCH MODE SMOKE TEST")
+    print("=" * 50)
+    print(f"  {'target':<16}{'scenario':<13}{'judged':>8}{'jobs':>6}{'items':>7}{'errors':>8}{'live':>6}")
+    failed = False
+    for target in targets:
+        for scenario in SCENARIOS:
+            result = check(target, scenario, args.questions, args.batch_error_rate, args.seed)
+            print(f"  {result['target']:<16}{result['scenario']:<13}{result['judged']:>8}{result['batches']:>6}"
+                  f"{result['batch_items']:>7}{result['item_errors']:>8}{result['live_calls']:>6}"
+                  f"  {'✅' if not result['problems'] else '❌ ' + '; '.join(result['problems'])}")
+            failed = failed or bool(result["problems"])
+    result = check_changed_requests(args.questions, args.seed)
+    print(f"  {'run_batch':<16}{'changed':<13}{'':>8}{result['batches']:>6}{result['batch_items']:>7}{'':>8}{'':>6}"
+          f"  {'✅' if not result['problems'] else '❌ ' + '; '.join(result['problems'])}")
+    failed = failed or bool(result["problems"])
+
+    if failed:
+        print("\n❌ Batch mode did not behave as expected")
+        sys.exit(1)
+    print("\n✅ Batch modes polled, fell back and resumed as expected")
+
+
+if __name__ == "__main__":
+    main()
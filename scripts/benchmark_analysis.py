@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Benchmark the enhanced analysis pipeline on synthetic datasets.
+
+Generates ``questions.json`` / ``evaluations_restructured.json`` pairs with
+30, 10k, 100k or 1M evaluation rows (question × model) and times every
+analysis step the pipeline runs, recording peak resident memory per
+stage. Each dataset size runs in its own process so peaks are not inflated
+by earlier sizes.
+
+Every run is appended to a JSON history file; a stage that is slower than
+the median of its previous runs by more than ``--threshold`` is reported as
+a regression (and fails the run with ``--fail-on-regression``).
+
+Usage:
+    python scripts/benchmark_analysis.py --sizes 30,10k
+    python scripts/benchmark_analysis.py --sizes 100k --skip create_visualizations --fail-on-regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from json_stream import JsonArrayWriter
+
+ROOT = Path(__file__).resolve().parent.parent
+DATASET_DIR = ROOT / "data" / "benchmarks"
+HISTORY_PATH = ROOT / "results" / "benchmarks" / "analysis_history.json"
+PRESET_SIZES = {"30": 30, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+STAGES = [
+    "load_data",
+    "create_analysis_dataframe",
+    "model_comparison_analysis",
+    "bootstrap_analysis",
+    "response_quality_analysis",
+    "safety_and_bias_analysis",
+    "create_visualizations",
+    "export_results",
+]
+MODELS = ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo"]
+GENERATOR_VERSION = "1"
+
+# Topic stems chosen so every category in _categorize_question is exercised
+TOPICS = [
+    "taking ibuprofen while pregnant", "an IUD after a c section", "switching antidepressant meds",
+    "seeing a psychologist for anxiety", "an MRI before knee surgery", "the flu vaccine for seniors",
+    "high blood pressure and salt", "type 2 diabetes and fruit", "stroke warning signs",
+    "vitamin D in winter", "drinking water before sleep", "a high-fiber diet",
+    "seasonal allergies", "back pain after lifting", "headaches from screen time",
+]
+WORDS = (
+    "the a of and to in is for with that may can your doctor risk health symptoms treatment "
+    "evidence studies show recommend guidelines daily dose effects safe avoid consult "
+    "common patients research suggests benefit important body blood levels heart care "
+    "medical professional advice condition support reduce increase help monitor signs"
+).split()
+
+
+def parse_size(value):
+    """``"10k"`` → 10000; accepts the presets or any integer"""
+    value = value.strip().lower()
+    if value in PRESET_SIZES:
+        return PRESET_SIZES[value]
+    if value.endswith("k"):
+        return int(float(value[:-1]) * 1_000)
+    if value.endswith("m"):
+        return int(float(value[:-1]) * 1_000_000)
+    return int(value)
+
+
+def _sentences(rng, count, min_words=8, max_words=20):
+    lengths = rng.integers(min_words, max_words + 1, size=count)
+    picks = rng.integers(0, len(WORDS), size=int(lengths.sum()))
+    sentences, start = [], 0
+    for length in lengths:
+        words = [WORDS[i] for i in picks[start:start + length]]
+        start += length
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def generate_dataset(n_rows, output_dir=None, seed=0, models=MODELS):
+    """
+    Write a synthetic dataset with ``n_rows`` evaluation rows; returns its directory.
+
+    Scores are drawn per model around a different mean (with ~1% unparsed
+    scores) so the statistical comparisons have something to find. An
+    existing dataset with the same size, seed and generator version is reused.
+    """
+    output_dir = Path(output_dir or DATASET_DIR / f"rows_{n_rows}_seed_{seed}")
+    manifest_path = output_dir / "manifest.json"
+    manifest = {"rows": n_rows, "seed": seed, "models": list(models), "generator_version": GENERATOR_VERSION}
+    if manifest_path.exists() and json.loads(manifest_path.read_text()) == manifest:
+        return output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    n_questions = -(-n_rows // len(models))
+    model_means = {model: 3.2 + 0.4 * i for i, model in enumerate(models)}
+    criteria = ["factual_accuracy", "clarity", "neutrality", "helpfulness"]
+
+    print(f"🧪 Generating {n_rows:,} rows ({n_questions:,} questions × {len(models)} models) in {output_dir}")
+    written = 0
+    with JsonArrayWriter(output_dir / "questions.json", indent=None) as questions, \
+            JsonArrayWriter(output_dir / "evaluations_restructured.json", indent=None) as evaluations:
+        for question_id in range(1, n_questions + 1):
+            topic = TOPICS[question_id % len(TOPICS)]
+            question = f"Is it okay to consider {topic}? (case {question_id})"
+            ground_truth = _sentences(rng, int(rng.integers(2, 5)))
+            entry = {"id": question_id, "question": question, "ground_truth": ground_truth, "evaluations": {}}
+            for model in models:
+                if written == n_rows:
+                    break
+                scores = np.clip(np.rint(rng.normal(model_means[model], 0.8, size=len(criteria))), 1, 5)
+                evaluation = {c: int(s) for c, s in zip(criteria, scores)}
+                if rng.random() < 0.01:
+                    evaluation[criteria[int(rng.integers(len(criteria)))]] = None
+                evaluation["justification"] = _sentences(rng, 1)
+                evaluation["response"] = _sentences(rng, int(rng.integers(3, 9)))
+                entry["evaluations"][model] = evaluation
+                written += 1
+            questions.write({"id": question_id, "question": question, "answer": ground_truth,
+                             "response": entry["evaluations"][models[0]]["response"], "source": "synthetic"})
+            evaluations.write(entry)
+
+    manifest_path.write_text(json.dumps(manifest))
+    return output_dir
+
+
+def _current_rss():
+    """Resident set size in bytes (Linux /proc; falls back to the process peak)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakMemory:
+    """Sample RSS on a background thread while the block runs"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _current_rss())
+
+    def __enter__(self):
+        self.start = self.peak = _current_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+def run_stages(data_dir, output_dir, skip=(), feature_cache=False):
+    """Run the analysis stages in order; returns ``{stage: {seconds, peak_rss_mb, rss_growth_mb}}``"""
+    import matplotlib
+    matplotlib.use("Agg")
+    from enhanced_analysis import EnhancedHealthAnalysis
+    from feature_cache import FeatureCache
+
+    analyzer = EnhancedHealthAnalysis(data_path=data_dir, use_feature_cache=False)
+    if feature_cache:
+        analyzer.feature_cache = FeatureCache(Path(data_dir) / "text_features.sqlite")
+    calls = {
+        "load_data": analyzer.load_data,
+        "create_analysis_dataframe": analyzer.create_analysis_dataframe,
+        "model_comparison_analysis": analyzer.model_comparison_analysis,
+        "bootstrap_analysis": analyzer.bootstrap_analysis,
+        "response_quality_analysis": analyzer.response_quality_analysis,
+        "safety_and_bias_analysis": analyzer.safety_and_bias_analysis,
+        "create_visualizations": lambda: analyzer.create_visualizations(Path(output_dir) / "figures"),
+        "export_results": lambda: analyzer.export_results(Path(output_dir)),
+    }
+
+    timings = {}
+    for stage in STAGES:
+        if stage in skip:
+            continue
+        with PeakMemory() as memory:
+            started = time.perf_counter()
+            calls[stage]()
+            seconds = time.perf_counter() - started
+        timings[stage] = {
+            "seconds": round(seconds, 4),
+            "peak_rss_mb": round(memory.peak / 2**20, 1),
+            "rss_growth_mb": round((memory.peak - memory.start) / 2**20, 1),
+        }
+    return timings
+
+
+def run_size_isolated(n_rows, seed, skip, feature_cache):
+    """Run one dataset size in a fresh interpreter and return its stage timings"""
+    data_dir = generate_dataset(n_rows, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = Path(tmp) / "result.json"
+        command = [sys.executable, __file__, "--worker", str(data_dir), str(result_path),
+                   "--skip", ",".join(skip)]
+        if feature_cache:
+            command.append("--feature-cache")
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        return json.loads(result_path.read_text())
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path=HISTORY_PATH):
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def append_history(run, path=HISTORY_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    runs = load_history(path) + [run]
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(runs, f, indent=2)
+    tmp_path.replace(path)
+
+
+def find_regressions(history, run, threshold=1.25, min_seconds=0.05):
+    """Stages in ``run`` slower than ``threshold`` × the median of earlier runs of the same size"""
+    regressions = []
+    for size, stages in run["results"].items():
+        for stage, result in stages.items():
+            previous = [r["results"][size][stage]["seconds"] for r in history
+                        if stage in r.get("results", {}).get(size, {})]
+            if not previous:
+                continue
+            baseline = float(np.median(previous))
+            if result["seconds"] > max(baseline * threshold, baseline + min_seconds):
+                regressions.append({"size": size, "stage": stage, "seconds": result["seconds"],
+                                    "baseline_seconds": round(baseline, 4)})
+    return regressions
+
+
+def print_run(run, regressions):
+    print("\n⏱️  ANALYSIS BENCHMARK")
+    print("=" * 50)
+    for size, stages in run["results"].items():
+        print(f"  {int(size):,} rows:")
+        for stage, result in stages.items():
+            print(f"    {stage:<28} {result['seconds']:>9.3f}s  peak {result['peak_rss_mb']:>8.1f} MB "
+                  f"(+{result['rss_growth_mb']:.1f})")
+    if regressions:
+        print("\n⚠️  Regressions against history:")
+        for r in regressions:
+            print(f"    {int(r['size']):,} rows {r['stage']}: {r['seconds']:.3f}s vs median {r['baseline_seconds']:.3f}s")
+    else:
+        print("\n✅ No regressions against history")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the enhanced analysis pipeline on synthetic data")
+    parser.add_argument("--sizes", default="30,10k", help="Comma-separated row counts (30, 10k, 100k, 1M or integers)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", default="", help="Comma-separated stages to skip")
+    parser.add_argument("--feature-cache", action="store_true",
+                        help="Use a per-dataset feature cache (measures warm runs after the first)")
+    parser.add_argument("--history", default=str(HISTORY_PATH), help="JSON history file")
+    parser.add_argument("--no-record", action="store_true", help="Do not append this run to the history")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown factor reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--generate-only", action="store_true", help="Only write the synthetic datasets")
+    parser.add_argument("--worker", nargs=2, metavar=("DATA_DIR", "RESULT_PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    skip = [stage for stage in args.skip.split(",") if stage]
+    unknown = set(skip) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    if args.worker:
+        data_dir, result_path = args.worker
+        with tempfile.TemporaryDirectory() as output_dir:
+            timings = run_stages(data_dir, output_dir, skip, args.feature_cache)
+        Path(result_path).write_text(json.dumps(timings))
+        return
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    if args.generate_only:
+        for n_rows in sizes:
+            generate_dataset(n_rows, seed=args.seed)
+        return
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "feature_cache": args.feature_cache,
+        "results": {},
+    }
+    for n_rows in sizes:
+        print(f"🏁 Benchmarking {n_rows:,} rows...")
+        run["results"][str(n_rows)] = run_size_isolated(n_rows, args.seed, skip, args.feature_cache)
+
+    history = [r for r in load_history(args.history) if r.get("feature_cache") == args.feature_cache]
+    regressions = find_regressions(history, run, args.threshold)
+    run["regressions"] = regressions
+    print_run(run, regressions)
+
+    if not args.no_record:
+        append_history(run, args.history)
+        print(f"📁 Run appended to {args.history}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Startup and import-time guard for the CLI and the main script modules.
+
+Each target runs in a fresh interpreter several times; the median wall time
+above a bare ``python -c pass`` is compared with the target's budget (so
+the check means the same thing on slow and fast machines). A second run
+under ``python -X importtime`` lists what the target imported, and a target
+fails if it pulled in a dependency it must not load, e.g. pandas for
+``cli.py status`` or NLTK/Matplotlib for a plain ``import enhanced_analysis``.
+``cli.py quick`` is held to the same budget on a cold run: it may load
+PyArrow and NumPy to read and bootstrap the scores, but not pandas.
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --repeat 7 --check
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+CLI = str(SCRIPTS_DIR / "cli.py")
+
+HEAVY = {"pandas", "numpy", "pyarrow", "matplotlib", "seaborn", "scipy", "sklearn", "nltk", "textstat",
+         "rouge_score", "openai", "requests"}
+PLOTTING_AND_NLP = {"matplotlib", "seaborn", "sklearn", "nltk", "textstat", "rouge_score"}
+
+# name → (argv after the interpreter, budget in ms above bare startup or None, modules it must not import)
+TARGETS = {
+    "cli --help": ([CLI, "--help"], 200, HEAVY),
+    "cli status": ([CLI, "status"], 200, HEAVY),
+    "cli quick": ([CLI, "quick"], 200, HEAVY - {"pyarrow", "numpy"}),
+    "import quick_analysis": (["-c", "import quick_analysis"], 200, HEAVY),
+    "import enhanced_analysis": (["-c", "import enhanced_analysis"], None, PLOTTING_AND_NLP | {"scipy", "openai"}),
+    "import evaluate_responses": (["-c", "import evaluate_responses"], None, PLOTTING_AND_NLP | {"pandas"}),
+}
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SCRIPTS_DIR), env.get("PYTHONPATH")]))
+    # evaluate_responses refuses to import without a key; nothing is called
+    env.setdefault("OPENAI_API_KEY", "sk-startup-benchmark")
+    return env
+
+
+def wall_ms(argv, repeat):
+    """Median wall time of ``python ARGV`` in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *argv], env=_env(), stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def imported_modules(argv):
+    """Top-level packages imported by ``python ARGV`` (from ``-X importtime``)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", *argv], env=_env(), stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, check=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and line.count("|") == 2:
+            name = line.rsplit("|", 1)[1].strip()
+            if name != "imported package":
+                modules.add(name.split(".")[0])
+    return modules
+
+
+def run(repeat=5, targets=None):
+    baseline = wall_ms(["-c", "pass"], repeat)
+    results = []
+    for name in targets or TARGETS:
+        argv, budget, forbidden = TARGETS[name]
+        total = wall_ms(argv, repeat)
+        leaked = sorted(forbidden & imported_modules(argv))
+        overhead = total - baseline
+        results.append({
+            "target": name,
+            "total_ms": round(total, 1),
+            "overhead_ms": round(overhead, 1),
+            "budget_ms": budget,
+            "leaked": leaked,
+            "ok": not leaked and (budget is None or overhead <= budget),
+        })
+    return baseline, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup and import-time budgets")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per target (median is reported)")
+    parser.add_argument("--targets", default=None, help=f"Comma-separated subset of: {', '.join(TARGETS)}")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero if a budget is exceeded or a module leaks")
+    args = parser.parse_args()
+
+    targets = args.targets.split(",") if args.targets else None
+    baseline, results = run(args.repeat, targets)
+
+    print("\n🚀 STARTUP BENCHMARK")
+    print("=" * 50)
+    print(f"  bare interpreter: {baseline:.0f} ms")
+    for r in results:
+        budget = f"≤ {r['budget_ms']} ms" if r["budget_ms"] is not None else "no budget"
+        print(f"  {'✅' if r['ok'] else '❌'} {r['target']:<28}{r['overhead_ms']:>7.0f} ms above bare "
+              f"({r['total_ms']:.0f} ms total, {budget})")
+        if r["leaked"]:
+            print(f"      imported: {', '.join(r['leaked'])}")
+
+    if args.check and not all(r["ok"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
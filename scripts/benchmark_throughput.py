@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the generation and judging scripts.
+
+Runs ``compare_models.run_model_comparison``,
+``restructure_evaluations.restructure_evaluations`` and
+``evaluate_responses.evaluate_responses`` against the bundled mock
+server (``mock_llm_server.py``) at several concurrency settings and reports
+requests/sec, successful calls/sec, makespan, retries and the 429/5xx
+counts the server injected. Nothing is cached and nothing is written to the
+real data directory or result stores.
+
+The provider's concurrency cap is set to each concurrency value; client-side
+RPM/TPM budgets are off unless ``--provider-rpm``/``--provider-tpm`` are
+given, so the numbers show what the pipeline itself can sustain.
+
+Runs are appended to a JSON history; a successful-calls/sec figure more than
+``--threshold`` below the median of earlier runs with the same target,
+concurrency and mock settings is a regression.
+
+Usage:
+    python scripts/benchmark_throughput.py --concurrency 1,4,8,16 --questions 30
+    python scripts/benchmark_throughput.py --targets compare_models --rate-limit-rate 0.05 --fail-on-regression
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Before any script module creates the process-wide cache and metrics sink
+os.environ["LLM_CACHE_MODE"] = "off"
+os.environ["LLM_METRICS_PATH"] = ""
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+import providers
+from benchmark_analysis import ROOT, append_history, load_history
+from call_metrics import get_sink
+from mock_llm_server import start_mock_server
+
+HISTORY_PATH = ROOT / "results" / "benchmarks" / "throughput_history.json"
+
+
+def write_questions(data_dir, n_questions):
+    """Copy the project's questions (cycled with fresh ids up to ``n_questions``) into ``data_dir``"""
+    with open(ROOT / "data" / "questions.json") as f:
+        source = [q for q in json.load(f) if q.get("question") and q.get("answer")]
+    questions = [{**source[i % len(source)], "id": i + 1} for i in range(n_questions)]
+    data_dir.mkdir(parents=True, exist_ok=True)
+    with open(data_dir / "questions.json", "w") as f:
+        json.dump(questions, f)
+    # No prior judge results, so every response is judged
+    with open(data_dir / "evaluations.json", "w") as f:
+        json.dump([], f)
+
+
+def use_mock_provider(api_base, concurrency, rpm=None, tpm=None, config_dir=None):
+    """Point the "openai" provider at the mock server with the given limits"""
+    config = providers.load_config(providers.PROVIDERS_CONFIG)
+    spec = config["providers"]["openai"]
+    spec.update(api_base=api_base, max_concurrency=concurrency)
+    spec.pop("api_base_env", None)
+    for key, value in (("requests_per_minute", rpm), ("tokens_per_minute", tpm)):
+        if value:
+            spec[key] = value
+        else:
+            spec.pop(key, None)
+    path = Path(config_dir) / "providers.json"
+    with open(path, "w") as f:
+        json.dump(config, f)
+    os.environ["LLM_PROVIDERS_CONFIG"] = str(path)
+    # The registry (and its pooled sessions) is rebuilt from the new config
+    providers._default_registry = None
+
+
+def run_compare_models(workdir, concurrency):
+    from compare_models import run_model_comparison
+
+    run_model_comparison(generation_workers=concurrency, judge_workers=concurrency,
+                         queue_size=2 * concurrency, data_dir=workdir / "data", store_dir=workdir / "store")
+
+
+def run_restructure(workdir, concurrency):
+    from restructure_evaluations import restructure_evaluations
+
+    restructure_evaluations(data_path=workdir / "data", store_dir=workdir / "store")
+
+
+def run_evaluate_responses(workdir, concurrency):
+    from evaluate_responses import evaluate_responses
+
+    data_dir = workdir / "data"
+    # Client-side budgets stay off like the provider's; the mock is the only limit
+    results = evaluate_responses(data_dir=data_dir, store_dir=workdir / "store", concurrency=concurrency,
+                                 rpm=None, tpm=None, api_base=os.environ["OPENAI_API_BASE"])
+    # Every judged response must have been committed to the store as it finished
+    with open(workdir / "store" / "legacy_evaluations.jsonl") as f:
+        committed = sum(1 for line in f if line.strip())
+    if committed != len(results):
+        raise RuntimeError(f"evaluate_responses committed {committed} of {len(results)} results")
+
+
+# target → (runner, whether it has a concurrency knob)
+TARGETS = {
+    "compare_models": (run_compare_models, True),
+    "restructure": (run_restructure, False),
+    "evaluate_responses": (run_evaluate_responses, True),
+}
+
+
+def run_once(target, concurrency, mock_config, api_base, n_questions, rpm=None, tpm=None):
+    """Run one target at one concurrency setting; returns its measurements"""
+    runner, _ = TARGETS[target]
+    sink = get_sink()
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        write_questions(workdir / "data", n_questions)
+        use_mock_provider(api_base, concurrency, rpm, tpm, tmp)
+        mock_config.reset()
+        first_record = len(sink.records)
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            runner(workdir, concurrency)
+        makespan = time.perf_counter() - started
+
+    calls = sink.records[first_record:]
+    ok = [c for c in calls if not c.get("error")]
+    latencies = [c["latency_s"] for c in ok] or [0.0]
+    server = mock_config.snapshot()
+    return {
+        "target": target,
+        "concurrency": concurrency,
+        "makespan_s": round(makespan, 3),
+        "server_requests": server["requests"],
+        "requests_per_s": round(server["requests"] / makespan, 2),
+        "calls_ok": len(ok),
+        "calls_failed": len(calls) - len(ok),
+        "calls_per_s": round(len(ok) / makespan, 2),
+        "retries": sum(c.get("retries", 0) for c in calls),
+        "rate_limited": server["rate_limited"],
+        "server_errors": server["errors"],
+        "max_in_flight": server["max_in_flight"],
+        "latency_p50_s": round(float(np.percentile(latencies, 50)), 3),
+        "latency_p95_s": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def find_regressions(history, run, threshold=1.25):
+    """Results whose calls/sec fell below the median of comparable earlier runs by ``threshold``×"""
+    regressions = []
+    for result in run["results"]:
+        previous = [r["calls_per_s"] for past in history if past.get("mock") == run["mock"]
+                    and past.get("questions") == run["questions"] and past.get("provider_limits") == run["provider_limits"]
+                    for r in past.get("results", [])
+                    if r["target"] == result["target"] and r["concurrency"] == result["concurrency"]]
+        if not previous:
+            continue
+        baseline = float(np.median(previous))
+        if result["calls_per_s"] * threshold < baseline:
+            regressions.append({"target": result["target"], "concurrency": result["concurrency"],
+                                "calls_per_s": result["calls_per_s"], "baseline_calls_per_s": round(baseline, 2)})
+    return regressions
+
+
+def print_results(results, regressions):
+    print("\n🚦 THROUGHPUT BENCHMARK")
+    print("=" * 50)
+    print(f"  {'target':<20}{'conc':>5}{'makespan':>10}{'req/s':>8}{'ok/s':>8}{'ok':>6}{'fail':>6}"
+          f"{'retries':>8}{'429':>6}{'5xx':>6}{'inflight':>9}{'p50':>7}{'p95':>7}")
+    for r in results:
+        print(f"  {r['target']:<20}{r['concurrency']:>5}{r['makespan_s']:>9.2f}s{r['requests_per_s']:>8.2f}"
+              f"{r['calls_per_s']:>8.2f}{r['calls_ok']:>6}{r['calls_failed']:>6}{r['retries']:>8}"
+              f"{r['rate_limited']:>6}{r['server_errors']:>6}{r['max_in_flight']:>9}"
+              f"{r['latency_p50_s']:>6.2f}s{r['latency_p95_s']:>6.2f}s")
+    if regressions:
+        print("\n⚠️  Regressions against history:")
+        for r in regressions:
+            print(f"    {r['target']} @ {r['concurrency']}: {r['calls_per_s']:.2f} calls/s "
+                  f"vs median {r['baseline_calls_per_s']:.2f}")
+    else:
+        print("\n✅ No regressions against history")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput benchmark against a mock LLM server")
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"Comma-separated: {', '.join(TARGETS)}")
+    parser.add_argument("--concurrency", default="1,4,8,16", help="Comma-separated worker/connection counts")
+    parser.add_argument("--questions", type=int, default=30, help="Questions per run (cycled from data/questions.json)")
+    parser.add_argument("--latency", default="lognormal:0.5,0.4", help="Mock latency distribution spec")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock responses that are 503s")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of mock responses that are 429s")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Retry-After seconds on mock 429s")
+    parser.add_argument("--rpm-limit", type=int, default=None, help="Mock server-side requests-per-minute cap")
+    parser.add_argument("--provider-rpm", type=int, default=None, help="Client-side RPM budget (off by default)")
+    parser.add_argument("--provider-tpm", type=int, default=None, help="Client-side TPM budget (off by default)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=str(HISTORY_PATH), help="JSON history file")
+    parser.add_argument("--no-record", action="store_true", help="Do not append this run to the history")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown factor reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    targets = [t for t in args.targets.split(",") if t]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    mock = {"latency": args.latency, "error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate,
+            "retry_after": args.retry_after, "rpm_limit": args.rpm_limit}
+    server, mock_config = start_mock_server(seed=args.seed, **mock)
+    api_base = f"http://127.0.0.1:{server.server_port}/v1"
+    # openai-python calls (batch helpers) follow the same base URL
+    os.environ["OPENAI_API_BASE"] = api_base
+
+    results = []
+    try:
+        for target in targets:
+            _, concurrent = TARGETS[target]
+            for level in levels if concurrent else [1]:
+                print(f"🏁 {target} at concurrency {level}...")
+                results.append(run_once(target, level, mock_config, api_base, args.questions,
+                                        args.provider_rpm, args.provider_tpm))
+            if not concurrent:
+                print(f"   ({target} judges one request at a time; concurrency settings do not apply)")
+    finally:
+        server.shutdown()
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "questions": args.questions,
+        "mock": mock,
+        "provider_limits": {"rpm": args.provider_rpm, "tpm": args.provider_tpm},
+        "results": results,
+    }
+    regressions = find_regressions(load_history(args.history), run, args.threshold)
+    run["regressions"] = regressions
+    print_results(results, regressions)
+
+    if not args.no_record:
+        append_history(run, args.history)
+        print(f"📁 Run appended to {args.history}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Bootstrap confidence intervals for model means and rankings.
+
+Questions are the sampling unit: each resample draws questions with
+replacement and keeps every model's score on them, so the comparison stays
+paired. Resamples are generated as NumPy index matrices in chunks, turned
+into per-question draw counts with one ``bincount`` and reduced with a
+single matrix product against a question × (model, category) score table.
+That yields per-model and per-category means for a whole chunk of resamples
+without a Python loop over resamples or questions.
+
+Chunks get independent seeds spawned from one ``SeedSequence``, so results
+are identical whether chunks run in-process (``backend="numpy"``) or across a
+process pool (``backend="process"``).
+"""
+
+import os
+
+import numpy as np
+
+BACKENDS = ("numpy", "process")
+# Index-matrix elements per chunk (resamples × questions); bounds chunk memory
+CHUNK_ELEMENTS = 4_000_000
+
+_worker_values = None
+_worker_valid = None
+
+
+def _question_table(df, value, id_col, model_col, group_col, models):
+    """
+    Questions × (overall + per-group) × models score and validity matrices.
+
+    Column ``g * n_models + m`` holds model ``m``'s score within group ``g``
+    (group 0 is all questions); scores outside the group are zero with
+    validity 0, so a weighted sum over questions gives per-group sums.
+    """
+    table = df.pivot_table(index=id_col, columns=model_col, values=value, aggfunc="mean", observed=True)
+    if models is not None:
+        table = table.reindex(columns=list(models))
+    scores = table.to_numpy(dtype=float)
+    valid = ~np.isnan(scores)
+    scores = np.where(valid, scores, 0.0)
+
+    groups = []
+    if group_col is not None and group_col in df.columns:
+        question_groups = df.groupby(id_col, observed=True)[group_col].first().reindex(table.index)
+        groups = sorted(question_groups.dropna().astype(str).unique())
+        membership = [np.ones(len(table), dtype=bool)] + [(question_groups.astype(str) == g).to_numpy() for g in groups]
+    else:
+        membership = [np.ones(len(table), dtype=bool)]
+
+    values = np.hstack([scores * member[:, None] for member in membership])
+    weights = np.hstack([valid & member[:, None] for member in membership]).astype(float)
+    return values, weights, [str(m) for m in table.columns], groups
+
+
+def _chunk_means(values, valid, n_resamples, seed):
+    """Means of every column for ``n_resamples`` question resamples"""
+    rng = np.random.default_rng(seed)
+    n_questions = len(values)
+    index = rng.integers(0, n_questions, size=(n_resamples, n_questions), dtype=np.int32)
+    offsets = (np.arange(n_resamples, dtype=np.int32)[:, None] * n_questions + index).ravel()
+    counts = np.bincount(offsets, minlength=n_resamples * n_questions).reshape(n_resamples, n_questions)
+    counts = counts.astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (counts @ values) / (counts @ valid)
+
+
+def _init_worker(values, valid):
+    global _worker_values, _worker_valid
+    _worker_values, _worker_valid = values, valid
+
+
+def _worker_chunk(args):
+    n_resamples, seed = args
+    return _chunk_means(_worker_values, _worker_valid, n_resamples, seed)
+
+
+def resample_means(values, valid, n_resamples=10000, seed=0, backend="numpy", workers=None):
+    """
+    Bootstrap column means: returns an ``n_resamples × columns`` array.
+
+    ``values``/``valid`` are questions × columns; a column's mean in a
+    resample is its count-weighted sum over valid entries divided by the
+    count-weighted number of valid entries (NaN when none were drawn).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    chunk = max(1, min(n_resamples, CHUNK_ELEMENTS // max(1, len(values))))
+    sizes = [min(chunk, n_resamples - start) for start in range(0, n_resamples, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if backend == "process" and len(sizes) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes)), initializer=_init_worker,
+                                 initargs=(values, valid)) as pool:
+            parts = list(pool.map(_worker_chunk, zip(sizes, seeds)))
+    else:
+        parts = [_chunk_means(values, valid, size, s) for size, s in zip(sizes, seeds)]
+    return np.vstack(parts)
+
+
+def _interval(samples, level):
+    tail = (1 - level) / 2
+    if np.isnan(samples).any():
+        with np.errstate(invalid="ignore"):
+            low, high = np.nanpercentile(samples, [tail * 100, 100 - tail * 100], axis=0)
+        return low, high
+    # np.percentile's linear interpolation, without nanpercentile's cost or
+    # the numpy.ma import that np.percentile triggers (cli.py quick's budget)
+    ordered = np.sort(samples, axis=0)
+    bounds = []
+    for q in (tail, 1 - tail):
+        position = q * (len(ordered) - 1)
+        below = int(np.floor(position))
+        above = min(below + 1, len(ordered) - 1)
+        bounds.append(ordered[below] + (ordered[above] - ordered[below]) * (position - below))
+    low, high = bounds
+    return low, high
+
+
+def _rank_samples(overall):
+    """Rank of every model within each resample (1 is best, ties share the better rank, NaN ranks last)"""
+    filled = np.where(np.isnan(overall), -np.inf, overall)
+    return 1 + (filled[:, None, :] > filled[:, :, None]).sum(axis=2)
+
+
+def rank_models(values, valid, names, n_resamples=10000, level=0.95, seed=0):
+    """
+    Means, CIs and P(best) from a questions × models score matrix, without pandas.
+
+    ``values``/``valid`` are laid out as for ``resample_means``. Returns one
+    dict per model (model, mean, ci_low, ci_high, p_best), best mean first;
+    the numbers match the ``models`` frame of ``bootstrap_rankings``.
+    """
+    values, valid = np.asarray(values, dtype=float), np.asarray(valid, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        point = values.sum(axis=0) / valid.sum(axis=0)
+    samples = resample_means(values, valid, n_resamples, seed)
+    low, high = _interval(samples, level)
+    p_best = (_rank_samples(samples) == 1).mean(axis=0)
+    rows = [{"model": name, "mean": point[i], "ci_low": low[i], "ci_high": high[i], "p_best": p_best[i]}
+            for i, name in enumerate(names)]
+    return sorted(rows, key=lambda row: -row["mean"])
+
+
+def bootstrap_rankings(df, value="overall_score", n_resamples=10000, level=0.95, seed=0, backend="numpy",
+                       workers=None, models=None, id_col="id", model_col="model", group_col="category"):
+    """
+    Bootstrap CIs for per-model and per-category means and for model rankings.
+
+    Returns a dict of tidy DataFrames:
+
+    - ``models``: model, mean, se, ci_low, ci_high, p_best, expected_rank,
+      rank_ci_low, rank_ci_high (rank 1 is the highest mean)
+    - ``categories``: category, model, mean, se, ci_low, ci_high
+    - ``pairwise``: model_a, model_b, mean_diff, ci_low, ci_high,
+      p_a_better (share of resamples where ``model_a``'s mean is higher)
+
+    Means are the point estimates on the full data; intervals are
+    percentile intervals at ``level``.
+    """
+    import pandas as pd
+
+    values, valid, names, groups = _question_table(df, value, id_col, model_col, group_col, models)
+    n_models = len(names)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        point = values.sum(axis=0) / valid.sum(axis=0)
+    samples = resample_means(values, valid, n_resamples, seed, backend, workers)
+    low, high = _interval(samples, level)
+    se = np.nanstd(samples, axis=0, ddof=1)
+
+    overall = samples[:, :n_models]
+    ranks = _rank_samples(overall)
+    rank_low, rank_high = _interval(ranks.astype(float), level)
+    model_frame = pd.DataFrame({
+        "model": names,
+        "mean": point[:n_models],
+        "se": se[:n_models],
+        "ci_low": low[:n_models],
+        "ci_high": high[:n_models],
+        "p_best": (ranks == 1).mean(axis=0),
+        "expected_rank": ranks.mean(axis=0),
+        "rank_ci_low": rank_low,
+        "rank_ci_high": rank_high,
+    }).sort_values("mean", ascending=False, ignore_index=True)
+
+    category_frame = pd.DataFrame({
+        "category": np.repeat(groups, n_models),
+        "model": names * len(groups),
+        "mean": point[n_models:],
+        "se": se[n_models:],
+        "ci_low": low[n_models:],
+        "ci_high": high[n_models:],
+    })
+
+    a, b = np.triu_indices(n_models, k=1)
+    diffs = overall[:, a] - overall[:, b]
+    diff_low, diff_high = _interval(diffs, level)
+    pairwise_frame = pd.DataFrame({
+        "model_a": np.asarray(names, dtype=object)[a],
+        "model_b": np.asarray(names, dtype=object)[b],
+        "mean_diff": point[a] - point[b],
+        "ci_low": diff_low,
+        "ci_high": diff_high,
+        "p_a_better": (diffs > 0).mean(axis=0),
+    })
+    return {"models": model_frame, "categories": category_frame, "pairwise": pairwise_frame}
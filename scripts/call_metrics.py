@@ -0,0 +1,199 @@
+"""
+Per-call metrics for LLM requests.
+
+Every generation and judge call that reaches an API is recorded to an
+append-only JSONL sink (``data/metrics/llm_calls.jsonl``, override with
+``LLM_METRICS_PATH``) with its wall-clock latency, time to first token when
+streamed, prompt/completion tokens (and how many prompt tokens the provider
+served from its prefix cache), retries and estimated cost. Callers tag
+calls with ``call_context(stage=..., question_id=..., subject_model=...)``
+so the metrics can be joined back onto the score dataframe; cache hits are
+not recorded.
+
+``print_metrics_summary()`` ends a run with p50/p95/p99 latency, throughput
+and cached-prompt-token ratio per model for the calls made in this process.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+METRICS_PATH = Path(__file__).resolve().parent.parent / "data" / "metrics" / "llm_calls.jsonl"
+RUN_ID = uuid.uuid4().hex[:12]
+
+_context = contextvars.ContextVar("llm_call_context", default={})
+
+
+@contextmanager
+def call_context(**fields):
+    """Attach ``fields`` (stage, question_id, subject_model, ...) to calls made inside"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_context():
+    return dict(_context.get())
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, pricing=None):
+    """USD cost from ``price_per_1k`` = [prompt, completion] in config/providers.json"""
+    pricing = pricing if pricing is not None else _load_pricing()
+    prices = pricing.get(model)
+    if prices is None or prompt_tokens is None or completion_tokens is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000
+
+
+_pricing = None
+
+
+def _load_pricing():
+    global _pricing
+    if _pricing is None:
+        from providers import load_config
+
+        try:
+            models = load_config().get("models", {})
+        except (OSError, ValueError):
+            models = {}
+        # Calls are recorded under the provider-side model name, which may differ
+        _pricing = {}
+        for name, spec in models.items():
+            if "price_per_1k" in spec:
+                _pricing[name] = _pricing[spec.get("model", name)] = spec["price_per_1k"]
+    return _pricing
+
+
+class MetricsSink:
+    """Thread-safe JSONL sink that also keeps this run's records in memory"""
+
+    def __init__(self, path=METRICS_PATH):
+        self.path = Path(path) if path else None
+        self.records = []
+        self._lock = threading.Lock()
+        self._file = None
+
+    def record(self, model, latency_s, prompt_tokens=None, completion_tokens=None, retries=0,
+               ttft_s=None, provider=None, error=None, tokens_estimated=False, cached_tokens=None, **fields):
+        context = current_context()
+        record = {
+            "run_id": RUN_ID,
+            "ts": time.time(),
+            "stage": context.pop("stage", None),
+            "model": model,
+            "provider": provider,
+            **context,
+            **fields,
+            "latency_s": round(latency_s, 4),
+            "ttft_s": round(ttft_s, 4) if ttft_s is not None else None,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "tokens_estimated": tokens_estimated,
+            "retries": retries,
+            "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens),
+            "error": error,
+        }
+        with self._lock:
+            self.records.append(record)
+            if self.path is not None:
+                if self._file is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(json.dumps(record) + "\n")
+                self._file.flush()
+        return record
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_default_sink = None
+
+
+def get_sink():
+    """Process-wide sink at LLM_METRICS_PATH (set it to "" to keep metrics in memory only)"""
+    global _default_sink
+    if _default_sink is None:
+        path = os.getenv("LLM_METRICS_PATH", str(METRICS_PATH))
+        _default_sink = MetricsSink(path or None)
+    return _default_sink
+
+
+def summarize(records):
+    """Per-model call counts, latency percentiles, throughput, tokens and cost"""
+    import numpy as np
+
+    by_model = {}
+    for record in records:
+        by_model.setdefault(record["model"], []).append(record)
+
+    summary = {}
+    for model, calls in by_model.items():
+        ok = [c for c in calls if not c.get("error")]
+        latencies = np.array([c["latency_s"] for c in ok]) if ok else np.array([0.0])
+        ttfts = [c["ttft_s"] for c in ok if c.get("ttft_s") is not None]
+        # Throughput over the wall-clock window the model's calls spanned
+        window = max(c["ts"] for c in calls) - min(c["ts"] - c["latency_s"] for c in calls)
+        costs = [c["cost_usd"] for c in ok if c.get("cost_usd") is not None]
+        # Only calls whose provider reports cache usage count toward the ratio
+        reported = [c for c in ok if c.get("cached_tokens") is not None and c.get("prompt_tokens")]
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary[model] = {
+            "calls": len(calls),
+            "errors": len(calls) - len(ok),
+            "retries": sum(c.get("retries", 0) for c in calls),
+            "p50_s": float(p50),
+            "p95_s": float(p95),
+            "p99_s": float(p99),
+            "ttft_p50_s": float(np.median(ttfts)) if ttfts else None,
+            "throughput_per_min": len(ok) / window * 60 if window > 0 else 0.0,
+            "prompt_tokens": sum(c.get("prompt_tokens") or 0 for c in ok),
+            "completion_tokens": sum(c.get("completion_tokens") or 0 for c in ok),
+            "cached_tokens": sum(c["cached_tokens"] for c in reported),
+            "cached_ratio": (sum(c["cached_tokens"] for c in reported) / sum(c["prompt_tokens"] for c in reported)
+                             if reported else None),
+            "cost_usd": sum(costs) if costs else None,
+        }
+    return summary
+
+
+def print_metrics_summary(sink=None):
+    """Print latency/throughput/cost per model for the calls made in this run"""
+    sink = sink or get_sink()
+    if not sink.records:
+        print("📈 LLM calls: none made this run (all cached)")
+        return
+    print("\n📈 LLM CALL METRICS")
+    print("=" * 50)
+    for model, s in summarize(sink.records).items():
+        ttft = f", TTFT p50 {s['ttft_p50_s']:.2f}s" if s["ttft_p50_s"] is not None else ""
+        cost = f", ${s['cost_usd']:.4f}" if s["cost_usd"] is not None else ""
+        cached = f" ({s['cached_ratio']:.0%} of prompt cached)" if s["cached_ratio"] is not None else ""
+        print(f"  {model}: {s['calls']} calls ({s['errors']} failed, {s['retries']} retries), "
+              f"latency p50/p95/p99 {s['p50_s']:.2f}/{s['p95_s']:.2f}/{s['p99_s']:.2f}s{ttft}, "
+              f"{s['throughput_per_min']:.1f}/min, "
+              f"{s['prompt_tokens']}+{s['completion_tokens']} tokens{cached}{cost}")
+    if sink.path is not None:
+        print(f"  Per-call records: {sink.path}")
+
+
+def load_call_metrics(path=METRICS_PATH):
+    """All recorded calls as a DataFrame (empty if nothing was recorded yet)"""
+    import pandas as pd
+
+    path = Path(path)
+    if not path.exists():
+        return pd.DataFrame()
+    return pd.read_json(path, lines=True)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the project's scripts.
+
+Only the standard library is imported here: each subcommand runs its script
+exactly as ``python scripts/<script>.py ARGS`` would, so pandas, Matplotlib,
+SciPy, NLTK and the API clients are loaded only by the subcommands that use
+them. ``status`` is built in and needs nothing else, so it (and ``--help``)
+start in well under 200 ms; ``benchmark_startup.py`` guards that.
+
+Installed (``pip install -e .``) it is the ``llm-health-eval`` command.
+
+Usage:
+    python scripts/cli.py status
+    python scripts/cli.py run --dry-run
+    python scripts/cli.py quick
+    python scripts/cli.py compare --execution batch
+    python scripts/cli.py <command> --help
+"""
+
+import argparse
+import os
+import runpy
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+
+# command → (script, help)
+COMMANDS = {
+    "status": (None, "Show data, stores, caches and NLTK resources (fast, stdlib only)"),
+    "run": ("pipeline.py", "Run the pipeline DAG, skipping stages whose inputs are unchanged"),
+    "quick": ("quick_analysis.py", "Quick results summary"),
+    "analyze": ("enhanced_analysis.py", "Full analysis with statistics, figures and exports"),
+    "visualize": ("create_visualizations.py", "Render the comprehensive figure set"),
+    "generate": ("generate_answers.py", "Generate GPT-3.5 answers for the questions"),
+    "ground-truth": ("get_ground_truth.py", "Collect ground truth from trusted sites"),
+    "evaluate": ("evaluate_responses.py", "Judge GPT responses against the ground truth"),
+    "restructure": ("restructure_evaluations.py", "Judge every model's response into the structured format"),
+    "ensemble": ("ensemble_judging.py", "Score every response with several judge models (agreement, review flags)"),
+    "compare": ("compare_models.py", "Generate and judge responses from several models"),
+    "multi-model": ("generate_multi_model_responses.py", "Generate responses from several models"),
+    "deep-research": ("deep_research_prompt.py", "Generate deep research responses"),
+    "columnar": ("columnar_store.py", "Convert evaluations to the Parquet store"),
+    "store": ("result_store.py", "Inspect or compact a result store"),
+    "bench-analysis": ("benchmark_analysis.py", "Analysis stage timings on synthetic data"),
+    "bench-throughput": ("benchmark_throughput.py", "Generation/judging throughput against a mock server"),
+    "bench-startup": ("benchmark_startup.py", "CLI startup and import-time budgets"),
+    "mock-server": ("mock_llm_server.py", "Mock OpenAI-compatible server"),
+}
+
+
+def _size(path):
+    size = path.stat().st_size
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _count_lines(path):
+    with open(path, "rb") as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+
+
+def status():
+    """Summarize what is on disk without loading any heavy dependency"""
+    import sqlite3
+
+    from call_metrics import METRICS_PATH
+    from llm_cache import DEFAULT_CACHE_PATH
+    from nltk_resources import NLTK_MARKER_PATH, load_marker, tokenizer_resources
+    from result_store import STORE_DIR
+
+    data_dir = ROOT / "data"
+    print("📋 LLM HEALTH EVAL STATUS")
+    print("=" * 50)
+
+    print("\n📁 Data:")
+    for name in ["questions.json", "ground_truth.json", "gpt_responses.json", "evaluations.json",
+                 "evaluations_restructured.json", "model_comparison_results.json"]:
+        path = data_dir / name
+        if path.exists():
+            modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(path.stat().st_mtime))
+            print(f"  ✅ {name:<34}{_size(path):>10}  {modified}")
+        else:
+            print(f"  ➖ {name:<34}{'missing':>10}")
+    source = data_dir / "evaluations_restructured.json"
+    parquet = data_dir / "evaluations.parquet"
+    if parquet.exists():
+        fresh = not source.exists() or parquet.stat().st_mtime >= source.stat().st_mtime
+        print(f"  {'✅' if fresh else '⚠️ '} Parquet store {'up to date' if fresh else 'older than the JSON (run: cli.py columnar)'}")
+    else:
+        print("  ➖ Parquet store not built (run: cli.py columnar)")
+
+    print("\n🗄️  Result stores:")
+    stores = sorted(Path(STORE_DIR).glob("*.jsonl")) if Path(STORE_DIR).exists() else []
+    for path in stores:
+        print(f"  {path.name:<37}{_count_lines(path):>8} records  {_size(path):>10}")
+    if not stores:
+        print("  (none)")
+
+    print("\n💾 Caches and logs:")
+    cache_path = Path(os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH))
+    if cache_path.exists():
+        try:
+            with sqlite3.connect(f"file:{cache_path}?mode=ro", uri=True) as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        except sqlite3.Error:
+            entries = "?"
+        print(f"  LLM response cache: {entries} entries, {_size(cache_path)} "
+              f"(mode: {os.getenv('LLM_CACHE_MODE', 'readwrite')})")
+    else:
+        print("  LLM response cache: empty")
+    metrics_path = Path(os.getenv("LLM_METRICS_PATH") or METRICS_PATH)
+    if metrics_path.exists():
+        print(f"  Call metrics: {_count_lines(metrics_path)} calls logged ({_size(metrics_path)})")
+    else:
+        print("  Call metrics: none logged")
+    figures = ROOT / "results" / "figures"
+    print(f"  Figures: {len(list(figures.glob('*.png'))) if figures.exists() else 0} in results/figures")
+
+    print("\n📚 NLTK resources:")
+    marker = load_marker(NLTK_MARKER_PATH)
+    for name in tokenizer_resources():
+        location = marker.get(name)
+        if location and Path(location).exists():
+            print(f"  ✅ {name} ({location})")
+        else:
+            print(f"  ➖ {name} not checked yet (looked up and, if needed, downloaded on first use)")
+
+
+def run_script(script, args):
+    """Run ``scripts/<script>`` as ``__main__`` with ``args`` as its command line"""
+    path = SCRIPTS_DIR / script
+    sys.argv = [str(path), *args]
+    runpy.run_path(str(path), run_name="__main__")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="llm-health-eval",
+        description="LLM health evaluation toolkit. Arguments after the command are passed to its script.",
+    )
+    sub = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        sub.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # The scripts import each other as top-level modules
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    parser = build_parser()
+    # Only the command is parsed here; everything after it belongs to the script
+    command = parser.parse_args(argv[:1]).command
+    script, _ = COMMANDS[command]
+    if script is None:
+        status()
+    else:
+        run_script(script, argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Columnar (Parquet) storage for evaluations and scores.
+
+``evaluations_restructured.json`` nests every model's full response inside
+each question, so every analysis run re-parses all of the text just to get
+at a few integer scores. This module converts it into two long-format
+Parquet files:
+
+    evaluations.parquet  one row per (question_id, model, evaluator); score
+                         columns, response word count, and the response /
+                         justification text in dictionary-encoded columns
+    questions.parquet    one row per question with its text and ground truth
+
+Readers ask for just the columns they need (``read_scores``), so loading
+the scores of a million evaluations never touches the response text.
+
+Usage:
+    python scripts/columnar_store.py data/evaluations_restructured.json
+"""
+
+import argparse
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data"
+EVALUATIONS_PARQUET = DATA_PATH / "evaluations.parquet"
+QUESTIONS_PARQUET = DATA_PATH / "questions.parquet"
+
+CRITERIA = ["factual_accuracy", "clarity", "neutrality", "helpfulness"]
+KEY_COLUMNS = ["question_id", "model", "evaluator"]
+SCORE_COLUMNS = KEY_COLUMNS + CRITERIA + ["response_length"]
+TEXT_COLUMNS = ["response", "justification"]
+
+EVALUATION_SCHEMA = pa.schema([
+    ("question_id", pa.int32()),
+    ("model", pa.dictionary(pa.int16(), pa.string())),
+    ("evaluator", pa.dictionary(pa.int16(), pa.string())),
+    ("factual_accuracy", pa.int8()),
+    ("clarity", pa.int8()),
+    ("neutrality", pa.int8()),
+    ("helpfulness", pa.int8()),
+    ("response_length", pa.int32()),
+    ("response", pa.dictionary(pa.int32(), pa.string())),
+    ("justification", pa.string()),
+])
+
+QUESTION_SCHEMA = pa.schema([
+    ("question_id", pa.int32()),
+    ("question", pa.string()),
+    ("ground_truth", pa.string()),
+])
+
+
+def evaluations_to_tables(evaluations, evaluator="gpt-4"):
+    """Flatten the restructured JSON layout into (evaluations, questions) tables"""
+    columns = {name: [] for name in EVALUATION_SCHEMA.names}
+    questions = {name: [] for name in QUESTION_SCHEMA.names}
+
+    for eval_item in evaluations:
+        questions["question_id"].append(eval_item["id"])
+        questions["question"].append(eval_item.get("question"))
+        questions["ground_truth"].append(eval_item.get("ground_truth"))
+
+        for model_name, model_eval in eval_item.get("evaluations", {}).items():
+            response = model_eval.get("response", "") or ""
+            columns["question_id"].append(eval_item["id"])
+            columns["model"].append(model_name)
+            columns["evaluator"].append(model_eval.get("evaluator", evaluator))
+            for criterion in CRITERIA:
+                columns[criterion].append(model_eval.get(criterion))
+            columns["response_length"].append(len(response.split()))
+            columns["response"].append(response)
+            columns["justification"].append(model_eval.get("justification", ""))
+
+    return (
+        pa.Table.from_pydict(columns, schema=EVALUATION_SCHEMA),
+        pa.Table.from_pydict(questions, schema=QUESTION_SCHEMA),
+    )
+
+
+def write_tables(evaluation_table, question_table, evaluations_path=EVALUATIONS_PARQUET,
+                 questions_path=QUESTIONS_PARQUET):
+    # Sorting by question keeps row-group statistics tight for question filters
+    evaluation_table = evaluation_table.sort_by("question_id")
+    pq.write_table(evaluation_table, evaluations_path, compression="zstd",
+                   use_dictionary=["model", "evaluator", "response"])
+    pq.write_table(question_table, questions_path, compression="zstd")
+
+
+def convert_json(json_path=DATA_PATH / "evaluations_restructured.json",
+                 evaluations_path=EVALUATIONS_PARQUET, questions_path=QUESTIONS_PARQUET):
+    """Convert evaluations_restructured.json into the Parquet store"""
+    from json_stream import iter_json_array
+
+    evaluation_table, question_table = evaluations_to_tables(iter_json_array(json_path))
+    write_tables(evaluation_table, question_table, evaluations_path, questions_path)
+    return evaluation_table.num_rows, question_table.num_rows
+
+
+def is_fresh(parquet_path, source_path):
+    """True if the Parquet file exists and is at least as new as its source"""
+    parquet_path, source_path = Path(parquet_path), Path(source_path)
+    if not parquet_path.exists():
+        return False
+    return not source_path.exists() or parquet_path.stat().st_mtime >= source_path.stat().st_mtime
+
+
+def read_scores(path=EVALUATIONS_PARQUET, columns=None):
+    """Load only the requested columns (default: keys, scores and response length)"""
+    table = pq.read_table(path, columns=columns or SCORE_COLUMNS)
+    return table.to_pandas()
+
+
+def read_evaluations(path=EVALUATIONS_PARQUET, include_text=True):
+    """Load the full long-format evaluation table"""
+    columns = SCORE_COLUMNS + (TEXT_COLUMNS if include_text else [])
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def read_questions(path=QUESTIONS_PARQUET, columns=None):
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def read_rows(path=EVALUATIONS_PARQUET, columns=None):
+    """The requested columns as a list of dicts, without importing pandas"""
+    # pq.read_table imports pandas to look for pandas metadata; ParquetFile.read can skip it
+    table = pq.ParquetFile(path).read(columns=columns or SCORE_COLUMNS, use_pandas_metadata=False)
+    return table.to_pylist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert restructured evaluations to Parquet")
+    parser.add_argument("json_path", nargs="?", default=str(DATA_PATH / "evaluations_restructured.json"))
+    parser.add_argument("--evaluations-out", default=str(EVALUATIONS_PARQUET))
+    parser.add_argument("--questions-out", default=str(QUESTIONS_PARQUET))
+    args = parser.parse_args()
+
+    n_evaluations, n_questions = convert_json(args.json_path, args.evaluations_out, args.questions_out)
+    print(f"✅ Wrote {n_evaluations} evaluations to {args.evaluations_out}")
+    print(f"✅ Wrote {n_questions} questions to {args.questions_out}")
+
+
+if __name__ == "__main__":
+    main()
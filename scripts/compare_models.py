@@ -1,166 +1,221 @@
+import argparse
 import json
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 from pathlib import Path
-import openai
-import time
-import os
 from dotenv import load_dotenv
-import re
+
+from call_metrics import call_context, print_metrics_summary
+from judge_parser import parse_judgment
+from judge_prompts import judge_messages, judge_prompt_version
+from llm_cache import print_cache_stats
+from openai_batch import BATCH_DIR, chat_request, run_batch
+from providers import complete, get_registry
+from question_source import iter_questions
+from result_store import STORE_DIR, ResultStore, record_key
+from staged_pipeline import print_pipeline_stats, run_two_stage
 
 # Load environment variables
 load_dotenv()
-openai.api_key = os.getenv('OPENAI_API_KEY')
 
-def parse_evaluation_scores(evaluation_text):
-    """Extract numerical scores from evaluation text"""
-    scores = {}
-    patterns = {
-        'factual_accuracy': r'(?:Factual\s+)?Accuracy:\s*(\d+)',
-        'clarity': r'Clarity:\s*(\d+)',
-        'neutrality': r'Neutrality:\s*(\d+)',
-        'helpfulness': r'Helpfulness:\s*(\d+)'
-    }
-    
-    for criterion, pattern in patterns.items():
-        match = re.search(pattern, evaluation_text, re.IGNORECASE)
-        if match:
-            scores[criterion] = int(match.group(1))
-        else:
-            scores[criterion] = None
-    
-    return scores
+GENERATION_SYSTEM_PROMPT = "You are a helpful health information assistant. Provide accurate, evidence-based responses to health-related questions. Be concise but informative."
+
+def generation_messages(question):
+    return [
+        {"role": "system", "content": GENERATION_SYSTEM_PROMPT},
+        {"role": "user", "content": question}
+    ]
 
 def generate_response_with_model(question, model_name):
-    """Generate response using specified model"""
+    """Generate response using specified model (routed by config/providers.json)"""
     try:
-        if "gpt" in model_name.lower():
-            response = openai.ChatCompletion.create(
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": "You are a helpful health information assistant. Provide accurate, evidence-based responses to health-related questions. Be concise but informative."},
-                    {"role": "user", "content": question}
-                ],
-                max_tokens=200,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
-        else:
-            # Placeholder for other models (Claude, Gemini, etc.)
-            return f"Response from {model_name} would go here"
+        return complete(model_name, generation_messages(question), temperature=0.7, max_tokens=200)
     except Exception as e:
         print(f"Error generating response with {model_name}: {e}")
         return ""
 
-def evaluate_response_with_model(question, response, ground_truth, evaluator_model):
-    """Evaluate response using specified model as evaluator"""
-    prompt = f"""
-You are an evaluator assessing an AI-generated health response.
-
-Using a 1 to 5 scale, evaluate the response based on:
-1. Factual Accuracy – Is the response factually correct compared to the ground truth?
-2. Clarity – Is the response clearly written and easy to understand?
-3. Neutrality – Is it unbiased and culturally sensitive?
-4. Helpfulness – Does it provide useful and safe information?
-
-Respond in the format:
-Factual Accuracy: X
-Clarity: Y
-Neutrality: Z
-Helpfulness: W
-Justification: <brief explanation>
-
----
-
-Question: {question}
+def build_evaluation_prompt(question, response, ground_truth):
+    """Build the per-item part of the judge prompt (the rubric is the shared system message)"""
+    return f"""Question: {question}
 
 AI-Generated Response: {response}
 
 Ground Truth Reference: {ground_truth}
 """
+
+def evaluate_response_with_model(question, response, ground_truth, evaluator_model):
+    """Evaluate response using specified model as evaluator"""
+    prompt = build_evaluation_prompt(question, response, ground_truth)
     
     try:
-        if "gpt" in evaluator_model.lower():
-            eval_response = openai.ChatCompletion.create(
-                model=evaluator_model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0
-            )
-            return eval_response.choices[0].message.content.strip()
-        else:
-            return f"Evaluation from {evaluator_model} would go here"
+        return complete(evaluator_model, judge_messages(prompt), temperature=0)
     except Exception as e:
         print(f"Error evaluating with {evaluator_model}: {e}")
         return ""
 
-def run_model_comparison():
-    """Run comprehensive model comparison"""
-    
-    # Load questions
-    with open('data/questions.json', 'r') as f:
-        questions = json.load(f)
-    
-    # Define models to test
-    models = {
-        "gpt-3.5-turbo": "GPT-3.5 Turbo",
-        "gpt-4": "GPT-4", 
-        "gpt-4-turbo": "GPT-4 Turbo"
-    }
+JUDGE_PROMPT_VERSION = judge_prompt_version(build_evaluation_prompt("{question}", "{response}", "{ground_truth}"))
+
+def run_comparison_batches(items, build_result, on_result, evaluator_model, poll_interval=30,
+                           batch_dir=BATCH_DIR):
+    """
+    Generate and judge ``items`` as two Batch API jobs.
+
+    Judged results are ingested by custom_id through ``on_result``; returns
+    the items still unfinished (failed requests, non-API models) for the
+    live pipeline. Generations land in the response cache, so the live
+    pipeline reuses any that succeeded.
+    """
+    by_id = {f"{model_name}:{question_data['id']}": (model_name, model_display, question_data)
+             for model_name, model_display, question_data in items}
+    # Only models served by the OpenAI provider can go through the Batch API
+    registry = get_registry()
+    batchable = {cid: item for cid, item in by_id.items() if registry.provider_type(item[0]) == "openai"}
+    
+    responses = {}
+    def collect(custom_id, content):
+        responses[custom_id] = content
+    
+    run_batch([chat_request(cid, item[0], generation_messages(item[2]['question']), 0.7, 200)
+               for cid, item in batchable.items()],
+              "compare_models_generation", collect, batch_dir=batch_dir, poll_interval=poll_interval)
+    
+    judged = set()
+    def ingest(custom_id, evaluation):
+        item = batchable[custom_id]
+        on_result(build_result(item, responses[custom_id], evaluation))
+        judged.add(custom_id)
+    
+    judge_requests = []
+    for cid, response in responses.items():
+        model_name, model_display, question_data = batchable[cid]
+        prompt = build_evaluation_prompt(question_data['question'], response, question_data['answer'])
+        judge_requests.append(chat_request(cid, evaluator_model, judge_messages(prompt), 0))
+    run_batch(judge_requests, "compare_models_judging", ingest, batch_dir=batch_dir,
+              poll_interval=poll_interval)
+    
+    remaining = [item for cid, item in by_id.items() if cid not in judged]
+    if remaining:
+        print(f"   {len(remaining)} items left for the live pipeline")
+    return remaining
+
+def run_model_comparison(generation_workers=4, judge_workers=4, queue_size=16,
+                         generation_rpm=None, judge_rpm=None, execution="live", poll_interval=30,
+                         data_dir="data", store_dir=STORE_DIR, batch_dir=BATCH_DIR):
+    """
+    Run comprehensive model comparison as a generate → judge pipeline.
+
+    With ``execution="batch"`` pending generations and then their judgments
+    run as two OpenAI Batch API jobs; anything a job fails on goes through
+    the live pipeline afterwards.
+    """
+    data_dir = Path(data_dir)
+    
+    # Load questions (empty answers filled from the harvested ground truth)
+    questions = list(iter_questions(data_dir))
+    
+    # Models to test come from the "comparison" set in config/providers.json
+    models = get_registry().model_set("comparison")
     
     # Use GPT-4 as the evaluator for consistency
     evaluator_model = "gpt-4"
     
-    results = []
-    
     print(f"🔄 Starting model comparison with {len(models)} models and {len(questions)} questions...")
+    print(f"   {generation_workers} generation workers → queue({queue_size}) → {judge_workers} judge workers")
     
+    # Results are appended to the store as they are judged; a re-run
+    # resumes by skipping every (question, model) already committed
+    store = ResultStore(Path(store_dir) / "model_comparison.jsonl")
+    results = []
+    items = []
     for model_name, model_display in models.items():
-        print(f"\n📝 Testing {model_display}...")
-        
         for question_data in questions:
-            question = question_data['question']
-            ground_truth = question_data['answer']
-            
-            print(f"  Generating response for Q{question_data['id']}...")
-            
-            # Generate response with current model
-            response = generate_response_with_model(question, model_name)
-            
-            if response:
-                # Evaluate response
-                evaluation = evaluate_response_with_model(question, response, ground_truth, evaluator_model)
-                
-                # Parse scores
-                scores = parse_evaluation_scores(evaluation)
-                
-                results.append({
-                    'model': model_name,
-                    'model_display': model_display,
-                    'question_id': question_data['id'],
-                    'question': question[:100] + '...' if len(question) > 100 else question,
-                    'response': response,
-                    'ground_truth': ground_truth,
-                    'evaluation': evaluation,
-                    'factual_accuracy': scores.get('factual_accuracy'),
-                    'clarity': scores.get('clarity'),
-                    'neutrality': scores.get('neutrality'),
-                    'helpfulness': scores.get('helpfulness')
-                })
-                
-                # Rate limiting
-                time.sleep(2)
+            stored = store.get(record_key(question_data['id'], model_name, evaluator_model, JUDGE_PROMPT_VERSION))
+            if stored is not None:
+                results.append(stored)
+            else:
+                items.append((model_name, model_display, question_data))
+    if results:
+        print(f"   Resuming: {len(results)} results already committed, {len(items)} pending")
+    
+    def generate(item):
+        model_name, model_display, question_data = item
+        print(f"  Generating {model_display} response for Q{question_data['id']}...")
+        with call_context(stage="generation", question_id=question_data['id'], subject_model=model_name):
+            return generate_response_with_model(question_data['question'], model_name)
+    
+    def judge(item, response):
+        model_name, model_display, question_data = item
+        with call_context(stage="judge", question_id=question_data['id'], subject_model=model_name):
+            evaluation = evaluate_response_with_model(question_data['question'], response,
+                                                      question_data['answer'], evaluator_model)
+        if not evaluation:
+            return None
+        return build_result(item, response, evaluation)
+    
+    def build_result(item, response, evaluation):
+        model_name, model_display, question_data = item
+        question = question_data['question']
+        ground_truth = question_data['answer']
+        
+        # Parse scores
+        judgment = parse_judgment(evaluation)
+        scores = judgment.scores
+        
+        result = {
+            'model': model_name,
+            'model_display': model_display,
+            'question_id': question_data['id'],
+            'evaluator': evaluator_model,
+            'prompt_version': JUDGE_PROMPT_VERSION,
+            'question': question[:100] + '...' if len(question) > 100 else question,
+            'response': response,
+            'ground_truth': ground_truth,
+            'evaluation': evaluation,
+            'factual_accuracy': scores.get('factual_accuracy'),
+            'clarity': scores.get('clarity'),
+            'neutrality': scores.get('neutrality'),
+            'helpfulness': scores.get('helpfulness')
+        }
+        if judgment.errors:
+            result['parse_errors'] = judgment.errors
+        return result
+    
+    # Commit each judged result to disk as soon as it is ready
+    with store:
+        def on_result(result):
+            results.append(result)
+            store.append(result)
+        
+        if execution == "batch":
+            items = run_comparison_batches(items, build_result, on_result, evaluator_model, poll_interval,
+                                           batch_dir)
+        
+        stats = run_two_stage(items, generate, judge, on_result,
+                              generation_workers=generation_workers,
+                              judge_workers=judge_workers,
+                              queue_size=queue_size,
+                              generation_rpm=generation_rpm,
+                              judge_rpm=judge_rpm)
+    
+    # Restore a deterministic order (workers finish out of order)
+    model_order = {name: i for i, name in enumerate(models)}
+    results.sort(key=lambda r: (model_order[r['model']], r['question_id']))
     
     # Create DataFrame
     df = pd.DataFrame(results)
     df['overall_score'] = df[['factual_accuracy', 'clarity', 'neutrality', 'helpfulness']].mean(axis=1)
     
     # Save results
-    with open('data/model_comparison_results.json', 'w') as f:
+    output_path = data_dir / 'model_comparison_results.json'
+    with open(output_path, 'w') as f:
         json.dump(results, f, indent=2)
     
-    print(f"\n✅ Model comparison complete! Results saved to data/model_comparison_results.json")
+    print(f"\n✅ Model comparison complete! Results saved to {output_path}")
+    print_pipeline_stats(stats)
+    print_cache_stats()
+    print_metrics_summary()
     
     return df
 
@@ -300,8 +355,15 @@ def main():
     print("🤖 LLM Model Comparison for Health Advice Evaluation")
     print("=" * 60)
     
+    parser = argparse.ArgumentParser(description="Compare models on the health question set")
+    parser.add_argument("--execution", choices=["live", "batch"], default="live",
+                        help="'batch' runs generation and judging as OpenAI Batch API jobs")
+    parser.add_argument("--poll-interval", type=float, default=30,
+                        help="Seconds between batch job status checks")
+    args = parser.parse_args()
+    
     # Run comparison
-    df = run_model_comparison()
+    df = run_model_comparison(execution=args.execution, poll_interval=args.poll_interval)
     
     # Analyze results
     analyze_model_comparison(df)
@@ -0,0 +1,104 @@
+"""
+Constant-time "already evaluated?" index for resumable runs.
+
+Maps (question_id, responding model, judge model, prompt hash) to a short
+fingerprint of the judged response, so a resume check is a single dict
+lookup and a changed response is detected without loading full records.
+
+The index is persisted as a sidecar next to its result store
+(``evaluations.jsonl`` → ``evaluations.index.json``) together with the byte
+offset of the store it covers; on load only records appended after that
+offset are scanned.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+
+def response_fingerprint(response):
+    """Short hash of a response text (None for a missing response)"""
+    if response is None:
+        return None
+    return hashlib.sha1(response.encode("utf-8")).hexdigest()[:16]
+
+
+class CompletionIndex:
+    """Persistent set of completed evaluation keys"""
+
+    def __init__(self, store_path, index_path=None):
+        self.store_path = Path(store_path)
+        self.index_path = Path(index_path) if index_path else self.store_path.with_suffix(".index.json")
+        self._entries = {}
+        self._store_offset = 0
+        self._dirty = False
+
+    @classmethod
+    def load(cls, store_path, index_path=None):
+        """Load the sidecar and catch up with records appended since it was saved"""
+        index = cls(store_path, index_path)
+        if index.index_path.exists():
+            with open(index.index_path) as f:
+                saved = json.load(f)
+            index._store_offset = saved.get("store_offset", 0)
+            for *key, fingerprint in saved.get("entries", []):
+                index._entries[tuple(key)] = fingerprint
+
+        store_size = index.store_path.stat().st_size if index.store_path.exists() else 0
+        if store_size < index._store_offset:
+            # Store was truncated or replaced; the sidecar no longer describes it
+            index._entries.clear()
+            index._store_offset = 0
+        if store_size > index._store_offset:
+            index._scan_store()
+        return index
+
+    def _scan_store(self):
+        with open(self.store_path, "rb") as f:
+            f.seek(self._store_offset)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.add_record(record)
+                self._store_offset += len(line)
+        self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return tuple(key) in self._entries
+
+    def is_done(self, key, response=None):
+        """True if ``key`` is complete (and, if given, for this exact response)"""
+        fingerprint = self._entries.get(tuple(key), False)
+        if fingerprint is False:
+            return False
+        return response is None or fingerprint == response_fingerprint(response)
+
+    def add(self, key, response=None):
+        self._entries[tuple(key)] = response_fingerprint(response)
+        self._dirty = True
+
+    def add_record(self, record):
+        """Index a result-store record"""
+        key = (record.get("question_id"), record.get("model"), record.get("evaluator"), record.get("prompt_version"))
+        self.add(key, record.get("response"))
+
+    def save(self):
+        """Persist the sidecar (covers the store up to its current size)"""
+        if not self._dirty:
+            return
+        if self.store_path.exists():
+            self._store_offset = self.store_path.stat().st_size
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "store_offset": self._store_offset,
+                "entries": [[*key, fingerprint] for key, fingerprint in self._entries.items()],
+            }, f)
+        tmp_path.replace(self.index_path)
+        self._dirty = False
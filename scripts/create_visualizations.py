@@ -1,35 +1,17 @@
+import argparse
 import json
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import numpy as np
 from pathlib import Path
-import re
+
+from figure_renderer import apply_style, render_figures
+from judge_parser import parse_evaluation_scores
+
+CRITERIA = ['factual_accuracy', 'clarity', 'neutrality', 'helpfulness']
 
 # Set styling
-plt.style.use('default')
-sns.set_palette("husl")
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 11
-
-def parse_evaluation_scores(evaluation_text):
-    """Extract numerical scores from evaluation text"""
-    scores = {}
-    patterns = {
-        'factual_accuracy': r'(?:Factual\s+)?Accuracy:\s*(\d+)',
-        'clarity': r'Clarity:\s*(\d+)',
-        'neutrality': r'Neutrality:\s*(\d+)',
-        'helpfulness': r'Helpfulness:\s*(\d+)'
-    }
-    
-    for criterion, pattern in patterns.items():
-        match = re.search(pattern, evaluation_text, re.IGNORECASE)
-        if match:
-            scores[criterion] = int(match.group(1))
-        else:
-            scores[criterion] = None
-    
-    return scores
+apply_style()
 
 def load_and_process_data():
     """Load and process evaluation data"""
@@ -78,126 +60,102 @@ def load_and_process_data():
     
     return df
 
-def create_comprehensive_visualizations(df):
-    """Create all visualizations"""
-    
-    # Create results directory if it doesn't exist
-    results_dir = Path("results/figures")
-    results_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 1. Overall Performance Dashboard
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+def draw_performance_dashboard(score_counts):
+    """Score distribution per criterion; ``score_counts`` maps criterion → counts by score"""
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
     
     # Criteria scores distribution
-    criteria = ['factual_accuracy', 'clarity', 'neutrality', 'helpfulness']
     titles = ['Factual Accuracy', 'Clarity', 'Neutrality', 'Helpfulness']
     colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
     
-    for i, (criterion, title, color) in enumerate(zip(criteria, titles, colors)):
-        ax = [ax1, ax2, ax3, ax4][i]
-        df[criterion].value_counts().sort_index().plot(kind='bar', ax=ax, color=color, alpha=0.7)
+    for ax, criterion, title, color in zip(axes.ravel(), CRITERIA, titles, colors):
+        counts = score_counts[criterion]
+        counts.plot(kind='bar', ax=ax, color=color, alpha=0.7)
         ax.set_title(f'{title} Distribution', fontsize=14, fontweight='bold')
         ax.set_xlabel('Score')
         ax.set_ylabel('Count')
         ax.grid(True, alpha=0.3)
         
         # Add value labels on bars
-        for j, v in enumerate(df[criterion].value_counts().sort_index()):
+        for j, v in enumerate(counts):
             ax.text(j, v + 0.1, str(v), ha='center', va='bottom', fontweight='bold')
     
-    plt.tight_layout()
-    plt.savefig(results_dir / 'performance_dashboard.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # 2. Category Performance Heatmap
-    plt.figure(figsize=(12, 8))
-    category_scores = df.groupby('category')[['factual_accuracy', 'clarity', 'neutrality', 'helpfulness', 'overall_score']].mean()
-    
+    fig.tight_layout()
+    return fig
+
+def draw_category_heatmap(category_scores):
+    """Mean score per category (columns) and criterion (rows)"""
+    fig = plt.figure(figsize=(12, 8))
     sns.heatmap(category_scores.T, annot=True, cmap='RdYlGn', center=3, 
                 fmt='.2f', cbar_kws={'label': 'Average Score'})
     plt.title('Performance by Category and Criteria', fontsize=16, fontweight='bold')
     plt.xlabel('Category')
     plt.ylabel('Evaluation Criteria')
     plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(results_dir / 'category_heatmap.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # 3. Response Length Analysis
+    fig.tight_layout()
+    return fig
+
+def draw_length_analysis(lengths):
+    """Response vs ground-truth length, and response length by category"""
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
     
     # GPT vs Ground Truth length
-    ax1.scatter(df['ground_truth_length'], df['gpt_response_length'], alpha=0.7, s=100)
-    ax1.plot([0, df['ground_truth_length'].max()], [0, df['ground_truth_length'].max()], 'r--', alpha=0.5)
+    ax1.scatter(lengths['ground_truth_length'], lengths['gpt_response_length'], alpha=0.7, s=100)
+    ax1.plot([0, lengths['ground_truth_length'].max()], [0, lengths['ground_truth_length'].max()], 'r--', alpha=0.5)
     ax1.set_xlabel('Ground Truth Length (words)')
     ax1.set_ylabel('GPT Response Length (words)')
     ax1.set_title('Response Length Comparison')
     ax1.grid(True, alpha=0.3)
     
     # Length by category
-    df.boxplot(column='gpt_response_length', by='category', ax=ax2)
+    lengths.boxplot(column='gpt_response_length', by='category', ax=ax2)
     ax2.set_title('GPT Response Length by Category')
     ax2.set_xlabel('Category')
     ax2.set_ylabel('Length (words)')
-    plt.xticks(rotation=45)
-    
-    plt.tight_layout()
-    plt.savefig(results_dir / 'length_analysis.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # 4. Score Correlation Matrix
-    plt.figure(figsize=(10, 8))
-    correlation_matrix = df[['factual_accuracy', 'clarity', 'neutrality', 'helpfulness', 'gpt_response_length']].corr()
+    ax2.tick_params(axis='x', rotation=45)
     
+    fig.tight_layout()
+    return fig
+
+def draw_correlation_matrix(correlation_matrix):
+    fig = plt.figure(figsize=(10, 8))
     sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0, 
                 fmt='.3f', square=True, cbar_kws={'label': 'Correlation Coefficient'})
     plt.title('Correlation Matrix of Evaluation Criteria', fontsize=16, fontweight='bold')
-    plt.tight_layout()
-    plt.savefig(results_dir / 'correlation_matrix.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # 5. Risk Assessment Chart
-    plt.figure(figsize=(12, 8))
-    
-    # Create risk categories
-    df['risk_level'] = pd.cut(df['factual_accuracy'], 
-                             bins=[0, 2, 3, 4, 5], 
-                             labels=['High Risk', 'Medium Risk', 'Low Risk', 'Safe'])
-    
-    risk_counts = df['risk_level'].value_counts()
+    fig.tight_layout()
+    return fig
+
+def draw_risk_assessment(risk_counts):
+    """Pie chart of responses per factual-accuracy risk level"""
+    fig = plt.figure(figsize=(12, 8))
     colors = ['#FF6B6B', '#FFA500', '#FFD700', '#90EE90']
     
     plt.pie(risk_counts.values, labels=risk_counts.index, autopct='%1.1f%%', 
             colors=colors, startangle=90)
     plt.title('Risk Assessment Based on Factual Accuracy', fontsize=16, fontweight='bold')
     plt.axis('equal')
-    plt.tight_layout()
-    plt.savefig(results_dir / 'risk_assessment.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # 6. Performance Trends
-    plt.figure(figsize=(12, 8))
-    
-    # Sort by ID for trend analysis
-    df_sorted = df.sort_values('id')
+    fig.tight_layout()
+    return fig
+
+def draw_performance_trends(trends):
+    """Scores per question, sorted by question id"""
+    fig = plt.figure(figsize=(12, 8))
     
-    plt.plot(df_sorted['id'], df_sorted['factual_accuracy'], 'o-', label='Factual Accuracy', linewidth=2)
-    plt.plot(df_sorted['id'], df_sorted['helpfulness'], 's-', label='Helpfulness', linewidth=2)
-    plt.plot(df_sorted['id'], df_sorted['overall_score'], '^-', label='Overall Score', linewidth=2)
+    plt.plot(trends['id'], trends['factual_accuracy'], 'o-', label='Factual Accuracy', linewidth=2)
+    plt.plot(trends['id'], trends['helpfulness'], 's-', label='Helpfulness', linewidth=2)
+    plt.plot(trends['id'], trends['overall_score'], '^-', label='Overall Score', linewidth=2)
     
     plt.xlabel('Question ID')
     plt.ylabel('Score')
     plt.title('Performance Trends Across Questions', fontsize=16, fontweight='bold')
     plt.legend()
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(results_dir / 'performance_trends.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # 7. Category Comparison Bar Chart
-    plt.figure(figsize=(12, 8))
-    
-    category_means = df.groupby('category')['overall_score'].mean().sort_values(ascending=True)
+    fig.tight_layout()
+    return fig
+
+def draw_category_comparison(category_means):
+    """Horizontal bars of the mean overall score per category"""
+    fig = plt.figure(figsize=(12, 8))
     
     bars = plt.barh(range(len(category_means)), category_means.values, color='skyblue', alpha=0.7)
     plt.yticks(range(len(category_means)), category_means.index)
@@ -206,24 +164,72 @@ def create_comprehensive_visualizations(df):
     plt.grid(True, alpha=0.3, axis='x')
     
     # Add value labels on bars
-    for i, bar in enumerate(bars):
+    for bar in bars:
         width = bar.get_width()
         plt.text(width + 0.01, bar.get_y() + bar.get_height()/2, 
                 f'{width:.2f}', ha='left', va='center', fontweight='bold')
     
-    plt.tight_layout()
-    plt.savefig(results_dir / 'category_comparison.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.tight_layout()
+    return fig
+
+def figure_frame(analysis_df):
+    """
+    The comprehensive set's columns from the pipeline's analysis frame
+    (one row per question and model): one row per question, with scores
+    and response length averaged over the models.
+    """
+    per_question = analysis_df.groupby('id', as_index=False).agg(
+        category=('category', 'first'),
+        **{c: (c, 'mean') for c in CRITERIA + ['overall_score']},
+        gpt_response_length=('response_length', 'mean'),
+        ground_truth_length=('ground_truth_length', 'first'),
+    )
+    return per_question
+
+def comprehensive_figures(df):
+    """
+    ``{filename: (draw, data)}`` for the comprehensive set. Each figure gets
+    only the aggregate it plots, so its render is skipped unless that moved.
+    """
+    risk_level = pd.cut(df['factual_accuracy'], bins=[0, 2, 3, 4, 5],
+                        labels=['High Risk', 'Medium Risk', 'Low Risk', 'Safe'])
+    return {
+        'performance_dashboard.png': (draw_performance_dashboard,
+                                      {c: df[c].value_counts().sort_index() for c in CRITERIA}),
+        'category_heatmap.png': (draw_category_heatmap,
+                                 df.groupby('category')[CRITERIA + ['overall_score']].mean()),
+        'length_analysis.png': (draw_length_analysis,
+                                df[['ground_truth_length', 'gpt_response_length', 'category']]),
+        'correlation_matrix.png': (draw_correlation_matrix,
+                                   df[CRITERIA + ['gpt_response_length']].corr()),
+        'risk_assessment.png': (draw_risk_assessment, risk_level.value_counts()),
+        'performance_trends.png': (draw_performance_trends,
+                                   df.sort_values('id')[['id', 'factual_accuracy', 'helpfulness', 'overall_score']]),
+        'category_comparison.png': (draw_category_comparison,
+                                    df.groupby('category')['overall_score'].mean().sort_values(ascending=True)),
+    }
+
+def create_comprehensive_visualizations(df, results_dir=Path("results/figures"), draft=False, workers=None, force=False):
+    """Create all visualizations, redrawing only those whose inputs changed"""
+    summary = render_figures(comprehensive_figures(df), results_dir, draft=draft, workers=workers, force=force)
     
-    print(f"✅ Created 7 comprehensive visualizations in {results_dir}")
+    print(f"✅ Rendered {len(summary['rendered'])} visualizations in {results_dir} "
+          f"({len(summary['skipped'])} up to date)")
+    return summary
 
 def main():
     """Main function to create all visualizations"""
+    parser = argparse.ArgumentParser(description="Create the comprehensive visualization set")
+    parser.add_argument("--draft", action="store_true", help="Render at low DPI for quick previews")
+    parser.add_argument("--force", action="store_true", help="Redraw figures even if their inputs are unchanged")
+    parser.add_argument("--workers", type=int, default=None, help="Rendering processes (default: one per CPU)")
+    args = parser.parse_args()
+    
     print("📊 Loading and processing data...")
     df = load_and_process_data()
     
     print(f"📈 Creating visualizations for {len(df)} evaluations...")
-    create_comprehensive_visualizations(df)
+    create_comprehensive_visualizations(df, draft=args.draft, workers=args.workers, force=args.force)
     
     # Print summary statistics
     print("\n📋 Summary Statistics:")
@@ -1,25 +1,46 @@
+import argparse
 import json
-import openai
-import time
-import os
+import re
 from dotenv import load_dotenv
 from pathlib import Path
 
+from call_metrics import call_context, print_metrics_summary
+from llm_cache import print_cache_stats
+from providers import complete, get_registry, stream_complete
+from result_store import STORE_DIR, ResultStore, prompt_version, record_key
+
 # Load environment variables
 load_dotenv()
-openai.api_key = os.getenv('OPENAI_API_KEY')
-
-def create_deep_research_prompt(question, question_id):
-    """Create a comprehensive research prompt for deep health research"""
-    
-    prompt = f"""
-# COMPREHENSIVE HEALTH RESEARCH TASK
 
-## RESEARCH QUESTION #{question_id}
-**Question:** {question}
+# Routed through config/providers.json like every other model call
+DEEP_RESEARCH_MODEL = "gpt-4"
+
+# Top-level sections of the response format in DEEP_RESEARCH_INSTRUCTIONS,
+# in order; the response is complete once the last one has its final paragraph
+REQUIRED_SECTIONS = [
+    "EXECUTIVE SUMMARY",
+    "SCIENTIFIC EVIDENCE",
+    "SAFETY CONSIDERATIONS",
+    "PRACTICAL RECOMMENDATIONS",
+    "WHEN TO SEEK MEDICAL CARE",
+    "SOURCES & REFERENCES",
+    "RISK-BENEFIT ASSESSMENT",
+]
+FINAL_SUBSECTION = "Overall Assessment"
+_SECTION_PATTERNS = [re.compile(rf"^#+[^\n]*{re.escape(title)}", re.MULTILINE | re.IGNORECASE)
+                     for title in REQUIRED_SECTIONS]
+_FINAL_PATTERN = re.compile(rf"^#+[^\n]*{re.escape(FINAL_SUBSECTION)}[^\n]*\n", re.MULTILINE | re.IGNORECASE)
+_CONTENT_START = re.compile(r"\S")
+_PARAGRAPH_END = re.compile(r"\n[ \t]*\n|\n(?=#|---)")
+
+DEEP_RESEARCH_SYSTEM_PROMPT = "You are a senior medical researcher with expertise in evidence-based medicine, clinical guidelines, and patient safety. You have access to the latest medical databases and authoritative health organizations. Your responses are thorough, accurate, and prioritize patient safety."
+
+# Everything that is the same for every question. It is sent first (in the
+# system message) so all requests share a prefix the provider can cache.
+DEEP_RESEARCH_INSTRUCTIONS = """# COMPREHENSIVE HEALTH RESEARCH TASK
 
 ## YOUR MISSION
-You are a senior medical researcher with access to the latest medical databases, peer-reviewed journals, and authoritative health organizations. Conduct a comprehensive, evidence-based analysis of this health question.
+You are a senior medical researcher with access to the latest medical databases, peer-reviewed journals, and authoritative health organizations. Conduct a comprehensive, evidence-based analysis of the health question given at the end of this task.
 
 ## RESEARCH METHODOLOGY
 
@@ -154,36 +175,85 @@ Please format your response exactly as follows:
 ## FINAL INSTRUCTIONS
 Take your time to conduct thorough research. This is a high-stakes health question that requires careful, evidence-based analysis. Your response should be comprehensive enough that a healthcare provider would find it accurate and useful, while being accessible to the general public.
 
-Begin your research now and provide a complete, well-structured response following the format above.
+Begin your research now and provide a complete, well-structured response following the format above."""
+
+def create_deep_research_prompt(question, question_id):
+    """Create the per-question part of the research prompt (sent after DEEP_RESEARCH_INSTRUCTIONS)"""
+    
+    prompt = f"""## RESEARCH QUESTION #{question_id}
+**Question:** {question}
 """
 
     return prompt
 
-def generate_deep_research_response(question, question_id):
-    """Generate a deep research response using the comprehensive prompt"""
+def deep_research_messages(question, question_id):
+    """Chat messages for one question: static persona and methodology first, the question last"""
+    return [
+        {"role": "system", "content": DEEP_RESEARCH_SYSTEM_PROMPT + "\n\n" + DEEP_RESEARCH_INSTRUCTIONS},
+        {"role": "user", "content": create_deep_research_prompt(question, question_id)}
+    ]
+
+DEEP_RESEARCH_PROMPT_VERSION = prompt_version(json.dumps(deep_research_messages("{question}", "{question_id}")))
+
+
+def sections_completed(text):
+    """Number of REQUIRED_SECTIONS headings present in ``text``, counted in order"""
+    position = 0
+    for count, pattern in enumerate(_SECTION_PATTERNS):
+        match = pattern.search(text, position)
+        if match is None:
+            return count
+        position = match.end()
+    return len(_SECTION_PATTERNS)
+
+
+def template_end(text):
+    """
+    Index just past the template's last paragraph, or None if not reached yet.
+
+    That is the end of the first paragraph under the final subsection, once
+    every required section has appeared before it.
+    """
+    final = _FINAL_PATTERN.search(text)
+    if final is None or sections_completed(text[:final.start()]) < len(REQUIRED_SECTIONS):
+        return None
+    body = _CONTENT_START.search(text, final.end())
+    if body is None:
+        return None
+    end = _PARAGRAPH_END.search(text, body.start())
+    return end.start() if end else None
+
+
+def generate_deep_research_response(question, question_id, stream=True, early_stop=True, on_text=None):
+    """
+    Generate a deep research response using the comprehensive prompt.
+
+    With ``stream`` the response arrives incrementally (``on_text`` gets the
+    text so far) and, with ``early_stop``, the request is closed as soon as
+    every template section has been written instead of running on to
+    ``max_tokens``.
+    """
     
-    prompt = create_deep_research_prompt(question, question_id)
+    messages = deep_research_messages(question, question_id)
     
     try:
         print(f"🔬 Conducting deep research for Question #{question_id}...")
+
+        # Lower temperature for more consistent, factual responses
+        if not stream:
+            return complete(DEEP_RESEARCH_MODEL, messages, temperature=0.3, max_tokens=2000)
         
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a senior medical researcher with expertise in evidence-based medicine, clinical guidelines, and patient safety. You have access to the latest medical databases and authoritative health organizations. Your responses are thorough, accurate, and prioritize patient safety."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000,
-            temperature=0.3  # Lower temperature for more consistent, factual responses
-        )
-        
-        return response.choices[0].message.content.strip()
+        stop = (lambda text: template_end(text) is not None) if early_stop else None
+        text = stream_complete(DEEP_RESEARCH_MODEL, messages, temperature=0.3, max_tokens=2000,
+                               on_text=on_text, stop=stop)
+        end = template_end(text) if early_stop else None
+        return text[:end].rstrip() if end is not None else text
         
     except Exception as e:
         print(f"Error generating deep research response: {e}")
         return ""
 
-def update_questions_with_deep_research():
+def update_questions_with_deep_research(stream=True, early_stop=True):
     """Update all questions with deep research responses"""
     
     # Load existing questions
@@ -192,26 +262,60 @@ def update_questions_with_deep_research():
     
     print(f"🔬 Starting deep research for {len(questions)} questions...")
     
+    # Streamed responses are checkpointed as "partial" records at every
+    # section boundary; the last record per question is the finished one
+    store = ResultStore(STORE_DIR / "deep_research.jsonl")
+    
     # Generate deep research responses
     for i, question_data in enumerate(questions):
         question = question_data['question']
         question_id = question_data['id']
+        key = record_key(question_id, DEEP_RESEARCH_MODEL, None, DEEP_RESEARCH_PROMPT_VERSION)
         
         print(f"\n📋 Processing Question #{question_id}: {question[:60]}...")
         
-        # Generate deep research response
-        deep_response = generate_deep_research_response(question, question_id)
+        def save(text, status):
+            store.append({
+                'question_id': question_id,
+                'model': DEEP_RESEARCH_MODEL,
+                'evaluator': None,
+                'prompt_version': DEEP_RESEARCH_PROMPT_VERSION,
+                'question': question,
+                'response': text,
+                'status': status,
+                'sections': sections_completed(text)
+            })
+        
+        progress = {'sections': 0}
+        
+        def on_text(text):
+            sections = sections_completed(text)
+            if sections > progress['sections']:
+                progress['sections'] = sections
+                save(text, 'partial')
+                print(f"  ✍️  {sections}/{len(REQUIRED_SECTIONS)} sections")
+        
+        stored = store.get(key)
+        if stored is not None and stored.get('status', 'complete') == 'complete':
+            deep_response = stored['response']
+            print("  ⏭️  Reusing stored deep research response")
+        else:
+            # Generate deep research response
+            with call_context(stage="deep_research", question_id=question_id, subject_model=DEEP_RESEARCH_MODEL):
+                deep_response = generate_deep_research_response(question, question_id, stream=stream,
+                                                                early_stop=early_stop, on_text=on_text)
+            if deep_response:
+                save(deep_response, 'complete')
         
         if deep_response:
             # Update the response field with deep research
             questions[i]['response'] = deep_response
-            questions[i]['source'] = "Deep Research - GPT-4"
+            questions[i]['source'] = f"Deep Research - {get_registry().display_name(DEEP_RESEARCH_MODEL)}"
             print(f"✅ Deep research completed for Q#{question_id}")
         else:
             print(f"❌ Failed to generate deep research for Q#{question_id}")
-        
-        # Rate limiting to avoid API limits
-        time.sleep(3)
+    
+    store.close()
     
     # Save updated questions
     with open('data/questions.json', 'w') as f:
@@ -219,6 +323,8 @@ def update_questions_with_deep_research():
     
     print(f"\n🎉 Deep research completed for all {len(questions)} questions!")
     print("📁 Updated data saved to data/questions.json")
+    print_cache_stats()
+    print_metrics_summary()
 
 def create_research_prompt_template():
     """Create a standalone prompt template for manual use"""
@@ -376,6 +482,12 @@ Begin your research now and provide a complete, well-structured response followi
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Generate deep research responses for all questions")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for each full response instead of streaming")
+    parser.add_argument("--no-early-stop", action="store_true",
+                        help="Keep generating after the last template section (up to max_tokens)")
+    args = parser.parse_args()
+    
     print("🔬 Deep Research Prompt Generator")
     print("=" * 50)
     
@@ -390,7 +502,7 @@ def main():
     choice = input("\nEnter your choice (1 or 2): ").strip()
     
     if choice == "1":
-        update_questions_with_deep_research()
+        update_questions_with_deep_research(stream=not args.no_stream, early_stop=not args.no_early_stop)
     else:
         print("✅ Prompt template created. You can use it manually with ChatGPT.")
 
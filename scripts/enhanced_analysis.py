@@ -1,34 +1,105 @@
 import json
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
-import re
-from collections import Counter
 import warnings
-from scipy import stats
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from textstat import textstat
+
+from bootstrap_ci import bootstrap_rankings
+from call_metrics import load_call_metrics
+from columnar_store import is_fresh, read_evaluations, read_questions
+from ensemble_stats import ensemble_scores
+from feature_cache import FeatureCache, compute_features, compute_metrics
+from json_stream import JsonArrayStream
+from pairwise_stats import pairwise_tests, significance_stars
+from text_metrics import METRIC_NAMES
 
 warnings.filterwarnings('ignore')
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+# Matplotlib, textstat and NLTK are imported where they are used, so that
+# importing this module (and the CLI subcommands that do) stays fast
+
+def draw_model_comparison(data):
+    """Radar, score distribution, per-category bars and length-vs-quality scatter per model"""
+    import matplotlib.pyplot as plt
+    
+    df, models, criteria = data['scores'], data['models'], data['criteria']
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+    
+    # Radar chart for model comparison
+    model_scores = df.groupby('model')[criteria].mean()
+    
+    angles = np.linspace(0, 2 * np.pi, len(criteria), endpoint=False).tolist()
+    angles += angles[:1]  # Complete the circle
+    
+    for model in models:
+        values = model_scores.loc[model].values.tolist()
+        values += values[:1]  # Complete the circle
+        ax1.plot(angles, values, 'o-', linewidth=2, label=model)
+        ax1.fill(angles, values, alpha=0.25)
+    
+    ax1.set_xticks(angles[:-1])
+    ax1.set_xticklabels([c.replace('_', ' ').title() for c in criteria])
+    ax1.set_ylim(0, 5)
+    ax1.set_title('Model Performance Comparison', fontsize=14, fontweight='bold')
+    ax1.legend()
+    ax1.grid(True)
+    
+    # Overall score distribution
+    for model in models:
+        model_data = df[df['model'] == model]['overall_score']
+        ax2.hist(model_data, alpha=0.7, label=model, bins=10)
+    ax2.set_xlabel('Overall Score')
+    ax2.set_ylabel('Frequency')
+    ax2.set_title('Overall Score Distribution by Model', fontsize=14, fontweight='bold')
+    ax2.legend()
+    
+    # Performance by category
+    category_scores = df.groupby(['category', 'model'])['overall_score'].mean().unstack()
+    category_scores.plot(kind='bar', ax=ax3)
+    ax3.set_title('Performance by Category and Model', fontsize=14, fontweight='bold')
+    ax3.set_xlabel('Category')
+    ax3.set_ylabel('Average Overall Score')
+    ax3.tick_params(axis='x', rotation=45)
+    ax3.legend(title='Model')
+    
+    # Response length vs quality
+    for model in models:
+        model_data = df[df['model'] == model]
+        ax4.scatter(model_data['response_length'], model_data['overall_score'], 
+                   alpha=0.6, label=model)
+    ax4.set_xlabel('Response Length (words)')
+    ax4.set_ylabel('Overall Score')
+    ax4.set_title('Response Length vs Quality', fontsize=14, fontweight='bold')
+    ax4.legend()
+    
+    fig.tight_layout()
+    return fig
+
+def draw_criteria_analysis(data):
+    """Box plot of each criterion's scores per model"""
+    import matplotlib.pyplot as plt
+    
+    df, models, criteria = data['scores'], data['models'], data['criteria']
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    axes = axes.ravel()
+    
+    for i, criterion in enumerate(criteria):
+        criterion_data = [df[df['model'] == model][criterion].values 
+                        for model in models]
+        
+        axes[i].boxplot(criterion_data)
+        axes[i].set_xticks(range(1, len(models) + 1))
+        axes[i].set_xticklabels(models)
+        axes[i].set_title(f'{criterion.replace("_", " ").title()} Distribution', 
+                        fontsize=12, fontweight='bold')
+        axes[i].set_ylabel('Score')
+        axes[i].grid(True, alpha=0.3)
+    
+    fig.tight_layout()
+    return fig
 
 class EnhancedHealthAnalysis:
-    def __init__(self, data_path=None):
+    def __init__(self, data_path=None, use_feature_cache=True):
         """Initialize the analysis with data path"""
         if data_path is None:
             self.data_path = Path(__file__).resolve().parent.parent / "data"
@@ -37,35 +108,45 @@ class EnhancedHealthAnalysis:
         
         self.questions = None
         self.evaluations = None
+        self.evaluation_frame = None
         self.df = None
+        self.pairwise_results = None
+        self.bootstrap_results = None
+        self.agreement_results = None
         self.models = ['gpt-3.5-turbo', 'gpt-4', 'gpt-4-turbo']
         self.criteria = ['factual_accuracy', 'clarity', 'neutrality', 'helpfulness']
-        
-        # Set up plotting style
-        plt.style.use('default')
-        sns.set_palette("husl")
-        plt.rcParams['figure.figsize'] = (12, 8)
-        plt.rcParams['font.size'] = 11
+        self.feature_cache = FeatureCache() if use_feature_cache else False
     
     def load_data(self):
         """Load questions and evaluations data"""
         try:
-            with open(self.data_path / "questions.json") as f:
-                self.questions = json.load(f)
+            # Questions and evaluations are streamed record by record rather
+            # than parsed into memory up front
+            self.questions = JsonArrayStream(self.data_path / "questions.json")
+            
+            # Prefer the columnar store when it is up to date with the JSON
+            restructured_path = self.data_path / "evaluations_restructured.json"
+            evaluations_parquet = self.data_path / "evaluations.parquet"
+            questions_parquet = self.data_path / "questions.parquet"
+            if is_fresh(evaluations_parquet, restructured_path) and is_fresh(questions_parquet, restructured_path):
+                self.evaluation_frame = read_evaluations(evaluations_parquet).merge(
+                    read_questions(questions_parquet), on='question_id', how='left')
+                print("✅ Loaded columnar evaluations")
+                print(f"📊 Loaded {len(self.evaluation_frame)} model evaluations")
+                return True
             
             # Try to load restructured evaluations first
-            try:
-                with open(self.data_path / "evaluations_restructured.json") as f:
-                    self.evaluations = json.load(f)
-                print("✅ Loaded restructured evaluations")
-            except FileNotFoundError:
+            if restructured_path.exists():
+                self.evaluations = JsonArrayStream(restructured_path)
+                print("✅ Streaming restructured evaluations")
+            else:
                 # Fall back to original evaluations
-                with open(self.data_path / "evaluations.json") as f:
-                    self.evaluations = json.load(f)
+                self.evaluations = JsonArrayStream(self.data_path / "evaluations.json")
+                if not self.evaluations.path.exists():
+                    raise FileNotFoundError(self.evaluations.path)
                 print("⚠️  Using original evaluations (restructure recommended)")
             
-            print(f"📊 Loaded {len(self.questions)} questions")
-            print(f"📊 Loaded {len(self.evaluations)} evaluations")
+            print(f"📊 Reading evaluations from {self.evaluations.path.name}")
             
         except Exception as e:
             print(f"❌ Error loading data: {e}")
@@ -75,12 +156,19 @@ class EnhancedHealthAnalysis:
     
     def create_analysis_dataframe(self):
         """Create comprehensive analysis dataframe from restructured evaluations"""
+        if self.evaluation_frame is not None:
+            self.df = self._dataframe_from_columnar(self.evaluation_frame)
+            return self._finish_dataframe()
+        
         if not self.evaluations:
             print("❌ No evaluations loaded")
             return None
         
         analysis_data = []
+        responses = []
         
+        # Single streaming pass; text features are filled in afterwards in
+        # one batched, cached call
         for eval_item in self.evaluations:
             question_id = eval_item['id']
             question_text = eval_item['question']
@@ -88,20 +176,12 @@ class EnhancedHealthAnalysis:
             
             # Categorize question type
             category = self._categorize_question(question_text)
+            ground_truth_length = len(ground_truth.split())
             
             # Process each model's evaluation
             for model_name, model_eval in eval_item.get('evaluations', {}).items():
                 response = model_eval.get('response', '')
-                
-                # Calculate response characteristics
-                response_length = len(response.split())
-                ground_truth_length = len(ground_truth.split())
-                
-                # Calculate readability scores
-                readability_scores = self._calculate_readability(response)
-                
-                # Calculate vocabulary diversity
-                vocab_diversity = self._calculate_vocabulary_diversity(response)
+                responses.append(response)
                 
                 analysis_data.append({
                     'id': question_id,
@@ -115,25 +195,126 @@ class EnhancedHealthAnalysis:
                     'justification': model_eval.get('justification', ''),
                     'response': response,
                     'ground_truth': ground_truth,
-                    'response_length': response_length,
+                    'response_length': None,
                     'ground_truth_length': ground_truth_length,
-                    'flesch_reading_ease': readability_scores['flesch_reading_ease'],
-                    'flesch_kincaid_grade': readability_scores['flesch_kincaid_grade'],
-                    'vocab_diversity': vocab_diversity,
-                    'sentence_count': len(sent_tokenize(response)),
-                    'avg_sentence_length': response_length / max(len(sent_tokenize(response)), 1)
+                    'flesch_reading_ease': None,
+                    'flesch_kincaid_grade': None,
+                    'vocab_diversity': None,
+                    'sentence_count': None,
+                    'avg_sentence_length': None
                 })
         
-        self.df = pd.DataFrame(analysis_data)
+        for row, text_features in zip(analysis_data, compute_features(responses, cache=self.feature_cache)):
+            row.update(text_features)
         
+        self.df = pd.DataFrame(analysis_data)
+        return self._finish_dataframe()
+    
+    def _dataframe_from_columnar(self, frame):
+        """Build the analysis dataframe column-wise from the long-format store"""
+        responses = frame['response'].astype(str)
+        questions = frame['question'].astype(str)
+        ground_truth = frame['ground_truth'].astype(str)
+        
+        features = pd.DataFrame(compute_features(responses.tolist(), cache=self.feature_cache),
+                                index=frame.index)
+        categories = {q: self._categorize_question(q) for q in questions.unique()}
+        
+        return pd.DataFrame({
+            'id': frame['question_id'],
+            'question': questions.where(questions.str.len() <= 100, questions.str[:100] + '...'),
+            'category': questions.map(categories),
+            'model': frame['model'].astype(str),
+            'factual_accuracy': frame['factual_accuracy'],
+            'clarity': frame['clarity'],
+            'neutrality': frame['neutrality'],
+            'helpfulness': frame['helpfulness'],
+            'justification': frame['justification'],
+            'response': responses,
+            'ground_truth': ground_truth,
+            'response_length': features['response_length'],
+            'ground_truth_length': ground_truth.str.split().str.len(),
+            'flesch_reading_ease': features['flesch_reading_ease'],
+            'flesch_kincaid_grade': features['flesch_kincaid_grade'],
+            'vocab_diversity': features['vocab_diversity'],
+            'sentence_count': features['sentence_count'],
+            'avg_sentence_length': features['avg_sentence_length']
+        }).reset_index(drop=True)
+    
+    def _finish_dataframe(self):
+        """Add derived score columns and report what was built"""
         # Calculate overall score
         self.df['overall_score'] = self.df[self.criteria].mean(axis=1)
         
+        # Reference-overlap metrics (ROUGE-1, ROUGE-L, BLEU) against ground truth
+        metrics = compute_metrics(zip(self.df['ground_truth'], self.df['response']), cache=self.feature_cache)
+        self.df[METRIC_NAMES] = pd.DataFrame(metrics, columns=METRIC_NAMES, index=self.df.index)
+        
         print(f"📊 Created analysis dataframe with {len(self.df)} entries")
         print(f"📈 Models: {self.df['model'].unique()}")
         print(f"🏥 Categories: {self.df['category'].value_counts().to_dict()}")
         
         return self.df
+
+    def join_call_metrics(self, path=None):
+        """Add per-response latency, token and cost columns from the LLM call metrics"""
+        if self.df is None:
+            print("❌ Please create analysis dataframe first")
+            return None
+    
+        calls = load_call_metrics(path) if path else load_call_metrics()
+        if calls.empty or 'subject_model' not in calls:
+            print("📈 No LLM call metrics recorded yet; skipping metrics join")
+            return self.df
+    
+        calls = calls[calls['error'].isna() & calls['subject_model'].notna() & calls['question_id'].notna()].copy()
+        # A batch judge call scores several models at once; split its cost evenly
+        calls['subject_model'] = calls['subject_model'].astype(str).str.split(',')
+        shares = calls['subject_model'].str.len()
+        for column in ['prompt_tokens', 'completion_tokens', 'cost_usd']:
+            calls[column] = calls[column] / shares
+        calls = calls.explode('subject_model')
+        calls['stage'] = calls['stage'].replace({'batch_judge': 'judge'})
+    
+        # Reruns append new calls; the latest call per response and stage wins
+        latest = calls.sort_values('ts').groupby(['question_id', 'subject_model', 'stage']).last()
+        latency = latest['latency_s'].unstack('stage').add_suffix('_latency_s')
+        totals = latest.groupby(level=['question_id', 'subject_model'])[
+            ['prompt_tokens', 'completion_tokens', 'cost_usd']].sum(min_count=1)
+        per_response = latency.join(totals).reset_index().rename(
+            columns={'question_id': 'id', 'subject_model': 'model'})
+        per_response['id'] = per_response['id'].astype(self.df['id'].dtype, errors='ignore')
+    
+        self.df = self.df.drop(columns=[c for c in per_response.columns if c in self.df and c not in ('id', 'model')])
+        self.df = self.df.merge(per_response, on=['id', 'model'], how='left')
+        print(f"📈 Joined call metrics for {per_response.shape[0]} responses")
+        return self.df
+    
+    def join_ensemble(self, path=None, method="mean", trim=0.2):
+        """
+        Add ensemble (multi-judge) scores, per-response judge agreement and
+        review flags from ``ensemble_judging.py`` (see ``ensemble_stats``)
+        """
+        if self.df is None:
+            print("❌ Please create analysis dataframe first")
+            return None
+        
+        path = Path(path) if path else self.data_path / "evaluations_ensemble.json"
+        if not path.exists():
+            print("⚖️  No ensemble judgments yet (run ensemble_judging.py); skipping ensemble join")
+            return self.df
+        
+        with open(path) as f:
+            judgments = pd.DataFrame(json.load(f))
+        scores, self.agreement_results = ensemble_scores(judgments, self.criteria, method=method, trim=trim)
+        scores = scores.rename(columns={'question_id': 'id'})
+        scores['id'] = scores['id'].astype(self.df['id'].dtype, errors='ignore')
+        
+        self.df = self.df.drop(columns=[c for c in scores.columns if c in self.df and c not in ('id', 'model')])
+        self.df = self.df.merge(scores, on=['id', 'model'], how='left')
+        print(f"⚖️  Joined {method} scores of {judgments['evaluator'].nunique()} judges for {len(scores)} responses "
+              f"({int(scores['judge_disagreement'].sum())} flagged for review)")
+        return self.df
     
     def _categorize_question(self, question):
         """Categorize question based on content"""
@@ -152,28 +333,13 @@ class EnhancedHealthAnalysis:
         else:
             return 'General Health'
     
-    def _calculate_readability(self, text):
-        """Calculate readability scores for text"""
-        try:
-            return {
-                'flesch_reading_ease': textstat.flesch_reading_ease(text),
-                'flesch_kincaid_grade': textstat.flesch_kincaid_grade(text)
-            }
-        except:
-            return {'flesch_reading_ease': 0, 'flesch_kincaid_grade': 0}
-    
-    def _calculate_vocabulary_diversity(self, text):
-        """Calculate vocabulary diversity (type-token ratio)"""
-        try:
-            tokens = word_tokenize(text.lower())
-            if len(tokens) == 0:
-                return 0
-            return len(set(tokens)) / len(tokens)
-        except:
-            return 0
-    
-    def model_comparison_analysis(self):
-        """Perform comprehensive model comparison analysis"""
+    def model_comparison_analysis(self, test="ttest", correction="holm"):
+        """
+        Perform comprehensive model comparison analysis.
+
+        Returns per-model means, per-category means and a tidy DataFrame of
+        paired tests between every pair of models (see ``pairwise_stats``).
+        """
         if self.df is None:
             print("❌ No data loaded. Run create_analysis_dataframe() first.")
             return
@@ -186,25 +352,60 @@ class EnhancedHealthAnalysis:
         print("\n📊 Overall Performance by Model:")
         print(model_performance.round(3))
         
-        # 2. Statistical significance testing
-        print("\n📈 Statistical Significance Tests:")
-        for criterion in self.criteria + ['overall_score']:
+        # 2. Statistical significance testing: paired tests over shared questions
+        self.pairwise_results = pairwise_tests(self.df, self.criteria + ['overall_score'],
+                                               test=test, correction=correction)
+        n_significant = int(self.pairwise_results['significant'].sum())
+        print(f"\n📈 Statistical Significance Tests (paired {test}, {correction} correction): "
+              f"{n_significant}/{len(self.pairwise_results)} significant")
+        for criterion, tests in self.pairwise_results.groupby('criterion', sort=False):
             print(f"\n{criterion.replace('_', ' ').title()}:")
-            for i, model1 in enumerate(self.models):
-                for model2 in self.models[i+1:]:
-                    scores1 = self.df[self.df['model'] == model1][criterion].dropna()
-                    scores2 = self.df[self.df['model'] == model2][criterion].dropna()
-                    
-                    if len(scores1) > 0 and len(scores2) > 0:
-                        t_stat, p_value = stats.ttest_ind(scores1, scores2)
-                        print(f"  {model1} vs {model2}: p={p_value:.4f} {'***' if p_value < 0.001 else '**' if p_value < 0.01 else '*' if p_value < 0.05 else ''}")
+            shown = tests if len(tests) <= 10 else tests[tests['significant']]
+            for row in shown.itertuples():
+                print(f"  {row.model_a} vs {row.model_b}: diff={row.mean_diff:+.3f} "
+                      f"p={row.p_value:.4f} p_adj={row.p_adjusted:.4f} {significance_stars(row.p_adjusted)}")
+            if len(shown) < len(tests):
+                print(f"  ... {len(tests) - len(shown)} non-significant pairs not shown")
         
         # 3. Performance by category
         print("\n🏥 Performance by Category:")
         category_performance = self.df.groupby(['category', 'model'])['overall_score'].mean().unstack()
         print(category_performance.round(3))
         
-        return model_performance, category_performance
+        return model_performance, category_performance, self.pairwise_results
+    
+    def bootstrap_analysis(self, n_resamples=10000, level=0.95, backend="numpy", workers=None, seed=0):
+        """
+        Bootstrap confidence intervals for model and category means and for
+        model rankings, resampling questions (see ``bootstrap_ci``)
+        """
+        if self.df is None:
+            print("❌ No data loaded. Run create_analysis_dataframe() first.")
+            return
+        
+        print(f"\n🎲 BOOTSTRAP CONFIDENCE INTERVALS ({n_resamples} resamples, {level:.0%})")
+        print("=" * 50)
+        
+        self.bootstrap_results = bootstrap_rankings(self.df, 'overall_score', n_resamples=n_resamples, level=level,
+                                                    seed=seed, backend=backend, workers=workers)
+        
+        print("\n🥇 Overall Score by Model:")
+        for row in self.bootstrap_results['models'].itertuples():
+            print(f"  {row.model}: {row.mean:.3f} [{row.ci_low:.3f}, {row.ci_high:.3f}]  "
+                  f"P(best)={row.p_best:.2f}  rank {row.expected_rank:.2f} "
+                  f"[{row.rank_ci_low:.0f}-{row.rank_ci_high:.0f}]")
+        
+        print("\n⚖️  Pairwise (share of resamples where A beats B):")
+        for row in self.bootstrap_results['pairwise'].itertuples():
+            print(f"  {row.model_a} vs {row.model_b}: diff={row.mean_diff:+.3f} "
+                  f"[{row.ci_low:+.3f}, {row.ci_high:+.3f}]  P(A>B)={row.p_a_better:.2f}")
+        
+        print(f"\n🏥 Category Means ({level:.0%} CI width):")
+        categories = self.bootstrap_results['categories']
+        widths = categories.assign(width=categories['ci_high'] - categories['ci_low'])
+        print(widths.pivot(index='category', columns='model', values='width').round(3))
+        
+        return self.bootstrap_results
     
     def response_quality_analysis(self):
         """Analyze response quality characteristics"""
@@ -287,95 +488,58 @@ class EnhancedHealthAnalysis:
             print(f"    Low accuracy responses: {low_acc_count}")
             print(f"    Low helpfulness responses: {low_help_count}")
     
-    def create_visualizations(self, output_dir=None):
-        """Create comprehensive visualizations"""
+    def create_visualizations(self, output_dir=None, draft=False, workers=None, force=False):
+        """
+        Create comprehensive visualizations (headless, in parallel, skipping
+        figures whose inputs are unchanged; see ``figure_renderer``)
+        """
         if self.df is None:
             print("❌ No data loaded. Run create_analysis_dataframe() first.")
             return
         
+        from figure_renderer import render_figures
+        
         if output_dir is None:
             output_dir = Path(__file__).resolve().parent.parent / "results" / "figures"
         
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
         print(f"\n📊 Creating visualizations in: {output_dir}")
         
-        # 1. Model Performance Comparison
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
-        
-        # Radar chart for model comparison
-        model_scores = self.df.groupby('model')[self.criteria].mean()
-        
-        angles = np.linspace(0, 2 * np.pi, len(self.criteria), endpoint=False).tolist()
-        angles += angles[:1]  # Complete the circle
-        
-        for i, model in enumerate(self.models):
-            values = model_scores.loc[model].values.tolist()
-            values += values[:1]  # Complete the circle
-            ax1.plot(angles, values, 'o-', linewidth=2, label=model)
-            ax1.fill(angles, values, alpha=0.25)
-        
-        ax1.set_xticks(angles[:-1])
-        ax1.set_xticklabels([c.replace('_', ' ').title() for c in self.criteria])
-        ax1.set_ylim(0, 5)
-        ax1.set_title('Model Performance Comparison', fontsize=14, fontweight='bold')
-        ax1.legend()
-        ax1.grid(True)
-        
-        # Overall score distribution
-        for model in self.models:
-            model_data = self.df[self.df['model'] == model]['overall_score']
-            ax2.hist(model_data, alpha=0.7, label=model, bins=10)
-        ax2.set_xlabel('Overall Score')
-        ax2.set_ylabel('Frequency')
-        ax2.set_title('Overall Score Distribution by Model', fontsize=14, fontweight='bold')
-        ax2.legend()
-        
-        # Performance by category
-        category_scores = self.df.groupby(['category', 'model'])['overall_score'].mean().unstack()
-        category_scores.plot(kind='bar', ax=ax3)
-        ax3.set_title('Performance by Category and Model', fontsize=14, fontweight='bold')
-        ax3.set_xlabel('Category')
-        ax3.set_ylabel('Average Overall Score')
-        ax3.tick_params(axis='x', rotation=45)
-        ax3.legend(title='Model')
-        
-        # Response length vs quality
-        for model in self.models:
-            model_data = self.df[self.df['model'] == model]
-            ax4.scatter(model_data['response_length'], model_data['overall_score'], 
-                       alpha=0.6, label=model)
-        ax4.set_xlabel('Response Length (words)')
-        ax4.set_ylabel('Overall Score')
-        ax4.set_title('Response Length vs Quality', fontsize=14, fontweight='bold')
-        ax4.legend()
-        
-        plt.tight_layout()
-        plt.savefig(output_dir / 'model_comparison_analysis.png', dpi=300, bbox_inches='tight')
-        plt.show()
-        
-        # 2. Detailed criteria analysis
-        fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-        axes = axes.ravel()
-        
-        for i, criterion in enumerate(self.criteria):
-            criterion_data = [self.df[self.df['model'] == model][criterion].values 
-                            for model in self.models]
-            
-            axes[i].boxplot(criterion_data, labels=self.models)
-            axes[i].set_title(f'{criterion.replace("_", " ").title()} Distribution', 
-                            fontsize=12, fontweight='bold')
-            axes[i].set_ylabel('Score')
-            axes[i].grid(True, alpha=0.3)
+        data = {
+            'scores': self.df[['model', 'category', 'overall_score', 'response_length'] + self.criteria],
+            'models': self.models,
+            'criteria': self.criteria,
+        }
+        figures = {
+            'model_comparison_analysis.png': (draw_model_comparison, data),
+            'criteria_analysis.png': (draw_criteria_analysis, data),
+        }
+        summary = render_figures(figures, output_dir, draft=draft, workers=workers, force=force)
+        
+        print(f"✅ Visualizations saved successfully! ({len(summary['rendered'])} rendered, "
+              f"{len(summary['skipped'])} up to date)")
+        return summary
+    
+    def export_statistics(self, output_dir=None):
+        """Export the pairwise test and bootstrap tables"""
+        if output_dir is None:
+            output_dir = Path(__file__).resolve().parent.parent / "results"
         
-        plt.tight_layout()
-        plt.savefig(output_dir / 'criteria_analysis.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
         
-        print("✅ Visualizations saved successfully!")
+        if self.pairwise_results is not None:
+            self.pairwise_results.to_csv(output_dir / 'pairwise_tests.csv', index=False)
+        if self.bootstrap_results is not None:
+            for name, frame in self.bootstrap_results.items():
+                frame.to_csv(output_dir / f'bootstrap_{name}.csv', index=False)
+        if self.agreement_results is not None:
+            self.agreement_results.to_csv(output_dir / 'judge_agreement.csv', index=False)
     
-    def export_results(self, output_dir=None):
-        """Export analysis results to files"""
+    def export_results(self, output_dir=None, include_statistics=True):
+        """
+        Export analysis results to files (the statistics tables too unless
+        ``include_statistics`` is False, e.g. when they were written earlier)
+        """
         if self.df is None:
             print("❌ No data loaded. Run create_analysis_dataframe() first.")
             return
@@ -383,6 +547,7 @@ class EnhancedHealthAnalysis:
         if output_dir is None:
             output_dir = Path(__file__).resolve().parent.parent / "results"
         
+        output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # Export detailed scores
@@ -391,6 +556,14 @@ class EnhancedHealthAnalysis:
                            'flesch_reading_ease', 'vocab_diversity']].copy()
         
         export_df.to_csv(output_dir / 'enhanced_scores.csv', index=False)
+        if include_statistics:
+            self.export_statistics(output_dir)
+        if 'judge_disagreement' in self.df:
+            # Responses whose judges disagree, with every judge's scores, for review
+            judge_columns = [c for c in self.df.columns if c.split('__')[0] in self.criteria and '__' in c]
+            flagged = self.df[self.df['judge_disagreement'].fillna(False).astype(bool)]
+            flagged[['id', 'model', 'judge_range', 'judge_alpha'] + judge_columns].to_csv(
+                output_dir / 'judge_disagreements.csv', index=False)
         
         # Create summary report
         with open(output_dir / 'enhanced_analysis_summary.txt', 'w') as f:
@@ -410,6 +583,11 @@ class EnhancedHealthAnalysis:
             model_performance = self.df.groupby('model')['overall_score'].agg(['mean', 'std'])
             for model, stats in model_performance.iterrows():
                 f.write(f"• {model}: {stats['mean']:.2f} ± {stats['std']:.2f}\n")
+            if self.bootstrap_results is not None:
+                f.write("Bootstrap 95% CIs (resampling questions):\n")
+                for row in self.bootstrap_results['models'].itertuples():
+                    f.write(f"• {row.model}: {row.mean:.3f} [{row.ci_low:.3f}, {row.ci_high:.3f}], "
+                            f"P(best)={row.p_best:.2f}\n")
             f.write("\n")
             
             # Category performance
@@ -425,10 +603,26 @@ class EnhancedHealthAnalysis:
             low_helpfulness_count = len(self.df[self.df['helpfulness'] <= 2])
             f.write(f"• Low accuracy responses (≤2): {low_accuracy_count}\n")
             f.write(f"• Low helpfulness responses (≤2): {low_helpfulness_count}\n")
+            
+            if self.agreement_results is not None:
+                f.write("\nJUDGE AGREEMENT:\n")
+                alphas = self.agreement_results[self.agreement_results['judge_a'] == 'all']
+                for row in alphas.itertuples():
+                    f.write(f"• {row.criterion}: Krippendorff's alpha = {row.value:.3f}\n")
+                if 'judge_disagreement' in self.df:
+                    f.write(f"• Responses flagged for review: {int(self.df['judge_disagreement'].fillna(False).sum())}\n")
         
         print(f"✅ Results exported to: {output_dir}")
         print("  • enhanced_scores.csv - Detailed scores for each model evaluation")
         print("  • enhanced_analysis_summary.txt - Comprehensive analysis summary")
+        if self.pairwise_results is not None:
+            print("  • pairwise_tests.csv - Paired significance tests between models")
+        if self.bootstrap_results is not None:
+            print("  • bootstrap_{models,categories,pairwise}.csv - Bootstrap confidence intervals")
+        if self.agreement_results is not None:
+            print("  • judge_agreement.csv - Krippendorff's alpha and Cohen's kappa between judges")
+        if 'judge_disagreement' in self.df:
+            print("  • judge_disagreements.csv - Responses flagged for review")
 
 def main():
     """Main analysis function"""
@@ -439,9 +633,12 @@ def main():
     
     # Create analysis dataframe
     analyzer.create_analysis_dataframe()
+    analyzer.join_call_metrics()
+    analyzer.join_ensemble()
     
     # Perform analyses
     analyzer.model_comparison_analysis()
+    analyzer.bootstrap_analysis()
     analyzer.response_quality_analysis()
     analyzer.safety_and_bias_analysis()
     
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Ensemble judging: every model response is scored by several judge models.
+
+A single GPT-4 judge lets one model's biases drive every result. Here each
+(question, response) is fanned out to every judge in the ``judges`` model
+set of ``config/providers.json`` (or ``--judges``). All judge calls share
+one worker pool, whose size caps the requests in flight across every
+judge, and each provider still applies its own concurrency and rate limits.
+A judge's record is committed to ``data/store/ensemble_evaluations.jsonl``
+as soon as it is parsed, so an interrupted run resumes where it stopped;
+judging with GPT-4 again hits the LLM cache entries of the single-judge run.
+
+The per-judge scores are written to ``data/evaluations_ensemble.json``
+(one row per question, model and judge). They are aggregated, and agreement
+is reported with ``ensemble_stats``; ``EnhancedHealthAnalysis.join_ensemble``
+adds the ensemble columns to the analysis dataframe.
+
+Usage:
+    python scripts/ensemble_judging.py
+    python scripts/ensemble_judging.py --judges gpt-4,claude-3-sonnet --concurrency 16
+"""
+
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from call_metrics import call_context, print_metrics_summary
+from completion_index import CompletionIndex
+from judge_prompts import judge_messages
+from llm_cache import print_cache_stats
+from providers import complete, get_registry
+from question_source import iter_questions
+from restructure_evaluations import PROMPT_VERSION, build_evaluation_prompt, build_record
+from result_store import SCORE_FIELDS, STORE_DIR, ResultStore, record_key
+
+# Load environment variables
+load_dotenv()
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data"
+ENSEMBLE_PATH = DATA_PATH / "evaluations_ensemble.json"
+JUDGE_SET = "judges"
+
+
+def judge_with(judge, prompt):
+    """One judge call; returns the raw judge output"""
+    return complete(judge, judge_messages(prompt), temperature=0)
+
+
+def export_ensemble(store, judges, output_path=ENSEMBLE_PATH):
+    """Write the long-format per-judge scores (no response text) for analysis"""
+    rows = [
+        {
+            "question_id": record["question_id"],
+            "model": record["model"],
+            "evaluator": record["evaluator"],
+            **{field: record.get(field) for field in SCORE_FIELDS},
+            "justification": record.get("justification", ""),
+        }
+        for record in store.records()
+        if record.get("evaluator") in judges and record.get("prompt_version") == PROMPT_VERSION
+    ]
+    rows.sort(key=lambda row: (row["question_id"], row["model"], row["evaluator"]))
+    with open(output_path, "w") as f:
+        json.dump(rows, f, indent=2)
+    return rows
+
+
+def run_ensemble(judges=None, concurrency=8, data_path=None, store_dir=STORE_DIR, output_path=None):
+    """
+    Judge every response in ``questions.json`` with every judge.
+
+    ``concurrency`` is the number of judge calls in flight across all
+    judges. Returns the long-format rows written to ``output_path``.
+    """
+    data_path = Path(data_path) if data_path else DATA_PATH
+    output_path = Path(output_path) if output_path else data_path / ENSEMBLE_PATH.name
+    judges = list(judges or get_registry().model_set(JUDGE_SET))
+    if len(judges) < 2:
+        raise ValueError(f"Ensemble judging needs at least two judges, got {judges}")
+
+    store = ResultStore(Path(store_dir) / "ensemble_evaluations.jsonl")
+    index = CompletionIndex.load(store.path)
+
+    tasks = []
+    for question in iter_questions(data_path):
+        for model_name, response in question.get("aiResponse", {}).items():
+            for judge in judges:
+                if not index.is_done(record_key(question.get("id"), model_name, judge, PROMPT_VERSION), response):
+                    tasks.append((question.get("id"), question.get("question"), question.get("answer"),
+                                  model_name, response, judge))
+
+    print(f"⚖️  Ensemble of {len(judges)} judges: {', '.join(judges)}")
+    print(f"📂 {len(index)} judgments already in the store, {len(tasks)} pending "
+          f"(up to {concurrency} in flight)")
+
+    def judge_task(task):
+        question_id, question_text, ground_truth, model_name, response, judge = task
+        prompt = build_evaluation_prompt(question_text, response, ground_truth)
+        with call_context(stage="ensemble_judge", question_id=question_id, subject_model=model_name):
+            return judge_with(judge, prompt)
+
+    failed = 0
+    # The shared pool is the limiter: each task is one judge call
+    with store, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(judge_task, task): task for task in tasks}
+        for future in as_completed(futures):
+            question_id, question_text, ground_truth, model_name, response, judge = futures[future]
+            try:
+                eval_text = future.result()
+            except Exception as e:
+                eval_text = None
+                print(f"    Error from {judge} on Q{question_id} ({model_name}): {e}")
+            if not eval_text:
+                failed += 1
+                continue
+            record = build_record(question_id, question_text, ground_truth, model_name, response,
+                                  eval_text, evaluator=judge)
+            store.append(record)
+            index.add_record(record)
+    index.save()
+
+    rows = export_ensemble(store, judges, output_path)
+    print(f"\n✅ {len(rows)} judge scores saved to: {output_path}" + (f" ({failed} calls failed)" if failed else ""))
+    return rows
+
+
+def print_agreement(rows, method="mean"):
+    import pandas as pd
+
+    from ensemble_stats import DISAGREEMENT_RANGE, ensemble_scores
+
+    scores, agreement = ensemble_scores(pd.DataFrame(rows), list(SCORE_FIELDS), method=method)
+    print("\n🤝 Inter-judge agreement:")
+    for row in agreement[agreement["judge_a"] == "all"].itertuples():
+        print(f"  {row.criterion}: Krippendorff's alpha = {row.value:.3f} ({row.n} scores)")
+    kappas = agreement[agreement["judge_a"] != "all"]
+    for (judge_a, judge_b), pair in kappas.groupby(["judge_a", "judge_b"], sort=False):
+        print(f"  {judge_a} vs {judge_b}: mean weighted kappa = {pair['value'].mean():.3f}")
+    print(f"🚩 {int(scores['judge_disagreement'].sum())}/{len(scores)} responses flagged for review "
+          f"(judges {DISAGREEMENT_RANGE}+ points apart on some criterion)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score every response with an ensemble of judge models")
+    parser.add_argument("--judges", default=None,
+                        help=f"Comma-separated judge models (default: the '{JUDGE_SET}' set in config/providers.json)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Judge calls in flight across all judges")
+    parser.add_argument("--aggregate", choices=["mean", "median", "trimmed"], default="mean",
+                        help="How judge scores are combined in the summary")
+    args = parser.parse_args()
+    judges = args.judges.split(",") if args.judges else None
+    rows = run_ensemble(judges=judges, concurrency=args.concurrency)
+    if rows:
+        print_agreement(rows, method=args.aggregate)
+    print_cache_stats()
+    print_metrics_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Aggregation and inter-judge agreement for ensemble judging.
+
+Every response is scored by several judge models (``ensemble_judging.py``).
+Scores are pivoted once into a responses × judges matrix per criterion and
+everything is computed on those matrices:
+
+- the ensemble score per response: mean, median or trimmed mean over judges;
+- Krippendorff's alpha per criterion, plus a per-response alpha (the
+  response's own disagreement against the criterion's expected
+  disagreement), from one value-count matrix;
+- Cohen's kappa (weighted by default) for every pair of judges at once,
+  from one ``bincount`` over all pairs;
+- a review flag for responses whose judges are too far apart.
+
+Missing scores (a judge that failed or has not run yet) are NaN and are
+left out.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+AGGREGATIONS = ("mean", "median", "trimmed")
+METRICS = ("interval", "ordinal", "nominal")
+KAPPA_WEIGHTS = (None, "linear", "quadratic")
+AGREEMENT_COLUMNS = ["criterion", "statistic", "judge_a", "judge_b", "n", "value"]
+# Judges this many points apart on any criterion flag a response for review
+DISAGREEMENT_RANGE = 2
+
+
+def rating_matrices(df, criteria, judges=None, id_cols=("question_id", "model"), judge_col="evaluator"):
+    """
+    Pivot long-format judge scores to one responses × judges matrix per criterion.
+
+    Returns ``(index, judges, {criterion: matrix})``; every matrix shares the
+    same rows (``index``) and columns (``judges``).
+    """
+    table = df.pivot_table(index=list(id_cols), columns=judge_col, values=list(criteria),
+                           aggfunc="mean", observed=True)
+    if judges is None:
+        judges = sorted({str(judge) for judge in table.columns.get_level_values(1)})
+    matrices = {criterion: table[criterion].reindex(columns=list(judges)).to_numpy(dtype=float)
+                for criterion in criteria}
+    return table.index, list(judges), matrices
+
+
+def aggregate(ratings, method="mean", trim=0.2):
+    """
+    Combine each row of ``ratings`` (responses × judges) into one score.
+
+    ``trimmed`` drops ``floor(trim * n)`` scores from each end of the row's
+    ``n`` available scores before averaging, like ``scipy.stats.trim_mean``.
+    """
+    ratings = np.asarray(ratings, dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if method == "mean":
+            return np.nanmean(ratings, axis=1)
+        if method == "median":
+            return np.nanmedian(ratings, axis=1)
+    if method != "trimmed":
+        raise ValueError(f"Unknown aggregation {method!r}; expected one of {AGGREGATIONS}")
+    ordered = np.sort(ratings, axis=1)  # NaNs sort last
+    n = np.sum(~np.isnan(ratings), axis=1)
+    cut = np.floor(trim * n).astype(int)
+    position = np.arange(ratings.shape[1])
+    keep = (position >= cut[:, None]) & (position < (n - cut)[:, None])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(keep, ordered, 0.0).sum(axis=1) / keep.sum(axis=1)
+
+
+def _distances(values, totals, metric):
+    """Krippendorff's squared distance between every pair of observed values"""
+    if metric == "nominal":
+        return 1.0 - np.eye(len(values))
+    if metric == "interval":
+        return (values[:, None] - values[None, :]) ** 2
+    if metric == "ordinal":
+        # Squared count of values lying between the two ranks
+        cumulative = np.cumsum(totals)
+        low = np.minimum.outer(np.arange(len(values)), np.arange(len(values)))
+        high = np.maximum.outer(np.arange(len(values)), np.arange(len(values)))
+        between = cumulative[high] - cumulative[low] + totals[low] - (totals[:, None] + totals[None, :]) / 2
+        return np.where(low == high, 0.0, between) ** 2
+    raise ValueError(f"Unknown metric {metric!r}; expected one of {METRICS}")
+
+
+def krippendorff_alpha(ratings, metric="interval"):
+    """
+    Krippendorff's alpha for ``ratings`` (units × judges, NaN = missing).
+
+    Returns ``(alpha, unit_alpha)``. ``unit_alpha`` compares each unit's
+    observed disagreement with the expected disagreement of all units
+    (NaN for units with fewer than two scores); ``alpha`` is their average
+    weighted by the number of scores. Both are NaN if the scores never vary.
+    """
+    ratings = np.asarray(ratings, dtype=float)
+    valid = ~np.isnan(ratings)
+    m = valid.sum(axis=1)
+    pairable = m >= 2
+    unit_alpha = np.full(len(ratings), np.nan)
+    values = np.unique(ratings[valid & pairable[:, None]])
+    if len(values) == 0:
+        return np.nan, unit_alpha
+
+    # Units × values count matrix in one bincount
+    rows, cols = np.nonzero(valid & pairable[:, None])
+    codes = np.searchsorted(values, ratings[rows, cols])
+    counts = np.bincount(rows * len(values) + codes,
+                         minlength=len(ratings) * len(values)).reshape(len(ratings), len(values))
+    totals = counts.sum(axis=0).astype(float)
+    n = totals.sum()
+
+    delta = _distances(values, totals, metric)
+    expected = totals @ delta @ totals / (n * (n - 1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        within = ((counts @ delta) * counts).sum(axis=1) / (m - 1)
+        observed = within[pairable].sum() / n
+        if expected == 0:
+            return np.nan, unit_alpha
+        unit_alpha[pairable] = 1.0 - within[pairable] / m[pairable] / expected
+    return 1.0 - observed / expected, unit_alpha
+
+
+def pairwise_kappa(ratings, judges, weights="quadratic"):
+    """
+    Cohen's kappa between every pair of judges over the units both scored.
+
+    ``weights`` is ``None`` (unweighted), ``"linear"`` or ``"quadratic"``
+    (distances between the score values). Returns a DataFrame with
+    ``judge_a, judge_b, n, kappa``.
+    """
+    if weights not in KAPPA_WEIGHTS:
+        raise ValueError(f"Unknown weights {weights!r}; expected one of {KAPPA_WEIGHTS}")
+    ratings = np.asarray(ratings, dtype=float)
+    a, b = np.triu_indices(len(judges), k=1)
+    values = np.unique(ratings[~np.isnan(ratings)])
+    k = len(values)
+    if not len(a) or not k:
+        return pd.DataFrame({"judge_a": [judges[i] for i in a], "judge_b": [judges[j] for j in b],
+                             "n": 0, "kappa": np.nan})
+
+    codes = np.searchsorted(values, np.nan_to_num(ratings, nan=values[0]))
+    both = ~np.isnan(ratings[:, a]) & ~np.isnan(ratings[:, b])
+    # One pairs × k × k confusion tensor for all judge pairs
+    flat = np.arange(len(a)) * k * k + codes[:, a] * k + codes[:, b]
+    confusion = np.bincount(flat[both], minlength=len(a) * k * k).reshape(len(a), k, k).astype(float)
+    n = confusion.sum(axis=(1, 2))
+
+    if weights is None:
+        weight = 1.0 - np.eye(k)
+    else:
+        distance = np.abs(values[:, None] - values[None, :])
+        weight = distance if weights == "linear" else distance ** 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        observed = (confusion * weight).sum(axis=(1, 2)) / n
+        expected = np.einsum("pi,pj,ij->p", confusion.sum(axis=2), confusion.sum(axis=1), weight) / n ** 2
+        kappa = 1.0 - observed / expected
+    return pd.DataFrame({
+        "judge_a": np.asarray(judges, dtype=object)[a],
+        "judge_b": np.asarray(judges, dtype=object)[b],
+        "n": n.astype(int),
+        "kappa": np.where(expected > 0, kappa, np.nan),
+    })
+
+
+def ensemble_scores(df, criteria, judges=None, method="mean", trim=0.2, metric="interval",
+                    kappa_weights="quadratic", max_range=DISAGREEMENT_RANGE, id_cols=("question_id", "model"),
+                    judge_col="evaluator"):
+    """
+    Ensemble scores, per-response agreement and review flags.
+
+    ``df`` has one row per (response, judge) with a score column per
+    criterion. Returns ``(scores, agreement)``:
+
+    - ``scores``: one row per response with ``ensemble_<criterion>``,
+      ``ensemble_overall``, ``n_judges``, ``judge_alpha`` (mean per-response
+      alpha over criteria), ``judge_range`` (largest max − min judge score
+      on any criterion) and ``judge_disagreement`` (``judge_range >=
+      max_range``), plus ``<criterion>__<judge>`` with each judge's score;
+    - ``agreement``: a tidy table of Krippendorff's alpha per criterion and
+      Cohen's kappa per criterion and judge pair.
+    """
+    index, judges, matrices = rating_matrices(df, criteria, judges, id_cols, judge_col)
+    scores = index.to_frame(index=False)
+    unit_alphas, ranges, agreement = [], [], []
+    for criterion, ratings in matrices.items():
+        scores[f"ensemble_{criterion}"] = aggregate(ratings, method, trim)
+        for i, judge in enumerate(judges):
+            scores[f"{criterion}__{judge}"] = ratings[:, i]
+        alpha, unit_alpha = krippendorff_alpha(ratings, metric)
+        unit_alphas.append(unit_alpha)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            ranges.append(np.nanmax(ratings, axis=1) - np.nanmin(ratings, axis=1))
+        agreement.append(pd.DataFrame([{"criterion": criterion, "statistic": f"krippendorff_alpha_{metric}",
+                                        "judge_a": "all", "judge_b": "all",
+                                        "n": int(np.sum(~np.isnan(ratings))), "value": alpha}]))
+        kappa = pairwise_kappa(ratings, judges, kappa_weights)
+        agreement.append(kappa.rename(columns={"kappa": "value"}).assign(
+            criterion=criterion, statistic=f"cohen_kappa_{kappa_weights or 'unweighted'}"))
+
+    n_judges = np.stack([np.sum(~np.isnan(r), axis=1) for r in matrices.values()])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        scores["ensemble_overall"] = scores[[f"ensemble_{c}" for c in criteria]].mean(axis=1)
+        scores["n_judges"] = n_judges.max(axis=0)
+        scores["judge_alpha"] = np.nanmean(np.stack(unit_alphas), axis=0)
+        scores["judge_range"] = np.nanmax(np.stack(ranges), axis=0)
+    scores["judge_disagreement"] = scores["judge_range"] >= max_range
+    return scores, pd.concat(agreement, ignore_index=True)[AGREEMENT_COLUMNS]
@@ -1,148 +1,201 @@
+import argparse
 import openai
 import json
-import time
 import os
 from pathlib import Path
-import nltk
 from dotenv import load_dotenv
 
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-from rouge_score import rouge_scorer
-from nltk.tokenize import word_tokenize
+from async_evaluator import AsyncEvaluator
+from call_metrics import print_metrics_summary
+from completion_index import CompletionIndex
+from llm_cache import print_cache_stats
+from json_stream import JsonArrayStream
+from judge_prompts import JUDGE_INSTRUCTIONS, judge_prompt_version
+from result_store import STORE_DIR, ResultStore
+from text_metrics import compute_batch_metrics, score_pair
 
 # Load environment variables from .env file
 load_dotenv()
 
-nltk.download("punkt")
-
 # ✅ Set your OpenAI API key from environment variable
 openai.api_key = os.getenv("OPENAI_API_KEY")
 if not openai.api_key:
     raise ValueError("OPENAI_API_KEY environment variable is not set. Please create a .env file with your API key.")
 
-# ✅ Function to build the evaluation prompt
+# ✅ Function to build the per-item part of the evaluation prompt (the rubric
+# is the shared system message from judge_prompts)
 def build_prompt(question, gpt_response, ground_truth):
-    return f"""
-You are an evaluator assessing an AI-generated health response.
-
-Using a 1 to 5 scale, evaluate the response based on:
-1. Factual Accuracy – Is the response factually correct compared to the ground truth?
-2. Clarity – Is the response clearly written and easy to understand?
-3. Neutrality – Is it unbiased and culturally sensitive?
-4. Helpfulness – Does it provide useful and safe information?
-
-Respond in the format:
-Factual Accuracy: X
-Clarity: Y
-Neutrality: Z
-Helpfulness: W
-Justification: <brief explanation>
-
----
-
-Question: {question}
+    return f"""Question: {question}
 
 GPT-Generated Response: {gpt_response}
 
 Ground Truth Reference: {ground_truth}
 """
 
-# ✅ Function to send request to GPT
-def evaluate_with_gpt(prompt):
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"Error during evaluation: {e}")
-        return None
+# ✅ Identifies judge results in the append-only result store
+EVALUATOR_MODEL = "gpt-4"
+RESPONSE_MODEL = "gpt_response"
+PROMPT_VERSION = judge_prompt_version(build_prompt("{question}", "{gpt_response}", "{ground_truth}"))
 
 # ✅ Load data
-def load_data():
-    base = Path(__file__).resolve().parent.parent / "data"
-    with open(base / "questions.json") as f:
-        questions = json.load(f)
-    with open(base / "gpt_responses.json") as f:
-        responses = json.load(f)
-    with open(base / "ground_truth.json") as f:
-        ground_truth = json.load(f)
+def load_data(base=None):
+    base = Path(base) if base else Path(__file__).resolve().parent.parent / "data"
+    # Questions carry inline model responses and can be large; stream them
+    questions = JsonArrayStream(base / "questions.json")
     with open(base / "evaluations.json") as f:
         evaluations = json.load(f)
-    return questions, responses, ground_truth, evaluations
+    return questions, evaluations
 
 
 def compute_rouge_bleu(reference, generated):
-    scorer = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], use_stemmer=True)
-    scores = scorer.score(reference, generated)
+    # Shares the cached scorer/tokenizers of the batch engine; for many
+    # pairs use text_metrics.compute_batch_metrics directly
+    return score_pair(reference, generated)
 
-    ref_tokens = word_tokenize(reference.lower())
-    gen_tokens = word_tokenize(generated.lower())
-    bleu_score = sentence_bleu([ref_tokens], gen_tokens, smoothing_function=SmoothingFunction().method1)
 
-    return {
-        "rouge1": scores["rouge1"].fmeasure,
-        "rougeL": scores["rougeL"].fmeasure,
-        "bleu": bleu_score
-    }
+def add_metrics(entries):
+    """
+    Attach ROUGE/BLEU ``metrics`` to ``entries`` in one batch pass.
 
+    Returns False (and leaves the entries as they were) if scoring fails,
+    e.g. a missing NLTK tokenizer; the judgments are kept either way and
+    entries without metrics are scored again on the next run.
+    """
+    if not entries:
+        return True
+    try:
+        all_metrics = compute_batch_metrics([(ev.get("ground_truth"), ev.get("gpt_response")) for ev in entries])
+    except Exception as e:
+        print(f"⚠️  Could not compute ROUGE/BLEU for {len(entries)} evaluations: {e}")
+        return False
+    for ev, metric_scores in zip(entries, all_metrics):
+        ev["metrics"] = {
+            "rouge1": round(metric_scores["rouge1"], 3),
+            "rougeL": round(metric_scores["rougeL"], 3),
+            "bleu": round(metric_scores["bleu"], 3)
+        }
+    return True
+
+
+def evaluate_responses(data_dir=None, store_dir=STORE_DIR, concurrency=8, rpm=500, tpm=40000,
+                       max_retries=5, api_base=None):
+    """Judge every pending GPT response and merge the results into ``evaluations.json``"""
+    data_dir = Path(data_dir) if data_dir else Path(__file__).resolve().parent.parent / "data"
+    questions, evaluations = load_data(data_dir)
+
+    # Resume: fold in evaluations committed to the store by interrupted runs
+    store = ResultStore(Path(store_dir) / "legacy_evaluations.jsonl")
+    index = CompletionIndex.load(store.path)
+    evaluated_ids = {ev.get("id") for ev in evaluations}
+    restored = [
+        {
+            "id": record["question_id"],
+            "question": record["question"],
+            "gpt_response": record["response"],
+            "ground_truth": record["ground_truth"],
+            "evaluation": record["evaluation"],
+        }
+        for record in store.records()
+        if record.get("prompt_version") == PROMPT_VERSION and record["question_id"] not in evaluated_ids
+    ]
+    # Evaluations written by earlier versions of this script count as done
+    for ev in evaluations + restored:
+        if "id" in ev:
+            index.add((ev["id"], RESPONSE_MODEL, EVALUATOR_MODEL, PROMPT_VERSION), ev.get("gpt_response"))
+    pending = []
+
+    for i, question in enumerate(questions):
+        id = question.get("id")
+        q = question.get("question")
+        r = question.get("response")
+        gt = question.get("answer")
 
-# ✅ Main script
-if __name__ == "__main__":
-    questions, responses, truths, evaluations = load_data()
-    results = []
-
-    for i in range(len(questions)):
-        id = questions[i].get("id")
-        q = questions[i].get("question")
-        r = questions[i].get("response")
-        gt = questions[i].get("answer")
-
-        print(f"Evaluating Q{i + 1}: {q[:60]}...")
         # Skip if missing data or already evaluated
         if not q or not r or not gt:
             print(f"Skipping Q{i + 1} due to missing data...")
             continue
-        if any(ev.get("id") == id for ev in evaluations):
+        if index.is_done((id, RESPONSE_MODEL, EVALUATOR_MODEL, PROMPT_VERSION)):
             print(f"Skipping Q{i + 1} (already evaluated)")
             continue
 
-        prompt = build_prompt(q, r, gt)
-        eval_result = evaluate_with_gpt(prompt)
-        # metric_scores = compute_rouge_bleu(gt, r)
-
-
+        pending.append({"id": id, "question": q, "gpt_response": r, "ground_truth": gt})
+
+    print(f"Evaluating {len(pending)} responses with up to {concurrency} concurrent requests...")
+    evaluator = AsyncEvaluator(
+        model="gpt-4",
+        max_concurrency=concurrency,
+        requests_per_minute=rpm,
+        tokens_per_minute=tpm,
+        max_retries=max_retries,
+        api_base=api_base,
+        system_prompt=JUDGE_INSTRUCTIONS,
+    )
+    prompts = [build_prompt(item["question"], item["gpt_response"], item["ground_truth"]) for item in pending]
+
+    def commit(position, eval_result):
+        """Flush each evaluation to the store as soon as it completes"""
         if eval_result:
-            results.append({
-                "id": id,
-                "question": q,
-                "gpt_response": r,
-                "ground_truth": gt,
+            item = pending[position]
+            record = {
+                "question_id": item["id"],
+                "model": RESPONSE_MODEL,
+                "evaluator": EVALUATOR_MODEL,
+                "prompt_version": PROMPT_VERSION,
+                "question": item["question"],
+                "response": item["gpt_response"],
+                "ground_truth": item["ground_truth"],
                 "evaluation": eval_result,
-                # "metrics": {
-                #     "rouge1": round(metric_scores["rouge1"], 3),
-                #     "rougeL": round(metric_scores["rougeL"], 3),
-                #     "bleu": round(metric_scores["bleu"], 3)
-                # }
-            })
+            }
+            store.append(record)
+            index.add_record(record)
 
-        time.sleep(2)  # To avoid rate limiting
+    contexts = [{"stage": "judge", "question_id": item["id"], "subject_model": RESPONSE_MODEL} for item in pending]
+    with store:
+        eval_results = evaluator.run(prompts, on_result=commit, contexts=contexts)
+    index.save()
+
+    results = []
+    for item, eval_result in zip(pending, eval_results):
+        if eval_result:
+            results.append({**item, "evaluation": eval_result})
+        else:
+            print(f"Failed to evaluate Q{item['id']}")
 
     # ✅ Save evaluations
-    out_path = Path(__file__).resolve().parent.parent / "data" / "evaluations.json"
+    out_path = data_dir / "evaluations.json"
 
     # Build a dict for fast lookup by id
     evals_by_id = {ev.get("id"): ev for ev in evaluations if "id" in ev}
 
-    # Update or add new results by id
-    for res in results:
+    # Update or add restored and new results by id
+    for res in restored + results:
         evals_by_id[res["id"]] = res
 
-    # Write back the updated list
+    # Reference-overlap metrics in one pass for every judged entry still
+    # without them: new results, evaluations restored from the store, and
+    # entries whose metrics failed on an earlier run
     updated_evals = list(evals_by_id.values())
+    add_metrics([ev for ev in updated_evals if "metrics" not in ev and ev.get("evaluation")])
+
+    # Write back the updated list
     with open(out_path, "w") as f:
         json.dump(updated_evals, f, indent=2)
 
     print(f"\n✅ Evaluations saved to: {out_path}")
+    return results
+
+
+# ✅ Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate GPT responses with a GPT-4 judge")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum in-flight judge requests")
+    parser.add_argument("--rpm", type=int, default=500, help="Requests-per-minute budget")
+    parser.add_argument("--tpm", type=int, default=40000, help="Tokens-per-minute budget")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries on 429/5xx errors")
+    parser.add_argument("--api-base", default=None, help="Override the chat completions base URL")
+    args = parser.parse_args()
+
+    evaluate_responses(concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm,
+                       max_retries=args.max_retries, api_base=args.api_base)
+    print_cache_stats()
+    print_metrics_summary()
@@ -0,0 +1,183 @@
+"""
+Batched, cached text-feature extraction for the analysis dataframe.
+
+Responses never change once generated, so their readability, length and
+vocabulary features are computed once and stored in SQLite keyed by a hash
+of the response text. Each text is sentence-tokenized a single time, and
+cache misses are featurized in parallel over a process pool, so re-running
+the analysis after adding a model only featurizes the new rows. ROUGE/BLEU
+against the ground truth is cached the same way in the same table, keyed
+by a hash of the (reference, response) pair.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from nltk_resources import ensure_nltk_resources, tokenizer_resources
+from text_metrics import compute_batch_metrics
+
+DEFAULT_FEATURE_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "cache" / "text_features.sqlite"
+# Bump when the feature definitions change so stale rows are ignored
+FEATURE_VERSION = "1"
+# Bump when the ROUGE/BLEU definitions change (rouge-score itself is pinned)
+METRICS_VERSION = "1"
+FEATURE_NAMES = [
+    "response_length",
+    "flesch_reading_ease",
+    "flesch_kincaid_grade",
+    "vocab_diversity",
+    "sentence_count",
+    "avg_sentence_length",
+]
+PARALLEL_THRESHOLD = 500
+CHUNK_SIZE = 100
+
+
+def text_hash(text):
+    return hashlib.sha256(f"{FEATURE_VERSION}\0{text}".encode("utf-8")).hexdigest()
+
+
+def pair_hash(reference, generated):
+    return hashlib.sha256(f"metrics{METRICS_VERSION}\0{reference}\0{generated}".encode("utf-8")).hexdigest()
+
+
+def extract_text_features(text):
+    """All per-response features in one pass over the text"""
+    # Imported here so that importing this module stays cheap
+    from nltk.tokenize import sent_tokenize, word_tokenize
+    from textstat import textstat
+
+    ensure_nltk_resources(*tokenizer_resources())
+    text = text or ""
+    word_count = len(text.split())
+
+    try:
+        reading_ease = textstat.flesch_reading_ease(text)
+        kincaid_grade = textstat.flesch_kincaid_grade(text)
+    except Exception:
+        reading_ease, kincaid_grade = 0, 0
+
+    try:
+        tokens = word_tokenize(text.lower())
+        vocab_diversity = len(set(tokens)) / len(tokens) if tokens else 0
+    except Exception:
+        vocab_diversity = 0
+
+    sentence_count = len(sent_tokenize(text))
+
+    return {
+        "response_length": word_count,
+        "flesch_reading_ease": reading_ease,
+        "flesch_kincaid_grade": kincaid_grade,
+        "vocab_diversity": vocab_diversity,
+        "sentence_count": sentence_count,
+        "avg_sentence_length": word_count / max(sentence_count, 1),
+    }
+
+
+def _extract_chunk(texts):
+    return [extract_text_features(text) for text in texts]
+
+
+class FeatureCache:
+    """SQLite map of response-text (or reference/response pair) hash → feature dict"""
+
+    def __init__(self, path=DEFAULT_FEATURE_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("CREATE TABLE IF NOT EXISTS features (key TEXT PRIMARY KEY, features TEXT NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 900):
+            batch = keys[i:i + 900]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, features FROM features WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            found.update((key, json.loads(features)) for key, features in rows)
+        return found
+
+    def put_many(self, items):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO features (key, features) VALUES (?, ?)",
+            [(key, json.dumps(features)) for key, features in items],
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def compute_features(texts, cache=None, workers=None, parallel_threshold=PARALLEL_THRESHOLD,
+                     chunk_size=CHUNK_SIZE):
+    """
+    Feature dicts for ``texts`` (input order), featurizing only cache misses.
+
+    Pass ``cache=False`` to disable caching.
+    """
+    texts = [text or "" for text in texts]
+    if cache is None:
+        cache = FeatureCache()
+    keys = [text_hash(text) for text in texts]
+
+    known = cache.get_many(set(keys)) if cache else {}
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in known:
+            missing.setdefault(key, text)
+
+    if missing:
+        missing_keys = list(missing)
+        missing_texts = [missing[key] for key in missing_keys]
+        if len(missing_texts) < parallel_threshold or workers == 1:
+            computed = _extract_chunk(missing_texts)
+        else:
+            chunks = [missing_texts[i:i + chunk_size] for i in range(0, len(missing_texts), chunk_size)]
+            computed = []
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+                for chunk_features in executor.map(_extract_chunk, chunks):
+                    computed.extend(chunk_features)
+        new_features = dict(zip(missing_keys, computed))
+        if cache:
+            cache.put_many(new_features.items())
+        known.update(new_features)
+
+    print(f"🧮 Text features: {len(set(keys)) - len(missing)} cached, {len(missing)} computed")
+    return [known[key] for key in keys]
+
+
+def compute_metrics(pairs, cache=None, workers=None):
+    """
+    ROUGE/BLEU dicts for (reference, generated) ``pairs`` (input order),
+    scoring only cache misses with ``text_metrics.compute_batch_metrics``.
+
+    Pass ``cache=False`` to disable caching.
+    """
+    pairs = [(reference or "", generated or "") for reference, generated in pairs]
+    if cache is None:
+        cache = FeatureCache()
+    keys = [pair_hash(reference, generated) for reference, generated in pairs]
+
+    known = cache.get_many(set(keys)) if cache else {}
+    missing = {}
+    for key, pair in zip(keys, pairs):
+        if key not in known:
+            missing.setdefault(key, pair)
+
+    if missing:
+        new_metrics = dict(zip(missing, compute_batch_metrics(list(missing.values()), workers=workers)))
+        if cache:
+            cache.put_many(new_metrics.items())
+        known.update(new_metrics)
+
+    print(f"🧮 ROUGE/BLEU: {len(set(keys)) - len(missing)} cached, {len(missing)} computed")
+    return [known[key] for key in keys]
@@ -0,0 +1,136 @@
+"""
+Headless, incremental figure rendering.
+
+Figures are described as ``{filename: (draw, data)}`` where ``draw`` is a
+module-level function that builds and returns a Matplotlib figure from
+``data`` (usually the small aggregate the plot shows). ``render_figures``:
+
+- forces the non-interactive Agg backend, so nothing is shown or blocks;
+- hashes each figure's data, drawing code and DPI and skips figures whose
+  hash matches the manifest in the output directory and whose file exists,
+  so after a one-row change only plots whose inputs moved are redrawn;
+- renders the remaining figures in a process pool;
+- renders at ``DRAFT_DPI`` in draft mode (the hash includes the DPI, so a
+  later full-quality run redraws them).
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+FINAL_DPI = 300
+DRAFT_DPI = 72
+MANIFEST_NAME = ".render_manifest.json"
+# Bump to force every figure to be redrawn (e.g. after a style change)
+RENDER_VERSION = "1"
+
+
+def apply_style():
+    """Shared plot styling (also applied in each pool worker)"""
+    plt.style.use('default')
+    sns.set_palette("husl")
+    plt.rcParams['figure.figsize'] = (12, 8)
+    plt.rcParams['font.size'] = 11
+
+
+def _update_digest(h, obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        labels = obj.columns if isinstance(obj, pd.DataFrame) else [obj.name]
+        h.update(repr((type(obj).__name__, obj.shape, [str(label) for label in labels],
+                       [str(t) for t in np.atleast_1d(obj.dtypes)])).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.shape, str(obj.dtype))).encode("utf-8"))
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=str):
+            h.update(repr(key).encode("utf-8"))
+            _update_digest(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}:{len(obj)}".encode("utf-8"))
+        for item in obj:
+            _update_digest(h, item)
+    else:
+        h.update(repr(obj).encode("utf-8"))
+
+
+def figure_key(draw, data, dpi):
+    """Hash of everything that determines a rendered figure"""
+    h = hashlib.sha256()
+    h.update(f"{RENDER_VERSION}|{matplotlib.__version__}|{dpi}|{draw.__module__}.{draw.__qualname__}".encode("utf-8"))
+    h.update(inspect.getsource(draw).encode("utf-8"))
+    _update_digest(h, data)
+    return h.hexdigest()
+
+
+def _load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _render(draw, data, path, dpi):
+    fig = draw(data)
+    try:
+        fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return path
+
+
+def render_figures(figures, output_dir, draft=False, dpi=None, workers=None, force=False):
+    """
+    Render ``{filename: (draw, data)}`` into ``output_dir``.
+
+    Up-to-date figures are skipped unless ``force``. ``workers`` caps the
+    process pool (default: one per stale figure, up to the CPU count; 1
+    renders in-process). Returns ``{"rendered": [...], "skipped": [...]}``.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    dpi = dpi or (DRAFT_DPI if draft else FINAL_DPI)
+    manifest_path = output_dir / MANIFEST_NAME
+    manifest = _load_manifest(manifest_path)
+
+    stale, skipped = {}, []
+    for name, (draw, data) in figures.items():
+        key = figure_key(draw, data, dpi)
+        if not force and manifest.get(name) == key and (output_dir / name).exists():
+            skipped.append(name)
+        else:
+            stale[name] = (draw, data, key)
+
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=apply_style) as pool:
+            futures = {name: pool.submit(_render, draw, data, output_dir / name, dpi)
+                       for name, (draw, data, _) in stale.items()}
+            for future in futures.values():
+                future.result()
+    else:
+        apply_style()
+        for name, (draw, data, _) in stale.items():
+            _render(draw, data, output_dir / name, dpi)
+
+    if stale:
+        manifest.update({name: key for name, (_, _, key) in stale.items()})
+        tmp_path = manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+    return {"rendered": list(stale), "skipped": skipped}
@@ -1,32 +1,27 @@
 import json
-import openai
-import time
-import os
 from dotenv import load_dotenv
 from pathlib import Path
 
+from call_metrics import call_context, print_metrics_summary
+from llm_cache import print_cache_stats
+from json_stream import JsonArrayStream, JsonArrayWriter, iter_json_array
+from providers import complete, get_registry
+from result_store import STORE_DIR, ResultStore, prompt_version, record_key
+
 # Load environment variables
 load_dotenv()
-openai.api_key = os.getenv('OPENAI_API_KEY')
+
+SYSTEM_PROMPT = "You are a helpful health information assistant. Provide accurate, evidence-based responses to health-related questions. Be concise but informative."
+GENERATION_PROMPT_VERSION = prompt_version(SYSTEM_PROMPT)
 
 def generate_response_with_model(question, model_name):
-    """Generate response using specified model"""
+    """Generate response using specified model (routed by config/providers.json)"""
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": question}
+    ]
     try:
-        if "gpt" in model_name.lower():
-            response = openai.ChatCompletion.create(
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": "You are a helpful health information assistant. Provide accurate, evidence-based responses to health-related questions. Be concise but informative."},
-                    {"role": "user", "content": question}
-                ],
-                max_tokens=200,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
-        else:
-            # Placeholder for other models (Claude, Gemini, etc.)
-            # You can extend this with actual API calls when available
-            return f"Response from {model_name} would be generated here with proper API integration."
+        return complete(model_name, messages, temperature=0.7, max_tokens=200)
     except Exception as e:
         print(f"Error generating response with {model_name}: {e}")
         return f"Error: Could not generate response with {model_name}"
@@ -34,57 +29,63 @@ def generate_response_with_model(question, model_name):
 def generate_multi_model_responses():
     """Generate responses from multiple models for all questions"""
     
-    # Load existing questions
-    with open('data/questions.json', 'r') as f:
-        questions = json.load(f)
-    
-    # Define models to test
-    models = {
-        "gpt-3.5-turbo": "GPT-3.5 Turbo",
-        "gpt-4": "GPT-4",
-        "gpt-4-turbo": "GPT-4 Turbo"
-    }
-    
-    # You can add more models here when you have API access
-    # "claude-3-sonnet": "Claude 3 Sonnet",
-    # "gemini-pro": "Gemini Pro",
+    # Models to test come from the "multi_model" set in config/providers.json;
+    # add e.g. "claude-3-sonnet" there once you have API access
+    models = get_registry().model_set("multi_model")
     
-    print(f"🤖 Generating multi-model responses for {len(questions)} questions...")
+    print("🤖 Generating multi-model responses for data/questions.json...")
     print(f"📝 Testing {len(models)} models: {', '.join(models.values())}")
     
-    # Process each question
-    for i, question_data in enumerate(questions):
-        question = question_data['question']
-        question_id = question_data['id']
-        
-        print(f"\n📋 Processing Question #{question_id}: {question[:60]}...")
-        
-        # Generate responses from all models
-        model_responses = {}
-        
-        for model_name, model_display in models.items():
-            print(f"  🤖 Generating response with {model_display}...")
+    output_path = 'data/questions_multi_model.json'
+    
+    # Each response is committed as soon as it is generated so a crashed run
+    # picks up where it left off. Questions are streamed in and written out
+    # one at a time; an error mid-run leaves no truncated output file
+    with ResultStore(STORE_DIR / "generations.jsonl") as store, JsonArrayWriter(output_path) as writer:
+        for question_data in iter_json_array('data/questions.json'):
+            question = question_data['question']
+            question_id = question_data['id']
             
-            response = generate_response_with_model(question, model_name)
-            model_responses[model_name] = response
+            print(f"\n📋 Processing Question #{question_id}: {question[:60]}...")
             
-            # Rate limiting to avoid API limits
-            time.sleep(2)
-        
-        # Update the question with multi-model responses
-        questions[i]['response'] = model_responses
-        questions[i]['source'] = f"Multi-Model Analysis - {', '.join(models.values())}"
-        
-        print(f"✅ Completed Q#{question_id} with {len(models)} model responses")
-    
-    # Save updated questions
-    with open('data/questions_multi_model.json', 'w') as f:
-        json.dump(questions, f, indent=2)
+            # Generate responses from all models
+            model_responses = {}
+            
+            for model_name, model_display in models.items():
+                stored = store.get(record_key(question_id, model_name, None, GENERATION_PROMPT_VERSION))
+                if stored is not None:
+                    model_responses[model_name] = stored['response']
+                    print(f"  ⏭️  Reusing stored {model_display} response")
+                    continue
+                
+                print(f"  🤖 Generating response with {model_display}...")
+                
+                with call_context(stage="generation", question_id=question_id, subject_model=model_name):
+                    response = generate_response_with_model(question, model_name)
+                model_responses[model_name] = response
+                if response and not response.startswith("Error:"):
+                    store.append({
+                        'question_id': question_id,
+                        'model': model_name,
+                        'evaluator': None,
+                        'prompt_version': GENERATION_PROMPT_VERSION,
+                        'question': question,
+                        'response': response
+                    })
+            
+            # Update the question with multi-model responses
+            question_data['response'] = model_responses
+            question_data['source'] = f"Multi-Model Analysis - {', '.join(models.values())}"
+            writer.write(question_data)
+            
+            print(f"✅ Completed Q#{question_id} with {len(models)} model responses")
     
-    print(f"\n🎉 Multi-model responses generated for all {len(questions)} questions!")
-    print("📁 Results saved to data/questions_multi_model.json")
+    print(f"\n🎉 Multi-model responses generated for all {writer.count} questions!")
+    print(f"📁 Results saved to {output_path}")
+    print_cache_stats()
+    print_metrics_summary()
     
-    return questions
+    return JsonArrayStream(output_path)
 
 def create_comparison_analysis(questions):
     """Create a simple analysis of the multi-model responses"""
@@ -92,13 +93,15 @@ def create_comparison_analysis(questions):
     print("\n📊 MULTI-MODEL RESPONSE ANALYSIS")
     print("=" * 50)
     
-    # Count models used
-    sample_question = questions[0]
+    # Count models used (works on a list or a stream of questions)
+    questions = iter(questions)
+    sample_question = next(questions)
+    total_questions = 1 + sum(1 for _ in questions)
     models_used = list(sample_question['response'].keys())
     
     print(f"Models tested: {len(models_used)}")
-    print(f"Questions processed: {len(questions)}")
-    print(f"Total responses generated: {len(questions) * len(models_used)}")
+    print(f"Questions processed: {total_questions}")
+    print(f"Total responses generated: {total_questions * len(models_used)}")
     
     # Show sample structure
     print(f"\n📋 Sample response structure for Q#{sample_question['id']}:")
@@ -109,9 +112,9 @@ def create_comparison_analysis(questions):
     
     # Save analysis summary
     summary = {
-        'total_questions': len(questions),
+        'total_questions': total_questions,
         'models_tested': models_used,
-        'total_responses': len(questions) * len(models_used),
+        'total_responses': total_questions * len(models_used),
         'sample_question_id': sample_question['id'],
         'sample_question': sample_question['question'],
         'sample_responses': sample_question['response']
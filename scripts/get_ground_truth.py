@@ -1,42 +1,245 @@
-import requests
-from bs4 import BeautifulSoup
+import hashlib
 import json
+import os
+import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from urllib.parse import urlencode, urlparse
+
+import requests
+from lxml import etree
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
 
-SERPAPI_KEY = "656279a8d3fdd09da95382a41283fc3b01e1ceb9227c3b2b52268ea2790e701b"
+SERPAPI_KEY = os.getenv("SERPAPI_KEY", "656279a8d3fdd09da95382a41283fc3b01e1ceb9227c3b2b52268ea2790e701b")
+SEARCH_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
 TRUSTED_SITES = ["cdc.gov", "mayoclinic.org", "clevelandclinic.org", "who.int"]
+HTTP_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "cache" / "http_cache.sqlite"
+
+# Politeness for TRUSTED_SITES: at most this many in-flight requests per
+# domain, spaced at least PER_DOMAIN_INTERVAL seconds apart
+PER_DOMAIN_CONCURRENCY = 1
+PER_DOMAIN_INTERVAL = 1.0
+MAX_WORKERS = 8
+
+
+def create_session(pool_size=MAX_WORKERS):
+    """Pooled, keep-alive session shared by all harvester threads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return session
+
+
+def domain_for(url):
+    """Politeness bucket for a URL: the trusted site it belongs to, else its host"""
+    for site in TRUSTED_SITES:
+        if site in url:
+            return site
+    return urlparse(url).netloc
+
+
+class DomainThrottle:
+    """Per-domain concurrency cap and minimum spacing between requests"""
+
+    def __init__(self, concurrency=PER_DOMAIN_CONCURRENCY, interval=PER_DOMAIN_INTERVAL):
+        self.concurrency = concurrency
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_slot = {}
+
+    def _semaphore(self, domain):
+        with self._lock:
+            if domain not in self._semaphores:
+                self._semaphores[domain] = threading.Semaphore(self.concurrency)
+            return self._semaphores[domain]
+
+    @contextmanager
+    def __call__(self, domain):
+        semaphore = self._semaphore(domain)
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                slot = max(now, self._next_slot.get(domain, now))
+                self._next_slot[domain] = slot + self.interval
+            if slot > now:
+                time.sleep(slot - now)
+            yield
+
+
+class HttpCache:
+    """On-disk HTTP cache with ETag / Last-Modified revalidation"""
+
+    def __init__(self, path=HTTP_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB,
+                fetched_at REAL
+            )"""
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.revalidated = 0
+        self.fetched = 0
+
+    def _get(self, key):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, body FROM http_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _put(self, key, url, etag, last_modified, body):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (key, url, etag, last_modified, body, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, body, time.time()),
+            )
+            self._conn.commit()
+
+    def fetch(self, session, url, params=None, timeout=10, revalidate=True, gate=None):
+        """
+        GET ``url`` through the cache and return the raw body bytes.
+
+        Entries with validators are revalidated with a conditional request;
+        entries without validators (or with ``revalidate=False``) are served
+        from disk without touching the network. ``gate`` (e.g. a
+        ``DomainThrottle`` slot) is held only around the network request.
+        Bytes are returned undecoded so parsers can detect the charset.
+        """
+        full_url = f"{url}?{urlencode(params)}" if params else url
+        key = hashlib.sha256(full_url.encode("utf-8")).hexdigest()
+        cached = self._get(key)
+
+        headers = {}
+        if cached is not None:
+            etag, last_modified, body = cached
+            if not revalidate or not (etag or last_modified):
+                self.hits += 1
+                return body
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        with gate or nullcontext():
+            res = session.get(url, params=params, headers=headers, timeout=timeout)
+        if res.status_code == 304 and cached is not None:
+            self.revalidated += 1
+            return cached[2]
+        res.raise_for_status()
+        self.fetched += 1
+        self._put(key, url, res.headers.get("ETag"), res.headers.get("Last-Modified"), res.content)
+        return res.content
 
-def search_question(question):
-    url = "https://serpapi.com/search"
+    def close(self):
+        self._conn.close()
+
+
+def search_question(question, session=None, cache=None, throttle=None, search_url=None):
+    session = session or create_session()
+    search_url = search_url or SEARCH_URL
     params = {
         "q": question,
         "api_key": SERPAPI_KEY,
         "engine": "google",
         "num": 5
     }
-    res = requests.get(url, params=params)
-    results = res.json().get("organic_results", [])
+    # SerpAPI gets the same politeness as the sites it points to
+    gate = (throttle or DomainThrottle())(domain_for(search_url))
+    if cache is not None:
+        # Search results carry no validators; a cached result is reused as-is
+        body = cache.fetch(session, search_url, params=params, revalidate=False, gate=gate)
+    else:
+        with gate:
+            body = session.get(search_url, params=params, timeout=10).content
+    results = json.loads(body).get("organic_results", [])
     for r in results:
         link = r.get("link", "")
         if any(site in link for site in TRUSTED_SITES):
             return link
     return None
 
-def extract_answer(url):
+
+def extract_paragraph(page_html, min_length=100):
+    """
+    First <p> with decent text length, using lxml's C parser.
+
+    Pass the raw response bytes: lxml then honours the page's own charset
+    declaration instead of a guess made before parsing.
+    """
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        html = requests.get(url, headers=headers, timeout=10).text
-        soup = BeautifulSoup(html, "html.parser")
-
-        # Grab first <p> tag with decent text length
-        for p in soup.find_all("p"):
-            text = p.get_text().strip()
-            if len(text) > 100:
-                return text
+        doc = lxml_html.fromstring(page_html)
+    except (ValueError, etree.ParserError):
+        return None
+    for p in doc.iter("p"):
+        text = p.text_content().strip()
+        if len(text) > min_length:
+            return text
+    return None
+
+
+def extract_answer(url, session=None, cache=None, throttle=None):
+    try:
+        session = session or create_session()
+        gate = (throttle or DomainThrottle())(domain_for(url))
+        if cache is not None:
+            page_html = cache.fetch(session, url, gate=gate)
+        else:
+            with gate:
+                page_html = session.get(url, timeout=10).content
+        return extract_paragraph(page_html)
     except Exception as e:
         print(f"Error fetching {url}: {e}")
     return None
 
+
+def harvest_ground_truth(questions, max_workers=MAX_WORKERS, session=None, cache=None, throttle=None,
+                         search_url=None):
+    """Search and extract answers for all questions concurrently (input order kept)"""
+    session = session or create_session(max_workers)
+    cache = cache if cache is not None else HttpCache()
+    throttle = throttle or DomainThrottle()
+
+    def harvest_one(i, entry):
+        q = entry["question"]
+        try:
+            link = search_question(q, session, cache, throttle, search_url)
+        except Exception as e:
+            print(f"\n[{i+1}] Search failed for: {q} ({e})")
+            link = None
+        print(f"\n[{i+1}] Searching: {q}\n → Top result: {link}")
+
+        if not link:
+            print(f" ❌ No trusted site found for [{i+1}].")
+            return {"question": q, "answer": ""}
+        answer = extract_answer(link, session, cache, throttle)
+        if not answer:
+            print(f" ⚠️ No usable paragraph found for [{i+1}].")
+            return {"question": q, "answer": ""}
+        return {"question": q, "answer": answer}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        ground_truth = list(executor.map(harvest_one, range(len(questions)), questions))
+
+    print(f"\n🌐 HTTP cache: {cache.hits} hits, {cache.revalidated} revalidated (304), {cache.fetched} fetched")
+    return ground_truth
+
+
 def load_questions():
     with open("data/questions.json") as f:
         return json.load(f)
@@ -47,27 +250,7 @@ def save_answers(answers):
 
 if __name__ == "__main__":
     questions = load_questions()
-    ground_truth = []
-
-    for i, entry in enumerate(questions):
-        q = entry["question"]
-        print(f"\n[{i+1}] Searching: {q}")
-
-        link = search_question(q)
-        print(f" → Top result: {link}")
-
-        if link:
-            answer = extract_answer(link)
-            if answer:
-                ground_truth.append({ "question": q, "answer": answer })
-            else:
-                print(" ⚠️ No usable paragraph found.")
-                ground_truth.append({ "question": q, "answer": "" })
-        else:
-            print(" ❌ No trusted site found.")
-            ground_truth.append({ "question": q, "answer": "" })
-
-        time.sleep(2)  # Avoid hitting rate limits
+    ground_truth = harvest_ground_truth(questions)
 
     save_answers(ground_truth)
     print("\n✅ Ground truth saved to data/ground_truth.json")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Offline fixture server and end-to-end check for ``get_ground_truth.py``.
+
+Serves saved, trimmed CDC and WHO pages from ``data/fixtures/ground_truth``
+plus a SerpAPI-shaped ``/search`` endpoint whose results point back at
+them. Pages carry an ETag and answer a matching ``If-None-Match`` with
+304, and are sent as bare ``text/html`` so only the page's own charset
+declaration (UTF-8 for CDC, windows-1252 for WHO) tells how to decode it.
+
+Running the script harvests the fixture questions twice through a fresh
+HTTP cache and checks that the expected paragraphs come back intact, that
+SerpAPI calls never overlap (they share the per-domain throttle), and that
+the second run answers searches from the cache and revalidates every page
+with a 304.
+
+Usage:
+    python scripts/ground_truth_fixtures.py
+    python scripts/ground_truth_fixtures.py --serve --port 8090
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / "data" / "fixtures" / "ground_truth"
+SEARCH_LATENCY = 0.02
+
+
+class FixtureSite:
+    """Fixture pages, canned searches and request counters"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        with open(Path(fixture_dir) / "index.json", encoding="utf-8") as f:
+            index = json.load(f)
+        self.searches = index["searches"]
+        self.pages = {path: (Path(fixture_dir) / name).read_bytes() for path, name in index["pages"].items()}
+        self.base = ""
+        self.lock = threading.Lock()
+        self.stats = {"searches": 0, "search_in_flight": 0, "max_search_in_flight": 0,
+                      "pages_ok": 0, "pages_not_modified": 0, "not_found": 0}
+
+    def count(self, key, delta=1):
+        with self.lock:
+            self.stats[key] += delta
+            if key == "search_in_flight":
+                self.stats["max_search_in_flight"] = max(self.stats["max_search_in_flight"],
+                                                         self.stats["search_in_flight"])
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    site = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type=None, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/search":
+            self._search(parse_qs(url.query).get("q", [""])[0])
+        elif url.path in self.site.pages:
+            self._page(self.site.pages[url.path])
+        else:
+            self.site.count("not_found")
+            self._send(404, b"Not found", "text/plain")
+
+    def _search(self, query):
+        """SerpAPI-shaped results without validators, like the real API"""
+        self.site.count("searches")
+        self.site.count("search_in_flight")
+        try:
+            time.sleep(SEARCH_LATENCY)
+            results = (self.site.searches.get(query) or {}).get("organic_results", [])
+            results = [{**r, "link": r["link"].replace("{base}", self.site.base)} for r in results]
+            body = json.dumps({"search_metadata": {"status": "Success"}, "organic_results": results})
+            self._send(200, body.encode("utf-8"), "application/json")
+        finally:
+            self.site.count("search_in_flight", -1)
+
+    def _page(self, body):
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.site.count("pages_not_modified")
+            self._send(304, headers={"ETag": etag})
+            return
+        self.site.count("pages_ok")
+        # No charset parameter: the page's own <meta> declaration must be used
+        self._send(200, body, "text/html", {"ETag": etag})
+
+
+def start_fixture_server(host="127.0.0.1", port=0, fixture_dir=FIXTURE_DIR):
+    """Serve on a background thread; returns ``(server, site)``. Call ``server.shutdown()`` when done."""
+    site = FixtureSite(fixture_dir)
+    handler = type("ConfiguredFixtureHandler", (FixtureHandler,), {"site": site})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    site.base = f"http://{host}:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, site
+
+
+def check_harvest(interval=0.05):
+    """Harvest the fixture questions twice; returns a list of problems (empty when all is well)"""
+    from get_ground_truth import DomainThrottle, HttpCache, harvest_ground_truth
+
+    server, site = start_fixture_server()
+    questions = [{"question": q} for q in site.searches]
+    expected = [site.searches[q["question"]]["expected"] for q in questions]
+    problems = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            runs = []
+            for run in ("first", "second"):
+                before = site.snapshot()
+                cache = HttpCache(Path(tmp) / "http_cache.sqlite")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    answers = harvest_ground_truth(questions, cache=cache, throttle=DomainThrottle(interval=interval),
+                                                   search_url=f"{site.base}/search")
+                cache.close()
+                after = site.snapshot()
+                runs.append((run, answers, {key: after[key] - before[key] for key in after}, cache))
+    finally:
+        server.shutdown()
+
+    for run, answers, stats, cache in runs:
+        for question, answer, want in zip(questions, answers, expected):
+            if want and want not in answer["answer"]:
+                problems.append(f"{run} run: wrong answer for {question['question']!r}: {answer['answer'][:80]!r}")
+            if not want and answer["answer"]:
+                problems.append(f"{run} run: unexpected answer for {question['question']!r}")
+        print(f"  {run}: {stats['searches']} searches (max {site.stats['max_search_in_flight']} in flight), "
+              f"{stats['pages_ok']} pages fetched, {stats['pages_not_modified']} revalidated (304), "
+              f"cache {cache.hits} hits / {cache.revalidated} 304s / {cache.fetched} fetched")
+
+    pages = sum(bool(want) for want in expected)
+    first, second = runs[0][2], runs[1][2]
+    if first["searches"] != len(questions) or first["pages_ok"] != pages:
+        problems.append(f"first run: {first['searches']} searches and {first['pages_ok']} pages fetched")
+    if site.stats["max_search_in_flight"] > 1:
+        problems.append("SerpAPI requests overlapped; search is not behind the domain throttle")
+    if second["searches"]:
+        problems.append(f"second run: {second['searches']} searches not served from the cache")
+    if second["pages_ok"] or second["pages_not_modified"] != pages:
+        problems.append(f"second run: {second['pages_not_modified']}/{pages} pages revalidated with 304")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixture server and offline check for get_ground_truth.py")
+    parser.add_argument("--serve", action="store_true", help="Only serve the fixtures until Ctrl+C")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    if args.serve:
+        server, site = start_fixture_server(args.host, args.port)
+        print(f"🧪 Fixture pages on {site.base}; searches at {site.base}/search (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+            print(f"📊 {site.snapshot()}")
+        return
+
+    print("\n🌐 GROUND TRUTH FIXTURE CHECK")
+    print("=" * 50)
+    problems = check_harvest()
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("\n✅ Answers, charsets, throttled search and 304 revalidation all as expected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Streaming readers and writers for the project's JSON array files.
+
+``questions.json`` and the evaluation files are top-level JSON arrays that
+grow with every model and deep-research run. ``iter_json_array`` yields one
+record at a time (incremental parsing via ijson; JSONL is read line by
+line), and ``JsonArrayWriter`` writes an array one record at a time in the
+same ``indent=2`` layout as ``json.dump``, so peak memory stays flat as the
+dataset grows.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import ijson
+
+
+def iter_json_array(path):
+    """Yield the records of a top-level JSON array (or a .jsonl file) one by one"""
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    with open(path, "rb") as f:
+        yield from ijson.items(f, "item", use_float=True)
+
+
+class JsonArrayStream:
+    """Re-iterable view over a JSON array file that never loads it whole"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def __iter__(self):
+        return iter_json_array(self.path)
+
+    def __bool__(self):
+        return self.path.exists() and self.path.stat().st_size > 0
+
+    def __repr__(self):
+        return f"JsonArrayStream({str(self.path)!r})"
+
+
+class JsonArrayWriter:
+    """
+    Write a JSON array incrementally.
+
+    Output goes to a temporary file that replaces ``path`` on a clean close,
+    so readers never see a half-written array.
+    """
+
+    def __init__(self, path, indent=2):
+        self.path = Path(path)
+        self.indent = indent
+        self.count = 0
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+        self._file.write("[")
+
+    def write(self, item):
+        text = json.dumps(item, indent=self.indent)
+        if self.indent:
+            pad = " " * self.indent
+            text = "\n".join(pad + line for line in text.splitlines())
+            self._file.write(("," if self.count else "") + "\n" + text)
+        else:
+            self._file.write(("," if self.count else "") + text)
+        self.count += 1
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.write("\n]" if self.count and self.indent else "]")
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._tmp_path.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
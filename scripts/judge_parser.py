@@ -0,0 +1,260 @@
+"""
+Shared parser for judge (evaluator) outputs.
+
+Judges answer either in the line format requested by the evaluation prompts
+
+    Factual Accuracy: 4
+    Clarity: 5
+    Neutrality: 5
+    Helpfulness: 4
+    Justification: <brief explanation>
+
+or as a JSON object with the same fields. ``parse_judgment`` handles both:
+the canonical block is matched in one anchored step, other line layouts are
+scanned once with a single precompiled pattern, and anything that cannot be
+extracted is reported as a structured error (field, code, detail) instead
+of a bare ``None``.
+
+Usage (re-parse an archive of raw judge outputs):
+    python scripts/judge_parser.py data/store/evaluations.jsonl --output reparsed.jsonl
+"""
+
+import argparse
+import json
+import re
+from collections import Counter
+
+from json_stream import iter_json_array
+
+CRITERIA = ["factual_accuracy", "clarity", "neutrality", "helpfulness"]
+SCORE_RANGE = (1, 5)
+
+# The canonical block, matched in one anchored step; anything else falls back
+# to scanning with _LINE_PATTERN
+_CANONICAL = re.compile(
+    r"\s*(?:factual\s+)?accuracy:\s*(\d)\s*clarity:\s*(\d)\s*"
+    r"neutrality:\s*(\d)\s*helpfulness:\s*(\d)\s*justification:",
+    re.IGNORECASE,
+)
+
+# "Accuracy" and "Factual Accuracy" are both accepted; labels may be wrapped
+# in markdown emphasis ("**Clarity:** 4") and scores may read "4/5"
+_LINE_PATTERN = re.compile(
+    r"\b(?:(?P<label>(?:factual\s+)?accuracy|clarity|neutrality|helpfulness)"
+    r"[*_]*\s*:\s*[*_]*\s*(?P<score>-?\d+(?:\.\d+)?)(?:\s*/\s*\d+)?"
+    r"|(?P<justification>justification)[*_]*\s*:[*_]*)",
+    re.IGNORECASE,
+)
+_JSON_START = re.compile(r"\s*(?:\{|```)")
+_JSON_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL | re.IGNORECASE)
+
+# Normalized JSON keys / line labels → criterion
+_ALIASES = {
+    "accuracy": "factual_accuracy",
+    "factual_accuracy": "factual_accuracy",
+    "factual accuracy": "factual_accuracy",
+    "clarity": "clarity",
+    "neutrality": "neutrality",
+    "helpfulness": "helpfulness",
+}
+
+
+class JudgeParseError(ValueError):
+    """Raised by ``parse_judgment(strict=True)``; carries the structured errors"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{e['field']}: {e['code']}" for e in errors))
+
+
+class Judgment:
+    """Scores (None where missing), justification and parse errors of one judge output"""
+
+    __slots__ = ("scores", "justification", "errors", "format")
+
+    def __init__(self, scores, justification="", errors=None, format="text"):
+        self.scores = scores
+        self.justification = justification
+        self.errors = errors or []
+        self.format = format
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def to_dict(self):
+        return {**self.scores, "justification": self.justification}
+
+    def __repr__(self):
+        return f"Judgment(scores={self.scores!r}, format={self.format!r}, errors={self.errors!r})"
+
+
+def parse_error(field, code, detail=""):
+    return {"field": field, "code": code, "detail": detail}
+
+
+def _check_score(criterion, value, errors):
+    """Coerce a raw score to int within SCORE_RANGE, recording an error otherwise"""
+    if isinstance(value, str) and value.isdigit():
+        number = int(value)
+    else:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            errors.append(parse_error(criterion, "not_a_number", repr(value)))
+            return None
+        if not number.is_integer():
+            errors.append(parse_error(criterion, "not_an_integer", repr(value)))
+            return None
+        number = int(number)
+    low, high = SCORE_RANGE
+    if not low <= number <= high:
+        errors.append(parse_error(criterion, "out_of_range", f"{number} not in {low}-{high}"))
+        return None
+    return number
+
+
+def parse_judgment_dict(payload):
+    """Judgment from an already-decoded JSON object (flat or with a "scores" map)"""
+    scores = dict.fromkeys(CRITERIA)
+    errors = []
+    justification = ""
+    # Accept {"scores": {...}, "justification": ...} as well as a flat object
+    fields = dict(payload.get("scores") or {}) if isinstance(payload.get("scores"), dict) else {}
+    fields.update((k, v) for k, v in payload.items() if k != "scores")
+    for key, value in fields.items():
+        normalized = str(key).strip().lower().replace("-", " ").replace("_", " ")
+        if normalized == "justification":
+            justification = "" if value is None else str(value).strip()
+            continue
+        criterion = _ALIASES.get(normalized)
+        if criterion is not None and scores[criterion] is None:
+            scores[criterion] = _check_score(criterion, value, errors)
+    for criterion in CRITERIA:
+        if criterion not in {e["field"] for e in errors} and scores[criterion] is None:
+            errors.append(parse_error(criterion, "missing"))
+    return Judgment(scores, justification, errors, format="json")
+
+
+def _parse_lines(text):
+    canonical = _CANONICAL.match(text)
+    if canonical is not None:
+        scores = dict(zip(CRITERIA, map(int, canonical.groups())))
+        low, high = SCORE_RANGE
+        if all(low <= score <= high for score in scores.values()):
+            return Judgment(scores, text[canonical.end():].strip(), format="text")
+
+    scores = dict.fromkeys(CRITERIA)
+    seen = set()
+    errors = []
+    justification_start = None
+    for match in _LINE_PATTERN.finditer(text):
+        if match.group("justification"):
+            if justification_start is None:
+                justification_start = match.end()
+            # The justification runs to the end; stop unless scores follow it
+            if len(seen) == len(CRITERIA):
+                break
+            continue
+        criterion = _ALIASES[" ".join(match.group("label").lower().split())]
+        # First occurrence wins, as with a per-criterion search
+        if criterion in seen:
+            continue
+        seen.add(criterion)
+        scores[criterion] = _check_score(criterion, match.group("score"), errors)
+    for criterion in CRITERIA:
+        if criterion not in seen:
+            errors.append(parse_error(criterion, "missing"))
+    justification = text[justification_start:].strip() if justification_start is not None else ""
+    return Judgment(scores, justification, errors, format="text")
+
+
+def extract_json_object(text):
+    """The JSON object in ``text`` (optionally in a ```json fence), else None"""
+    if not _JSON_START.match(text):
+        return None
+    stripped = text.strip()
+    fence = _JSON_FENCE.match(stripped)
+    if fence:
+        stripped = fence.group(1)
+    if not stripped.startswith("{"):
+        return None
+    try:
+        payload = json.loads(stripped)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def parse_judgment(text, strict=False):
+    """
+    Parse one judge output (line format or JSON) into a ``Judgment``.
+
+    With ``strict=True`` any parse error raises ``JudgeParseError``.
+    """
+    if not text or not isinstance(text, str):
+        judgment = Judgment(dict.fromkeys(CRITERIA), "", [parse_error("evaluation", "empty")], format="none")
+    else:
+        payload = extract_json_object(text)
+        judgment = parse_judgment_dict(payload) if payload is not None else _parse_lines(text)
+    if strict and judgment.errors:
+        raise JudgeParseError(judgment.errors)
+    return judgment
+
+
+def parse_evaluation_scores(evaluation_text):
+    """Extract numerical scores from evaluation text (None where missing)"""
+    return parse_judgment(evaluation_text).scores
+
+
+def parse_many(texts):
+    """Parse an iterable of judge outputs; returns a list of ``Judgment``"""
+    return [parse_judgment(text) for text in texts]
+
+
+def reparse_records(records, field="evaluation"):
+    """
+    Yield ``records`` with scores, justification and parse errors refreshed
+    from their raw judge output in ``field``.
+    """
+    for record in records:
+        judgment = parse_judgment(record.get(field))
+        updated = {**record, **judgment.scores, "justification": judgment.justification}
+        if judgment.errors:
+            updated["parse_errors"] = judgment.errors
+        else:
+            updated.pop("parse_errors", None)
+        yield updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse raw judge outputs in a JSON/JSONL archive")
+    parser.add_argument("path", help="JSON array or JSONL file of records with raw judge text")
+    parser.add_argument("--field", default="evaluation", help="Record field holding the judge output")
+    parser.add_argument("--output", default=None, help="Write re-parsed records here as JSONL")
+    args = parser.parse_args()
+
+    total = failed = 0
+    error_counts = Counter()
+    out = open(args.output, "w") if args.output else None
+    try:
+        for record in reparse_records(iter_json_array(args.path), args.field):
+            total += 1
+            if record.get("parse_errors"):
+                failed += 1
+                error_counts.update(f"{e['field']}:{e['code']}" for e in record["parse_errors"])
+            if out is not None:
+                out.write(json.dumps(record) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+
+    print(f"✅ Parsed {total} judge outputs, {failed} with errors")
+    for error, count in error_counts.most_common():
+        print(f"   {error}: {count}")
+    if args.output:
+        print(f"💾 Re-parsed records written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
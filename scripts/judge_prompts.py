@@ -0,0 +1,41 @@
+"""
+Judge prompt shared by the single-response judging scripts.
+
+The rubric and output format are identical for every call, so they are sent
+as a fixed system message and the per-item question, response and ground
+truth go last in the user message. The rubric is only about 130 tokens,
+well under the 1024-token minimum prefix that OpenAI and Anthropic cache,
+so judge calls get no prompt-cache discount today; the layout only starts
+to pay off if the static part grows past that (e.g. few-shot examples),
+and ``call_metrics`` would then show the cached share of prompt tokens.
+"""
+
+from result_store import prompt_version
+
+JUDGE_INSTRUCTIONS = """You are an evaluator assessing an AI-generated health response.
+
+Using a 1 to 5 scale, evaluate the response based on:
+1. Factual Accuracy – Is the response factually correct compared to the ground truth?
+2. Clarity – Is the response clearly written and easy to understand?
+3. Neutrality – Is it unbiased and culturally sensitive?
+4. Helpfulness – Does it provide useful and safe information?
+
+Respond in the format:
+Factual Accuracy: X
+Clarity: Y
+Neutrality: Z
+Helpfulness: W
+Justification: <brief explanation>"""
+
+
+def judge_messages(item_prompt, instructions=JUDGE_INSTRUCTIONS):
+    """Chat messages for one judge call: static instructions first, the item last"""
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": item_prompt},
+    ]
+
+
+def judge_prompt_version(item_prompt, instructions=JUDGE_INSTRUCTIONS):
+    """Prompt version covering both the static instructions and the item template"""
+    return prompt_version(instructions + "\n---\n" + item_prompt)
@@ -0,0 +1,177 @@
+"""
+Content-addressed on-disk cache for LLM calls.
+
+Responses are stored in SQLite keyed by a SHA-256 hash of
+(model, messages, temperature, max_tokens and any extra request fields such
+as ``response_format``), so re-running a script after a
+crash or a plotting change replays earlier answers instead of paying for
+them again. The cache is size-bounded with least-recently-used eviction.
+
+Modes (``LLM_CACHE_MODE`` environment variable):
+    readwrite  look up first, call the API on a miss and store the answer
+    replay     read-only; a miss raises CacheMissError instead of calling
+    off        bypass the cache entirely
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "cache" / "llm_responses.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHE_MODES = ("readwrite", "replay", "off")
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request has no cached response"""
+
+
+def cache_key(model, messages, temperature=None, max_tokens=None, extra=None):
+    """Stable hash of everything that determines a completion"""
+    request = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+    # Only present when set, so keys of plain requests are unchanged
+    if extra:
+        request["extra"] = extra
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache of chat completion responses"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, mode="readwrite"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {CACHE_MODES}")
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if mode != "off":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Return the cached response for ``key`` or None"""
+        if self._conn is None:
+            # Off mode: every request is a miss
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.mode == "readwrite":
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+            return row[0]
+
+    def put(self, key, model, response):
+        """Store a response and evict least-recently-used entries over budget"""
+        if self._conn is None or self.mode != "readwrite" or response is None:
+            return
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self._total_bytes -= row[1]
+
+    def lookup(self, model, messages, temperature=None, max_tokens=None, extra=None):
+        """Return (key, cached response or None); raises CacheMissError in replay mode"""
+        key = cache_key(model, messages, temperature, max_tokens, extra)
+        cached = self.get(key)
+        if cached is None and self.mode == "replay":
+            raise CacheMissError(f"No cached response for {model} request {key[:12]}")
+        return key, cached
+
+    def complete(self, model, messages, temperature, max_tokens, create, extra=None):
+        """Return a cached completion, or call ``create()`` and cache its result"""
+        key, cached = self.lookup(model, messages, temperature, max_tokens, extra)
+        if cached is not None:
+            return cached
+        response = create()
+        self.put(key, model, response)
+        return response
+
+    def stats(self):
+        """Hit/miss counters and current on-disk size"""
+        total = self.hits + self.misses
+        entries = 0
+        if self._conn is not None:
+            with self._lock:
+                entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+            "bytes": self._total_bytes if self._conn is not None else 0,
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_default_cache = None
+
+
+def get_cache():
+    """Process-wide cache configured from LLM_CACHE_PATH / LLM_CACHE_MODE / LLM_CACHE_MAX_MB"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache(
+            path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+            max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024),
+            mode=os.getenv("LLM_CACHE_MODE", "readwrite"),
+        )
+    return _default_cache
+
+
+def print_cache_stats(cache=None):
+    """Print a one-line cache summary at the end of a run"""
+    stats = (cache or get_cache()).stats()
+    print(f"💾 LLM cache ({stats['mode']}): {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KB")
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI-compatible chat server for load tests that cost nothing.
+
+Serves ``POST /v1/chat/completions`` (plain and ``stream=true``) with
+plausible bodies: judge prompts get a well-formed score block (or the JSON
+object the batch judge asks for), everything else a short health answer.
+Latency is drawn from a configurable distribution, and a share of requests
+can be answered with 429 (with ``Retry-After``) or 5xx errors, or be
+throttled by a server-side requests-per-minute limit. ``GET /stats``
+returns request, error and peak-concurrency counters.
+
+The Batch API is stubbed too (``POST /files``, ``GET /files/{id}/content``,
+``POST /batches``, ``GET /batches/{id}``). A job moves through
+``validating`` → ``in_progress`` → ``finalizing`` → ``completed``, one
+status per poll; a share of its items can fail into the error file, and a
+share of whole jobs can end ``failed``. ``batch_smoke_test.py`` drives the
+``--execution batch`` modes against it.
+
+Usage:
+    python scripts/mock_llm_server.py --port 8089 --latency lognormal:0.8,0.5 --rate-limit-rate 0.05
+    OPENAI_API_BASE=http://127.0.0.1:8089/v1 python scripts/compare_models.py
+
+Latency specs: ``fixed:S``, ``uniform:LOW,HIGH``, ``lognormal:MEDIAN,SIGMA``
+or ``exponential:MEAN`` (seconds).
+"""
+
+import argparse
+import email
+import email.policy
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from judge_parser import CRITERIA
+
+LATENCY_DISTRIBUTIONS = {
+    "fixed": lambda rng, s: s,
+    "uniform": lambda rng, low, high: rng.uniform(low, high),
+    "lognormal": lambda rng, median, sigma: median * rng.lognormvariate(0, sigma),
+    "exponential": lambda rng, mean: rng.expovariate(1 / mean),
+}
+ANSWER = ("Most people can manage this safely, but it depends on your health history. "
+          "Talk to your doctor or pharmacist before changing medication, and seek care "
+          "promptly if symptoms are severe or getting worse.")
+_REQUIRED_KEYS = re.compile(r"Required keys: (.+)")
+_FILE_CONTENT = re.compile(r"/files/([^/]+)/content$")
+_BATCH = re.compile(r"/batches/([^/]+)$")
+
+
+def parse_latency(spec):
+    """``"lognormal:0.8,0.5"`` → ``(name, params)``; raises ValueError on bad specs"""
+    name, _, args = spec.partition(":")
+    if name not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution {name!r}; expected one of {sorted(LATENCY_DISTRIBUTIONS)}")
+    return name, tuple(float(arg) for arg in args.split(",") if arg)
+
+
+class MockConfig:
+    """Behaviour knobs shared by all request handlers"""
+
+    def __init__(self, latency="lognormal:0.5,0.4", error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1.0, rpm_limit=None, seed=None, batch_error_rate=0.0, batch_failure_rate=0.0,
+                 batch_polls=2):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rpm_limit = rpm_limit
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = deque()
+        # Batch API: share of items answered with an error, share of jobs
+        # that fail outright, and polls a job spends in progress
+        self.batch_error_rate = batch_error_rate
+        self.batch_failure_rate = batch_failure_rate
+        self.batch_polls = batch_polls
+        self.files = {}
+        self.batches = {}
+        self.ids = itertools.count(1)
+        self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "errors": 0,
+                      "in_flight": 0, "max_in_flight": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                      "batches": 0, "batch_items": 0, "batch_item_errors": 0, "batches_failed": 0}
+
+    def sample_latency(self):
+        name, params = self.latency
+        with self.lock:
+            return max(0.0, LATENCY_DISTRIBUTIONS[name](self.rng, *params))
+
+    def admit(self):
+        """Decide a request's fate: ``"ok"``, ``"rate_limited"`` or ``"error"``"""
+        with self.lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if self.rpm_limit:
+                while self.recent and now - self.recent[0] > 60:
+                    self.recent.popleft()
+                if len(self.recent) >= self.rpm_limit:
+                    self.stats["rate_limited"] += 1
+                    return "rate_limited"
+                self.recent.append(now)
+            roll = self.rng.random()
+            if roll < self.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return "rate_limited"
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return "error"
+            return "ok"
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def reset(self):
+        with self.lock:
+            for key in self.stats:
+                self.stats[key] = 0
+            self.recent.clear()
+            self.files.clear()
+            self.batches.clear()
+
+    def add_file(self, content, filename, purpose):
+        with self.lock:
+            file_id = f"file-mock-{next(self.ids)}"
+            self.files[file_id] = {"id": file_id, "object": "file", "bytes": len(content),
+                                   "created_at": int(time.time()), "filename": filename,
+                                   "purpose": purpose, "content": content}
+        return {key: value for key, value in self.files[file_id].items() if key != "content"}
+
+    def create_batch(self, params):
+        """Answer every line of the input file up front; results show once the job completes"""
+        source = self.files.get(params.get("input_file_id"))
+        if source is None:
+            return None
+        with self.lock:
+            batch_id = f"batch-mock-{next(self.ids)}"
+            fails = self.rng.random() < self.batch_failure_rate
+            self.stats["batches"] += 1
+        items = [json.loads(line) for line in source["content"].decode("utf-8").splitlines() if line.strip()]
+        with self.lock:
+            self.stats["batch_items"] += len(items)
+            # Exactly the configured share of items fails, so small jobs still see failures
+            failing = set(self.rng.sample(range(len(items)), round(self.batch_error_rate * len(items))))
+        outputs, errors = [], []
+        for position, item in enumerate(items):
+            request_id = f"req-mock-{next(self.ids)}"
+            if position in failing:
+                errors.append({"id": request_id, "custom_id": item["custom_id"], "error": None, "response": {
+                    "status_code": 500, "request_id": request_id,
+                    "body": {"error": {"message": "Internal error (mock)", "type": "server_error"}}}})
+                continue
+            text = mock_reply(item["body"].get("messages") or [])
+            outputs.append({"id": request_id, "custom_id": item["custom_id"], "error": None, "response": {
+                "status_code": 200, "request_id": request_id, "body": {
+                    "id": f"chatcmpl-mock-{request_id}", "object": "chat.completion",
+                    "model": item["body"].get("model", "mock"), "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": text},
+                         "finish_reason": "stop"}]}}})
+        total = len(outputs) + len(errors)
+        batch = {"id": batch_id, "object": "batch", "endpoint": params.get("endpoint"),
+                 "input_file_id": params["input_file_id"], "completion_window": params.get("completion_window"),
+                 "metadata": params.get("metadata"), "created_at": int(time.time()), "status": "validating",
+                 "output_file_id": None, "error_file_id": None, "errors": None,
+                 "request_counts": {"total": total, "completed": 0, "failed": 0}}
+        with self.lock:
+            self.batches[batch_id] = {"batch": batch, "polls": 0, "fails": fails,
+                                      "outputs": outputs, "errors": errors}
+        return {**batch, "request_counts": dict(batch["request_counts"])}
+
+    def poll_batch(self, batch_id):
+        """Current state of a job, advancing it by one status per poll"""
+        with self.lock:
+            job = self.batches.get(batch_id)
+            if job is None:
+                return None
+            batch, polls = job["batch"], job["polls"]
+            job["polls"] += 1
+            counts = batch["request_counts"]
+            if batch["status"] in ("completed", "failed"):
+                return {**batch, "request_counts": dict(counts)}
+            if polls == 0:
+                batch["status"] = "validating"
+            elif job["fails"]:
+                batch["status"] = "failed"
+                batch["errors"] = {"object": "list", "data": [
+                    {"code": "server_error", "message": "Batch failed (mock)", "line": None}]}
+                self.stats["batches_failed"] += 1
+            elif polls <= self.batch_polls:
+                batch["status"] = "in_progress"
+                # Items finish gradually while the job is in progress
+                share = polls / (self.batch_polls + 1)
+                counts["completed"] = int(len(job["outputs"]) * share)
+                counts["failed"] = int(len(job["errors"]) * share)
+            elif polls == self.batch_polls + 1:
+                batch["status"] = "finalizing"
+            else:
+                batch["status"] = "completed"
+                counts["completed"], counts["failed"] = len(job["outputs"]), len(job["errors"])
+                self.stats["batch_item_errors"] += len(job["errors"])
+                for key, lines in (("output_file_id", job["outputs"]), ("error_file_id", job["errors"])):
+                    if lines:
+                        file_id = f"file-mock-{next(self.ids)}"
+                        content = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+                        self.files[file_id] = {"id": file_id, "object": "file", "bytes": len(content),
+                                               "created_at": int(time.time()), "filename": f"{batch_id}_{key}.jsonl",
+                                               "purpose": "batch_output", "content": content}
+                        batch[key] = file_id
+            return {**batch, "request_counts": dict(counts)}
+
+
+def mock_reply(messages):
+    """Response text matching what the prompt asks for"""
+    system = " ".join(m["content"] for m in messages if m.get("role") == "system")
+    user = messages[-1]["content"] if messages else ""
+    keys = _REQUIRED_KEYS.search(user)
+    if keys:
+        entry = {criterion: 4 for criterion in CRITERIA}
+        entry["justification"] = "Accurate and clear; mirrors the reference."
+        return json.dumps({json.loads(key): entry for key in re.findall(r'"(?:[^"\\]|\\.)*"', keys.group(1))})
+    if "Factual Accuracy" in system or "Factual Accuracy" in user:
+        return ("Factual Accuracy: 4\nClarity: 5\nNeutrality: 5\nHelpfulness: 4\n"
+                "Justification: Accurate and clear; mirrors the reference.")
+    return ANSWER
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send_json(404, {"error": {"message": f"{self.path} is not mocked", "type": "invalid_request_error"}})
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        file_match = _FILE_CONTENT.search(path)
+        batch_match = _BATCH.search(path)
+        if path.endswith("/stats"):
+            self._send_json(200, self.config.snapshot())
+        elif file_match:
+            stored = self.config.files.get(file_match.group(1))
+            if stored is None:
+                self._not_found()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(stored["content"])))
+            self.end_headers()
+            self.wfile.write(stored["content"])
+        elif batch_match:
+            batch = self.config.poll_batch(batch_match.group(1))
+            if batch is None:
+                self._not_found()
+            else:
+                self._send_json(200, batch)
+        else:
+            self._not_found()
+
+    def _upload(self, raw):
+        """``POST /files``: multipart form with ``purpose`` and ``file``"""
+        message = email.message_from_bytes(
+            f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode("utf-8") + raw,
+            policy=email.policy.HTTP)
+        fields, content, filename = {}, None, "file"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                content, filename = part.get_payload(decode=True), part.get_filename() or filename
+            else:
+                fields[name] = part.get_content().strip()
+        if content is None:
+            self._send_json(400, {"error": {"message": "Missing file", "type": "invalid_request_error"}})
+            return
+        self._send_json(200, self.config.add_file(content, filename, fields.get("purpose")))
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/files"):
+            self._upload(raw)
+            return
+        body = json.loads(raw or b"{}")
+        if path.endswith("/batches"):
+            batch = self.config.create_batch(body)
+            if batch is None:
+                self._send_json(400, {"error": {"message": f"No such file: {body.get('input_file_id')}",
+                                                "type": "invalid_request_error"}})
+            else:
+                self._send_json(200, batch)
+            return
+        if not path.endswith("/chat/completions"):
+            self._not_found()
+            return
+
+        config = self.config
+        with config.lock:
+            config.stats["in_flight"] += 1
+            config.stats["max_in_flight"] = max(config.stats["max_in_flight"], config.stats["in_flight"])
+        try:
+            outcome = config.admit()
+            if outcome == "rate_limited":
+                self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests"}},
+                                {"Retry-After": f"{config.retry_after:g}"})
+                return
+            latency = config.sample_latency()
+            if outcome == "error":
+                time.sleep(latency / 2)
+                self._send_json(503, {"error": {"message": "Service unavailable (mock)", "type": "server_error"}})
+                return
+            self._reply(body, latency)
+        finally:
+            with config.lock:
+                config.stats["in_flight"] -= 1
+
+    def _reply(self, body, latency):
+        messages = body.get("messages") or []
+        text = mock_reply(messages)
+        usage = {"prompt_tokens": sum(len(m.get("content") or "") for m in messages) // 4,
+                 "completion_tokens": len(text) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        with self.config.lock:
+            self.config.stats["ok"] += 1
+            self.config.stats["prompt_tokens"] += usage["prompt_tokens"]
+            self.config.stats["completion_tokens"] += usage["completion_tokens"]
+        base = {"id": f"chatcmpl-mock-{time.monotonic_ns()}", "created": int(time.time()),
+                "model": body.get("model", "mock")}
+
+        if not body.get("stream"):
+            time.sleep(latency)
+            self._send_json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]})
+            return
+
+        # Streamed: a fifth of the latency before the first token, the rest spread over chunks
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)] or [""]
+        time.sleep(latency * 0.2)
+        try:
+            for chunk in chunks:
+                event = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(latency * 0.8 / len(chunks))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                event = {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped reading (early stop)
+            pass
+
+
+def start_mock_server(host="127.0.0.1", port=0, **config):
+    """
+    Serve on a background thread; returns ``(server, config)``.
+
+    The base URL is ``f"http://{host}:{server.server_port}/v1"``; call
+    ``server.shutdown()`` when done.
+    """
+    mock_config = MockConfig(**config)
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"config": mock_config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, mock_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="lognormal:0.5,0.4", help="Latency distribution spec (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--rpm-limit", type=int, default=None, help="Server-side requests-per-minute cap")
+    parser.add_argument("--batch-error-rate", type=float, default=0.0,
+                        help="Share of Batch API items that fail into the error file")
+    parser.add_argument("--batch-failure-rate", type=float, default=0.0,
+                        help="Share of Batch API jobs that end 'failed'")
+    parser.add_argument("--batch-polls", type=int, default=2, help="Polls a batch job spends in_progress")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server, config = start_mock_server(args.host, args.port, latency=args.latency, error_rate=args.error_rate,
+                                       rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                                       rpm_limit=args.rpm_limit, seed=args.seed,
+                                       batch_error_rate=args.batch_error_rate,
+                                       batch_failure_rate=args.batch_failure_rate, batch_polls=args.batch_polls)
+    print(f"🧪 Mock LLM server on http://{args.host}:{server.server_port}/v1 (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"📊 {config.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
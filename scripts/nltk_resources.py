@@ -0,0 +1,94 @@
+"""
+NLTK data resources, checked once.
+
+Scripts used to call ``nltk.data.find``/``nltk.download`` when imported (and
+``evaluate_responses`` downloaded punkt on every start). Instead, code that
+tokenizes calls ``ensure_nltk_resources`` right before it needs a resource.
+The first successful lookup is recorded in a small JSON marker, so later
+processes (including pool workers) skip the lookup and never import NLTK
+just to check; a resource is only downloaded when it is really missing.
+"""
+
+import json
+import os
+from importlib import metadata
+from pathlib import Path
+
+NLTK_MARKER_PATH = Path(__file__).resolve().parent.parent / "data" / "cache" / "nltk_resources.json"
+RESOURCE_PATHS = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "stopwords": "corpora/stopwords",
+}
+
+_checked = set()
+
+
+def tokenizer_resources():
+    """Resources ``word_tokenize``/``sent_tokenize`` need with the installed NLTK"""
+    try:
+        version = tuple(int(part) for part in metadata.version("nltk").split(".")[:3] if part.isdigit())
+    except metadata.PackageNotFoundError:
+        version = ()
+    # NLTK 3.8.2 switched the Punkt models from pickles to punkt_tab
+    return ("punkt_tab",) if version >= (3, 8, 2) else ("punkt",)
+
+
+def load_marker(path=NLTK_MARKER_PATH):
+    """``{resource: location}`` for resources previously found"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_marker(marker, path):
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(marker, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Read-only checkout: just check again next time
+        pass
+
+
+def ensure_nltk_resources(*names, download=True, marker_path=NLTK_MARKER_PATH):
+    """
+    Make sure the named NLTK resources are available.
+
+    Cheap after the first call in a process, and after the first successful
+    call ever (the marker records where each resource was found). Missing
+    resources are downloaded once when ``download`` is set; raises
+    LookupError if a resource still cannot be found.
+    """
+    pending = [name for name in names if name not in _checked]
+    if not pending:
+        return
+    marker = load_marker(marker_path)
+    found_new = False
+    for name in pending:
+        location = marker.get(name)
+        if location and Path(location).exists():
+            _checked.add(name)
+            continue
+
+        import nltk
+
+        try:
+            pointer = nltk.data.find(RESOURCE_PATHS[name])
+        except LookupError:
+            if not download:
+                raise
+            print(f"📥 Downloading NLTK resource '{name}'...")
+            nltk.download(name, quiet=True)
+            pointer = nltk.data.find(RESOURCE_PATHS[name])
+        zip_file = getattr(pointer, "zipfile", None)
+        marker[name] = str(getattr(zip_file, "filename", None) or getattr(pointer, "path", pointer))
+        _checked.add(name)
+        found_new = True
+    if found_new:
+        _save_marker(marker, marker_path)
@@ -0,0 +1,243 @@
+"""
+OpenAI Batch API execution mode for large offline runs.
+
+Instead of calling the chat endpoint once per item, pending requests are
+written to a JSONL batch file, uploaded, and run as one batch job (half the
+price, separate rate limits, results within the completion window). Results
+are matched back to their items by ``custom_id`` and also stored in the LLM
+response cache, so a later live run replays them for free.
+
+Job state is kept next to the batch file (``<name>.state.json``); re-running
+after an interruption resumes polling the submitted job instead of paying
+for a second one. If the pending requests changed in the meantime, the old
+job is waited for and its results go into the cache before only the
+requests it did not answer are submitted.
+
+openai 0.28 has no Batch resource, so the ``/batches`` endpoints are called
+through its ``APIRequestor``; ``api_base`` (or ``OPENAI_API_BASE``) can point
+at a local stub that implements the file and batch endpoints.
+"""
+
+import json
+import time
+from pathlib import Path
+
+import openai
+from openai import api_requestor
+
+from llm_cache import cache_key, get_cache
+
+BATCH_DIR = Path(__file__).resolve().parent.parent / "data" / "batches"
+CHAT_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def chat_request(custom_id, model, messages, temperature=None, max_tokens=None):
+    """One line of a chat-completions batch file"""
+    body = {"model": model, "messages": messages}
+    if temperature is not None:
+        body["temperature"] = temperature
+    if max_tokens is not None:
+        body["max_tokens"] = max_tokens
+    return {"custom_id": str(custom_id), "method": "POST", "url": CHAT_ENDPOINT, "body": body}
+
+
+def write_batch_file(requests, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+def read_batch_file(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _requestor(api_key=None, api_base=None):
+    return api_requestor.APIRequestor(api_key, api_base=api_base or openai.api_base)
+
+
+def submit_batch(path, completion_window="24h", metadata=None, api_key=None, api_base=None):
+    """Upload a batch file and create the batch job; returns the job object"""
+    with open(path, "rb") as f:
+        upload = openai.File.create(file=f, purpose="batch", api_key=api_key,
+                                    api_base=api_base, user_provided_filename=Path(path).name)
+    params = {
+        "input_file_id": upload["id"],
+        "endpoint": CHAT_ENDPOINT,
+        "completion_window": completion_window,
+    }
+    if metadata:
+        params["metadata"] = metadata
+    response, _, _ = _requestor(api_key, api_base).request("post", "/batches", params=params)
+    return response.data
+
+
+def retrieve_batch(batch_id, api_key=None, api_base=None):
+    response, _, _ = _requestor(api_key, api_base).request("get", f"/batches/{batch_id}")
+    return response.data
+
+
+def wait_for_batch(batch_id, poll_interval=30, timeout=None, api_key=None, api_base=None):
+    """Poll until the job reaches a terminal status; returns the job object"""
+    started = time.monotonic()
+    last_status = None
+    while True:
+        batch = retrieve_batch(batch_id, api_key, api_base)
+        status = batch.get("status")
+        if status != last_status:
+            counts = batch.get("request_counts") or {}
+            print(f"   Batch {batch_id}: {status} "
+                  f"({counts.get('completed', 0)}/{counts.get('total', '?')} done, {counts.get('failed', 0)} failed)")
+            last_status = status
+        if status in TERMINAL_STATUSES:
+            return batch
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Batch {batch_id} still {status} after {timeout}s")
+        time.sleep(poll_interval)
+
+
+def _download_lines(file_id, api_key=None, api_base=None):
+    if not file_id:
+        return []
+    content = openai.File.download(file_id, api_key=api_key, api_base=api_base)
+    return [json.loads(line) for line in content.decode("utf-8").splitlines() if line.strip()]
+
+
+def fetch_results(batch, api_key=None, api_base=None):
+    """
+    Map ``custom_id`` → ``(content, error)`` for a finished job.
+
+    ``content`` is the stripped assistant message (None on failure) and
+    ``error`` a short description (None on success).
+    """
+    results = {}
+    lines = _download_lines(batch.get("output_file_id"), api_key, api_base)
+    lines += _download_lines(batch.get("error_file_id"), api_key, api_base)
+    for line in lines:
+        custom_id = line.get("custom_id")
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            error = line.get("error") or body.get("error") or {"status_code": response.get("status_code")}
+            results[custom_id] = (None, json.dumps(error))
+            continue
+        try:
+            content = body["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            results[custom_id] = (None, "malformed response body")
+            continue
+        results[custom_id] = (content, None)
+    return results
+
+
+def _load_state(state_path):
+    if state_path.exists():
+        with open(state_path) as f:
+            return json.load(f)
+    return None
+
+
+def _save_state(state_path, state):
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    tmp_path.replace(state_path)
+
+
+def run_batch(requests, name, on_result, batch_dir=BATCH_DIR, poll_interval=30, timeout=None,
+              completion_window="24h", cache=None, api_key=None, api_base=None):
+    """
+    Run chat ``requests`` (from ``chat_request``) as one batch job.
+
+    ``on_result(custom_id, content)`` is called for every successful item,
+    including items already answered from the response cache, which are not
+    resubmitted. Returns the ``{custom_id: error}`` of failed items so the
+    caller can fall back to live calls for them.
+    """
+    if not requests:
+        return {}
+    cache = cache if cache is not None else get_cache()
+    batch_dir = Path(batch_dir)
+    state_path = batch_dir / f"{name}.state.json"
+
+    def cache_key_for(request):
+        body = request["body"]
+        extra = {k: v for k, v in body.items() if k not in ("model", "messages", "temperature", "max_tokens")}
+        return cache_key(body["model"], body["messages"], body.get("temperature"), body.get("max_tokens"), extra)
+
+    def store_results(batch, submitted):
+        """Cache the successful results of ``batch`` for the ``submitted`` requests"""
+        results = fetch_results(batch, api_key, api_base)
+        for request in submitted:
+            content, _ = results.get(request["custom_id"], (None, None))
+            if content is not None:
+                cache.put(cache_key_for(request), request["body"]["model"], content)
+        return results
+
+    # Anything already in the response cache needs no batch slot
+    pending = []
+    for request in requests:
+        cached = cache.get(cache_key_for(request))
+        if cached is not None:
+            on_result(request["custom_id"], cached)
+        else:
+            pending.append(request)
+
+    state = _load_state(state_path)
+    if state is not None and set(state.get("custom_ids", [])) != {r["custom_id"] for r in pending}:
+        # The old job is paid for: collect what it answered, then submit only the rest
+        print(f"   ⚠️  Pending requests changed since batch {state['batch_id']} was submitted; "
+              f"collecting its results first")
+        old_batch = wait_for_batch(state["batch_id"], poll_interval, timeout, api_key, api_base)
+        submitted = {r["custom_id"]: r for r in read_batch_file(state["input_path"])}
+        old_results = store_results(old_batch, submitted.values())
+        state_path.unlink()
+        state = None
+        remaining = []
+        for request in pending:
+            old = submitted.get(request["custom_id"])
+            content = old_results.get(request["custom_id"], (None, None))[0] if old == request else None
+            if content is not None:
+                on_result(request["custom_id"], content)
+            else:
+                remaining.append(request)
+        pending = remaining
+
+    if not pending:
+        print(f"📦 Batch '{name}': all {len(requests)} requests already answered")
+        return {}
+
+    if state is None:
+        path = write_batch_file(pending, batch_dir / f"{name}.jsonl")
+        batch = submit_batch(path, completion_window, {"name": name}, api_key, api_base)
+        state = {"batch_id": batch["id"], "input_path": str(path), "status": batch.get("status"),
+                 "custom_ids": [r["custom_id"] for r in pending]}
+        _save_state(state_path, state)
+        print(f"📦 Submitted batch '{name}' ({len(pending)} requests) as {batch['id']}")
+    else:
+        print(f"📦 Resuming batch '{name}' ({state['batch_id']})")
+
+    batch = wait_for_batch(state["batch_id"], poll_interval, timeout, api_key, api_base)
+    state["status"] = batch.get("status")
+    _save_state(state_path, state)
+
+    results = store_results(batch, pending)
+    failures = {}
+    for request in pending:
+        custom_id = request["custom_id"]
+        content, error = results.get(custom_id, (None, f"no result (batch {batch.get('status')})"))
+        if content is None:
+            failures[custom_id] = error
+            continue
+        on_result(custom_id, content)
+
+    print(f"📦 Batch '{name}': {len(pending) - len(failures)} succeeded, {len(failures)} failed, "
+          f"{len(requests) - len(pending)} already answered")
+    # A finished job is not resumed again; the next run submits what is still pending
+    if batch.get("status") in TERMINAL_STATUSES:
+        state_path.unlink()
+    return failures
@@ -0,0 +1,172 @@
+"""
+Vectorized paired significance tests between every pair of models.
+
+Every model answers the same questions, so the scores are pivoted once into
+a question × model matrix per criterion and all model pairs are tested
+together as paired tests on the per-question differences: one NumPy/SciPy
+call per criterion rather than a filter-and-test per pair. P-values are
+adjusted for multiple comparisons (Holm or Benjamini–Hochberg) and
+everything comes back as one tidy DataFrame, one row per
+(criterion, model pair).
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+TESTS = ("ttest", "wilcoxon")
+CORRECTIONS = ("holm", "bh", "none")
+COLUMNS = ["criterion", "model_a", "model_b", "n", "mean_a", "mean_b", "mean_diff", "effect_size",
+           "test", "statistic", "p_value", "p_adjusted", "significant"]
+
+
+def score_matrix(df, value, models=None, id_col="id", model_col="model"):
+    """
+    Pivot ``df`` to a questions × models matrix of ``value``.
+
+    Repeated (question, model) rows are averaged; a model with no score for a
+    question gets NaN. Returns ``(matrix, models)``.
+    """
+    table = df.pivot_table(index=id_col, columns=model_col, values=value, aggfunc="mean", observed=True)
+    if models is not None:
+        table = table.reindex(columns=list(models))
+    return table.to_numpy(dtype=float), [str(m) for m in table.columns]
+
+
+def holm(p_values):
+    """Holm step-down adjusted p-values (NaNs are left out of the family)"""
+    return _adjust(p_values, step_down=True)
+
+
+def benjamini_hochberg(p_values):
+    """Benjamini–Hochberg (FDR) adjusted p-values (NaNs are left out of the family)"""
+    return _adjust(p_values, step_down=False)
+
+
+def _adjust(p_values, step_down):
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = np.full_like(p_values, np.nan)
+    valid = ~np.isnan(p_values)
+    p = p_values[valid]
+    m = len(p)
+    if not m:
+        return adjusted
+    order = np.argsort(p)
+    ranked = p[order]
+    if step_down:
+        scaled = np.maximum.accumulate((m - np.arange(m)) * ranked)
+    else:
+        scaled = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    result = np.empty(m)
+    result[order] = np.minimum(scaled, 1.0)
+    adjusted[valid] = result
+    return adjusted
+
+
+def adjust_p_values(p_values, method="holm"):
+    if method == "holm":
+        return holm(p_values)
+    if method == "bh":
+        return benjamini_hochberg(p_values)
+    if method == "none":
+        return np.asarray(p_values, dtype=float)
+    raise ValueError(f"Unknown correction {method!r}; expected one of {CORRECTIONS}")
+
+
+def _paired_ttest(diffs):
+    """Paired t-test on each column of ``diffs`` (NaN rows dropped per column)"""
+    # SciPy takes about a second to import; only load it once a test runs
+    from scipy import stats
+
+    n = np.sum(~np.isnan(diffs), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(diffs, axis=0)
+        sd = np.nanstd(diffs, axis=0, ddof=1)
+        t = mean / (sd / np.sqrt(n))
+    # Identical scores throughout: no evidence of a difference
+    t = np.where((sd == 0) & (mean == 0), 0.0, t)
+    p = 2 * stats.t.sf(np.abs(t), np.maximum(n - 1, 1))
+    p = np.where(n < 2, np.nan, p)
+    return t, p
+
+
+def _wilcoxon(diffs):
+    """Wilcoxon signed-rank test on each column of ``diffs``"""
+    from scipy import stats
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        result = stats.wilcoxon(diffs, axis=0, nan_policy="omit", zero_method="wilcox")
+    statistic = np.asarray(result.statistic, dtype=float)
+    p = np.asarray(result.pvalue, dtype=float)
+    # Every difference zero: the test is undefined, report no difference
+    all_zero = np.all((diffs == 0) | np.isnan(diffs), axis=0)
+    return np.where(all_zero, 0.0, statistic), np.where(all_zero, 1.0, p)
+
+
+def pairwise_tests(df, criteria, models=None, test="ttest", correction="holm", family="criterion",
+                   alpha=0.05, id_col="id", model_col="model"):
+    """
+    Paired tests between every pair of models on each criterion.
+
+    Only questions scored for both models count towards a pair. ``test`` is
+    ``"ttest"`` (paired t) or ``"wilcoxon"`` (signed-rank); ``correction`` is
+    ``"holm"``, ``"bh"`` or ``"none"``, applied within each criterion
+    (``family="criterion"``) or across every test (``family="all"``).
+    ``effect_size`` is Cohen's d_z (mean difference / SD of differences) and
+    ``mean_diff`` is ``mean_a - mean_b`` over the shared questions.
+    """
+    if test not in TESTS:
+        raise ValueError(f"Unknown test {test!r}; expected one of {TESTS}")
+    if family not in ("criterion", "all"):
+        raise ValueError(f"Unknown family {family!r}; expected 'criterion' or 'all'")
+
+    frames = []
+    for criterion in criteria:
+        matrix, names = score_matrix(df, criterion, models, id_col, model_col)
+        if len(names) < 2:
+            continue
+        a, b = np.triu_indices(len(names), k=1)
+        diffs = matrix[:, a] - matrix[:, b]
+        shared = ~np.isnan(diffs)
+
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean_a = np.nanmean(np.where(shared, matrix[:, a], np.nan), axis=0)
+            mean_b = np.nanmean(np.where(shared, matrix[:, b], np.nan), axis=0)
+            mean_diff = np.nanmean(diffs, axis=0)
+            effect = mean_diff / np.nanstd(diffs, axis=0, ddof=1)
+        effect = np.where(mean_diff == 0, 0.0, effect)
+
+        statistic, p = _paired_ttest(diffs) if test == "ttest" else _wilcoxon(diffs)
+        names = np.asarray(names, dtype=object)
+        frame = pd.DataFrame({
+            "criterion": criterion,
+            "model_a": names[a],
+            "model_b": names[b],
+            "n": shared.sum(axis=0),
+            "mean_a": mean_a,
+            "mean_b": mean_b,
+            "mean_diff": mean_diff,
+            "effect_size": effect,
+            "test": test,
+            "statistic": statistic,
+            "p_value": p,
+        })
+        if family == "criterion":
+            frame["p_adjusted"] = adjust_p_values(frame["p_value"], correction)
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    result = pd.concat(frames, ignore_index=True)
+    if family == "all":
+        result["p_adjusted"] = adjust_p_values(result["p_value"], correction)
+    result["significant"] = result["p_adjusted"] < alpha
+    return result[COLUMNS]
+
+
+def significance_stars(p):
+    return "***" if p < 0.001 else "**" if p < 0.01 else "*" if p < 0.05 else ""
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Incremental pipeline runner: ground truth → generation/judging (single
+judge and ensemble) → featurization → statistics/figures → export, as a
+DAG of stages.
+
+Each stage declares the files it reads (data, and the scripts that process
+them together with every project module those import) and the files it
+writes; a stage depends on whichever stages write its inputs. The
+generation and judging stages read harvested ground truth, so they follow
+``ground_truth``. Before a stage runs, the SHA-256 of every input and output is
+compared with the hashes recorded after its last successful run (in
+``data/cache/pipeline_state.json``); if nothing changed and the outputs are
+still there, the stage is skipped. Because the decision is taken on content
+rather than modification times, a stage that reruns but writes identical
+outputs does not invalidate anything downstream. Stages whose dependencies
+are done run in parallel in a process pool (the API stages are
+independent of each other, as are statistics and figures).
+
+Stages marked ``api`` call paid APIs. They only run with ``--llm``;
+without it their existing outputs are used as they are. Optional inputs
+and outputs (e.g. the ensemble judgments) are hashed when they exist, but a
+stage is neither blocked nor failed when they are missing.
+
+Usage:
+    python scripts/pipeline.py                 # everything, skipping up-to-date stages
+    python scripts/pipeline.py figures         # a stage and what it depends on
+    python scripts/pipeline.py --dry-run
+    python scripts/pipeline.py --force stats   # rerun a stage regardless of hashes
+    python scripts/pipeline.py judging --llm   # allow API stages to run
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+DATA_DIR = ROOT / "data"
+RESULTS_DIR = ROOT / "results"
+FIGURES_DIR = RESULTS_DIR / "figures"
+PIPELINE_CACHE_DIR = DATA_DIR / "cache" / "pipeline"
+ANALYSIS_FRAME_PATH = PIPELINE_CACHE_DIR / "analysis_frame.parquet"
+STATE_PATH = DATA_DIR / "cache" / "pipeline_state.json"
+STATE_VERSION = 1
+BOOTSTRAP_TABLES = ("models", "categories", "pairwise")
+# EnhancedHealthAnalysis.create_visualizations, then create_visualizations.comprehensive_figures
+FIGURES = ("model_comparison_analysis.png", "criteria_analysis.png", "performance_dashboard.png",
+           "category_heatmap.png", "length_analysis.png", "correlation_matrix.png", "risk_assessment.png",
+           "performance_trends.png", "category_comparison.png")
+
+
+class Stage:
+    """A pipeline step: the files it reads and writes and how to produce them"""
+
+    def __init__(self, name, description, inputs, outputs, run, api=False, optional_inputs=(),
+                 optional_outputs=()):
+        self.name = name
+        self.description = description
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.run = run
+        self.api = api
+        self.optional_inputs = [Path(p) for p in optional_inputs]
+        self.optional_outputs = [Path(p) for p in optional_outputs]
+
+
+def _run_script(script, *args):
+    # The API scripts use paths relative to the repository root
+    subprocess.run([sys.executable, str(SCRIPTS_DIR / script), *args], cwd=ROOT, check=True)
+
+
+def _analyzer():
+    """An analyzer over the featurized frame written by the ``featurize`` stage"""
+    import pandas as pd
+
+    from enhanced_analysis import EnhancedHealthAnalysis
+
+    analyzer = EnhancedHealthAnalysis(DATA_DIR)
+    analyzer.df = pd.read_parquet(ANALYSIS_FRAME_PATH)
+    return analyzer
+
+
+def run_ground_truth():
+    _run_script("get_ground_truth.py")
+
+
+def run_generation():
+    _run_script("compare_models.py")
+
+
+def run_judging():
+    _run_script("restructure_evaluations.py")
+
+
+def run_ensemble():
+    _run_script("ensemble_judging.py")
+
+
+def run_columnar():
+    from columnar_store import convert_json
+
+    rows, questions = convert_json(DATA_DIR / "evaluations_restructured.json")
+    print(f"✅ Parquet store: {rows} evaluations, {questions} questions")
+
+
+def run_featurize():
+    from columnar_store import read_evaluations, read_questions
+    from enhanced_analysis import EnhancedHealthAnalysis
+
+    analyzer = EnhancedHealthAnalysis(DATA_DIR)
+    # Read the Parquet store directly: the hashes already say it matches the
+    # JSON even when its mtime is older (load_data would fall back to JSON)
+    analyzer.evaluation_frame = read_evaluations(DATA_DIR / "evaluations.parquet").merge(
+        read_questions(DATA_DIR / "questions.parquet"), on='question_id', how='left')
+    analyzer.create_analysis_dataframe()
+    analyzer.join_ensemble()
+    PIPELINE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    analyzer.df.to_parquet(ANALYSIS_FRAME_PATH, index=False)
+
+
+def run_stats():
+    analyzer = _analyzer()
+    # The frame already has the ensemble columns; this recomputes the agreement tables
+    analyzer.join_ensemble()
+    analyzer.model_comparison_analysis()
+    analyzer.bootstrap_analysis()
+    analyzer.response_quality_analysis()
+    analyzer.safety_and_bias_analysis()
+    analyzer.export_statistics(RESULTS_DIR)
+
+
+def run_figures():
+    from create_visualizations import create_comprehensive_visualizations, figure_frame
+
+    analyzer = _analyzer()
+    analyzer.create_visualizations(FIGURES_DIR)
+    create_comprehensive_visualizations(figure_frame(analyzer.df), FIGURES_DIR)
+
+
+def run_export():
+    import pandas as pd
+
+    analyzer = _analyzer()
+    analyzer.pairwise_results = pd.read_csv(RESULTS_DIR / "pairwise_tests.csv")
+    analyzer.bootstrap_results = {name: pd.read_csv(RESULTS_DIR / f"bootstrap_{name}.csv")
+                                  for name in BOOTSTRAP_TABLES}
+    if (RESULTS_DIR / "judge_agreement.csv").exists() and "judge_disagreement" in analyzer.df:
+        analyzer.agreement_results = pd.read_csv(RESULTS_DIR / "judge_agreement.csv")
+    analyzer.export_results(RESULTS_DIR, include_statistics=False)
+
+
+def _scripts(*names):
+    """
+    ``names`` and every project module they import, directly or not.
+
+    Imports are read from the source (including those inside functions), so
+    editing e.g. ``judge_parser.py`` reruns every stage that parses judge
+    output without listing it by hand.
+    """
+    seen, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        for node in ast.walk(ast.parse((SCRIPTS_DIR / name).read_text(encoding="utf-8"))):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                modules = [node.module]
+            else:
+                continue
+            todo.extend(f"{module.split('.')[0]}.py" for module in modules
+                        if (SCRIPTS_DIR / f"{module.split('.')[0]}.py").exists())
+    return [SCRIPTS_DIR / name for name in sorted(seen)]
+
+
+STAGES = [
+    Stage("ground_truth", "Collect ground truth from trusted sites",
+          [DATA_DIR / "questions.json", *_scripts("get_ground_truth.py")],
+          [DATA_DIR / "ground_truth.json"], run_ground_truth, api=True),
+    Stage("generation", "Generate and judge responses from several models",
+          [DATA_DIR / "questions.json", DATA_DIR / "ground_truth.json", ROOT / "config" / "providers.json",
+           *_scripts("compare_models.py")],
+          [DATA_DIR / "model_comparison_results.json"], run_generation, api=True),
+    Stage("judging", "Judge every model's response into the structured format",
+          [DATA_DIR / "questions.json", DATA_DIR / "ground_truth.json", DATA_DIR / "evaluations.json",
+           ROOT / "config" / "providers.json", *_scripts("restructure_evaluations.py")],
+          [DATA_DIR / "evaluations_restructured.json"], run_judging, api=True),
+    Stage("ensemble", "Score every response with an ensemble of judge models",
+          [DATA_DIR / "questions.json", DATA_DIR / "ground_truth.json", ROOT / "config" / "providers.json",
+           *_scripts("ensemble_judging.py")],
+          [DATA_DIR / "evaluations_ensemble.json"], run_ensemble, api=True),
+    Stage("columnar", "Convert the structured evaluations to the Parquet store",
+          [DATA_DIR / "evaluations_restructured.json", *_scripts("columnar_store.py")],
+          [DATA_DIR / "evaluations.parquet", DATA_DIR / "questions.parquet"], run_columnar),
+    Stage("featurize", "Build the analysis frame with text features and overlap metrics",
+          [DATA_DIR / "evaluations.parquet", DATA_DIR / "questions.parquet",
+           *_scripts("enhanced_analysis.py", "columnar_store.py")],
+          [ANALYSIS_FRAME_PATH], run_featurize, optional_inputs=[DATA_DIR / "evaluations_ensemble.json"]),
+    Stage("stats", "Paired tests, bootstrap confidence intervals and judge agreement",
+          [ANALYSIS_FRAME_PATH, *_scripts("enhanced_analysis.py")],
+          [RESULTS_DIR / "pairwise_tests.csv", *(RESULTS_DIR / f"bootstrap_{name}.csv" for name in BOOTSTRAP_TABLES)],
+          run_stats, optional_inputs=[DATA_DIR / "evaluations_ensemble.json"],
+          optional_outputs=[RESULTS_DIR / "judge_agreement.csv"]),
+    Stage("figures", "Render the analysis and comprehensive figures",
+          [ANALYSIS_FRAME_PATH, *_scripts("enhanced_analysis.py", "create_visualizations.py")],
+          [FIGURES_DIR / name for name in FIGURES], run_figures),
+    Stage("export", "Write the score table and the summary report",
+          [ANALYSIS_FRAME_PATH, RESULTS_DIR / "pairwise_tests.csv",
+           *(RESULTS_DIR / f"bootstrap_{name}.csv" for name in BOOTSTRAP_TABLES), *_scripts("enhanced_analysis.py")],
+          [RESULTS_DIR / "enhanced_scores.csv", RESULTS_DIR / "enhanced_analysis_summary.txt"], run_export,
+          optional_inputs=[RESULTS_DIR / "judge_agreement.csv"],
+          optional_outputs=[RESULTS_DIR / "judge_disagreements.csv"]),
+]
+
+
+def stages_by_name(stages=STAGES):
+    return {stage.name: stage for stage in stages}
+
+
+def dependencies(stages=STAGES, required_only=False):
+    """``{stage: [stages that write one of its inputs]}``"""
+    producers = {output: stage.name for stage in stages for output in stage.outputs + stage.optional_outputs}
+    deps = {}
+    for stage in stages:
+        inputs = stage.inputs if required_only else stage.inputs + stage.optional_inputs
+        deps[stage.name] = sorted({producers[p] for p in inputs if p in producers} - {stage.name})
+    return deps
+
+
+def select(targets, stages=STAGES):
+    """``targets`` and everything they depend on, in declaration (topological) order"""
+    deps = dependencies(stages)
+    selected, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(deps[name])
+    return [stage.name for stage in stages if stage.name in selected]
+
+
+def _relative(path):
+    try:
+        return str(path.relative_to(ROOT))
+    except ValueError:
+        return str(path)
+
+
+class HashCache:
+    """SHA-256 of files, reused while a file's size and mtime are unchanged"""
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    def digest(self, path):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        key = _relative(path)
+        entry = self.entries.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        self.entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": h.hexdigest()}
+        return h.hexdigest()
+
+    def digests(self, paths):
+        return {_relative(path): self.digest(path) for path in paths}
+
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+    if state.get("version") != STATE_VERSION:
+        state = {"version": STATE_VERSION, "files": {}, "stages": {}}
+    return state
+
+
+def save_state(state, path=STATE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def plan_stage(stage, record, hashes, force=False, allow_api=False):
+    """
+    Decide what to do with a stage whose dependencies are finished.
+
+    Returns ``(action, inputs, detail)`` where action is ``"skip"`` (hashes
+    match the last run), ``"keep"`` (API stage not allowed to run; its
+    existing outputs are used), ``"blocked"`` or ``"run"``.
+    """
+    inputs = hashes.digests(stage.inputs + stage.optional_inputs)
+    outputs = hashes.digests(stage.outputs + stage.optional_outputs)
+    outputs_exist = all(hashes.digest(path) is not None for path in stage.outputs)
+    if (not force and outputs_exist and record
+            and record.get("inputs") == inputs and record.get("outputs") == outputs):
+        return "skip", inputs, "up to date"
+    if stage.api and not allow_api:
+        if outputs_exist:
+            return "keep", inputs, "existing outputs used (pass --llm to rerun)"
+        return "blocked", inputs, "outputs missing; needs API calls (pass --llm)"
+    missing = [_relative(path) for path in stage.inputs if hashes.digest(path) is None]
+    if missing:
+        return "blocked", inputs, f"missing input {', '.join(missing)}"
+    if force:
+        return "run", inputs, "forced"
+    if not record:
+        return "run", inputs, "never run"
+    changed = [name for name, digest in {**inputs, **outputs}.items()
+               if digest != {**record.get("inputs", {}), **record.get("outputs", {})}.get(name)]
+    return "run", inputs, f"changed: {', '.join(changed)}"
+
+
+def _execute(name):
+    """Run one stage (in a pool worker); returns its wall time"""
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    started = time.perf_counter()
+    stages_by_name()[name].run()
+    return time.perf_counter() - started
+
+
+def run_pipeline(targets=None, force=None, allow_api=False, jobs=None, dry_run=False, state_path=STATE_PATH):
+    """
+    Run ``targets`` (default: every stage) and their dependencies.
+
+    ``force`` is a collection of stage names to rerun regardless of hashes
+    (an empty collection forces every selected stage). Returns
+    ``{stage: status}`` with status ``"ran"``, ``"skipped"``, ``"kept"``,
+    ``"blocked"``, ``"failed"`` (or ``"would run"`` in a dry run).
+    """
+    by_name = stages_by_name()
+    unknown = sorted(set(targets or []) - set(by_name))
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {', '.join(unknown)}; expected {', '.join(by_name)}")
+    order = select(targets or list(by_name))
+    forced = set(order) if force is not None and not force else set(force or [])
+    deps = dependencies()
+    required = dependencies(required_only=True)
+    state = load_state(state_path)
+    hashes = HashCache(state["files"])
+    statuses = {}
+
+    def report(name, icon, status, detail):
+        statuses[name] = status
+        print(f"  {icon} {name:<13} {detail}")
+
+    print(f"\n🧩 PIPELINE ({len(order)} stages{', dry run' if dry_run else ''})")
+    print("=" * 50)
+    pending = list(order)
+    running = {}
+    with ProcessPoolExecutor(max_workers=max(1, jobs or os.cpu_count() or 1)) as pool:
+        while pending or running:
+            for name in list(pending):
+                upstream = [dep for dep in deps[name] if dep in order]
+                if any(dep not in statuses for dep in upstream):
+                    continue
+                pending.remove(name)
+                stage = by_name[name]
+                if any(statuses[dep] in ("blocked", "failed") for dep in required[name] if dep in order):
+                    report(name, "⛔", "blocked", "upstream stage did not finish")
+                    continue
+                if dry_run and any(statuses[dep] == "would run" for dep in upstream):
+                    report(name, "❔", "would run", "runs if upstream outputs change")
+                    continue
+                action, inputs, detail = plan_stage(stage, state["stages"].get(name), hashes,
+                                                    force=name in forced, allow_api=allow_api)
+                if action == "skip":
+                    report(name, "✅", "skipped", detail)
+                elif action == "keep":
+                    report(name, "📌", "kept", detail)
+                elif action == "blocked":
+                    report(name, "⛔", "blocked", detail)
+                elif dry_run:
+                    report(name, "▶️ ", "would run", detail)
+                else:
+                    print(f"  ▶️  {name:<13} running ({detail})")
+                    running[pool.submit(_execute, name)] = (name, inputs)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, inputs = running.pop(future)
+                stage = by_name[name]
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    report(name, "❌", "failed", f"failed: {e}")
+                    continue
+                outputs = hashes.digests(stage.outputs + stage.optional_outputs)
+                missing = [_relative(path) for path in stage.outputs if outputs[_relative(path)] is None]
+                if missing:
+                    report(name, "❌", "failed", f"did not write {', '.join(missing)}")
+                    continue
+                state["stages"][name] = {
+                    "inputs": inputs,
+                    "outputs": outputs,
+                    "seconds": round(seconds, 2),
+                    "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                }
+                save_state(state, state_path)
+                report(name, "✅", "ran", f"done in {seconds:.1f}s")
+
+    if not dry_run:
+        save_state(state, state_path)
+    counts = {status: list(statuses.values()).count(status) for status in dict.fromkeys(statuses.values())}
+    print("\n📋 " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+    return statuses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the pipeline, skipping stages whose inputs are unchanged")
+    parser.add_argument("targets", nargs="*", metavar="stage",
+                        help=f"Stages to bring up to date with their dependencies (default: all of "
+                             f"{', '.join(stage.name for stage in STAGES)})")
+    parser.add_argument("--force", nargs="*", metavar="stage", default=None,
+                        help="Rerun these stages (no names: every selected stage) even if up to date")
+    parser.add_argument("--llm", action="store_true", help="Allow stages that call paid APIs to run")
+    parser.add_argument("--jobs", type=int, default=None, help="Stages run in parallel (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would run without running it")
+    parser.add_argument("--list", action="store_true", help="List the stages with their inputs and outputs")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        deps = dependencies()
+        for stage in STAGES:
+            print(f"{stage.name}{' (api)' if stage.api else ''}: {stage.description}")
+            print(f"  after:   {', '.join(deps[stage.name]) or '-'}")
+            print(f"  inputs:  {', '.join(_relative(p) for p in stage.inputs)}"
+                  + "".join(f", {_relative(p)} (optional)" for p in stage.optional_inputs))
+            print(f"  outputs: {', '.join(_relative(p) for p in stage.outputs)}"
+                  + "".join(f", {_relative(p)} (optional)" for p in stage.optional_outputs))
+        return
+
+    try:
+        statuses = run_pipeline(args.targets, force=args.force, allow_api=args.llm, jobs=args.jobs,
+                                dry_run=args.dry_run)
+    except ValueError as e:
+        parser.error(str(e))
+    if "failed" in statuses.values():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+"""
+Provider layer for chat-model calls.
+
+Models are declared in ``config/providers.json`` (override the path with
+``LLM_PROVIDERS_CONFIG``). Each model points at a provider; each provider
+owns one pooled keep-alive HTTP session, a concurrency cap and a
+requests/tokens-per-minute budget shared by every thread that calls it.
+Adding a model, or pointing one at a different endpoint, is a config edit.
+
+Provider types:
+    openai     OpenAI-compatible /chat/completions (OpenAI, Azure-style proxies)
+    anthropic  Anthropic-style /messages
+    local      OpenAI-compatible local server (llama.cpp, vLLM); no key needed
+
+Usage:
+    from providers import complete, stream_complete
+    text = complete("gpt-4", messages, temperature=0.7, max_tokens=200)
+    text = stream_complete("gpt-4", messages, max_tokens=2000, stop=lambda text: "END" in text)
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from async_evaluator import RETRYABLE_STATUS_CODES, backoff_delay, estimate_tokens
+from call_metrics import get_sink
+from llm_cache import get_cache
+
+PROVIDERS_CONFIG = Path(__file__).resolve().parent.parent / "config" / "providers.json"
+
+
+class ProviderError(RuntimeError):
+    """A provider request failed (after retries, for retryable errors)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class UnknownModelError(KeyError):
+    """The model is neither configured nor matched by a model prefix"""
+
+
+class ThreadTokenBucket:
+    """Thread-safe token bucket that refills continuously at ``rate_per_minute``"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ChatProvider:
+    """Base provider: pooled session, concurrency cap, rate budget and retries"""
+
+    default_api_base = None
+    requires_key = True
+
+    def __init__(self, name, api_base=None, api_key=None, max_concurrency=4,
+                 requests_per_minute=None, tokens_per_minute=None, max_retries=5,
+                 base_delay=1.0, max_delay=60.0, timeout=120, headers=None):
+        self.name = name
+        self.api_base = (api_base or self.default_api_base or "").rstrip("/")
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.requests = ThreadTokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = ThreadTokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers or {})
+
+    def _build_request(self, model, messages, temperature, max_tokens, extra):
+        """Return ``(path, payload, headers)`` for one chat request"""
+        raise NotImplementedError
+
+    def _parse_response(self, data):
+        """Extract the assistant text from a decoded response body"""
+        raise NotImplementedError
+
+    def _parse_usage(self, data):
+        """
+        Token counts reported by the API: ``prompt_tokens``, ``completion_tokens``
+        and ``cached_tokens`` (prompt tokens served from the provider's prefix
+        cache). Counts the response does not carry are left out.
+        """
+        return {}
+
+    # Request body fields that turn on server-sent-event streaming
+    stream_fields = {"stream": True}
+
+    def _parse_stream_event(self, data, usage):
+        """Text delta carried by one decoded stream event; fills ``usage`` when reported"""
+        raise NotImplementedError
+
+    def _acquire(self, messages, max_tokens):
+        if self.requests is not None:
+            self.requests.acquire(1)
+        if self.tokens is not None:
+            self.tokens.acquire(estimate_tokens(messages, max_tokens))
+
+    def _post(self, url, payload, headers, model, messages, started, stream=False):
+        """POST with retries on 429/5xx; returns ``(response, retries)``"""
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                res = self.session.post(url, json=payload, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = ProviderError(f"{self.name}: {e}")
+            else:
+                if res.ok:
+                    return res, attempt
+                error = ProviderError(f"{self.name}: HTTP {res.status_code}: {res.text[:200]}",
+                                      status=res.status_code)
+                if res.status_code not in RETRYABLE_STATUS_CODES:
+                    self._record(model, messages, None, {}, started, attempt, error)
+                    raise error
+                retry_after = res.headers.get("Retry-After")
+            if attempt >= self.max_retries:
+                self._record(model, messages, None, {}, started, attempt, error)
+                raise error
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _check_key(self):
+        if self.requires_key and not self.api_key:
+            raise ProviderError(f"No API key configured for provider '{self.name}'")
+
+    def chat(self, model, messages, temperature=None, max_tokens=None, **extra):
+        """
+        Send one chat request, waiting for a slot and rate budget first.
+
+        ``extra`` is merged into the request body (e.g. ``response_format``).
+        """
+        self._check_key()
+        path, payload, headers = self._build_request(model, messages, temperature, max_tokens, extra)
+
+        with self._slots:
+            self._acquire(messages, max_tokens)
+            # Latency covers the request and any retries, not the wait for a slot
+            started = time.monotonic()
+            res, retries = self._post(f"{self.api_base}{path}", payload, headers, model, messages, started)
+            data = res.json()
+            text = self._parse_response(data)
+            self._record(model, messages, text, self._parse_usage(data), started, retries)
+            return text
+
+    def stream(self, model, messages, temperature=None, max_tokens=None, **extra):
+        """
+        Yield text deltas as the server produces them.
+
+        Closing the generator early closes the connection, which stops
+        generation (and billing) server-side. Only the initial request is
+        retried; a stream that fails midway raises ``ProviderError``.
+        """
+        self._check_key()
+        path, payload, headers = self._build_request(model, messages, temperature, max_tokens,
+                                                     {**extra, **self.stream_fields})
+
+        with self._slots:
+            self._acquire(messages, max_tokens)
+            started = time.monotonic()
+            res, retries = self._post(f"{self.api_base}{path}", payload, headers, model, messages,
+                                      started, stream=True)
+            parts, usage, ttft_s, error, finished = [], {}, None, None, False
+            try:
+                for line in res.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    event = line[5:].strip()
+                    if event == "[DONE]":
+                        break
+                    delta = self._parse_stream_event(json.loads(event), usage)
+                    if delta:
+                        if ttft_s is None:
+                            ttft_s = time.monotonic() - started
+                        parts.append(delta)
+                        yield delta
+                finished = True
+            except (requests.RequestException, ValueError) as e:
+                error = ProviderError(f"{self.name}: stream failed: {e}")
+                raise error
+            finally:
+                res.close()
+                self._record(model, messages, None if error else "".join(parts), usage, started,
+                             retries, error, ttft_s=ttft_s, stopped_early=not finished and error is None)
+
+    def _record(self, model, messages, text, usage, started, retries, error=None, ttft_s=None, **fields):
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        estimated = False
+        # Some local servers omit usage, and a stream stopped early never
+        # reports completion tokens; fall back to the ~4 chars/token estimate
+        if text is not None and prompt_tokens is None:
+            prompt_tokens, estimated = estimate_tokens(messages), True
+        if text is not None and completion_tokens is None:
+            completion_tokens, estimated = len(text) // 4, True
+        get_sink().record(model, time.monotonic() - started, prompt_tokens, completion_tokens,
+                          retries=retries, ttft_s=ttft_s, provider=self.name,
+                          error=str(error) if error else None, tokens_estimated=estimated,
+                          cached_tokens=usage.get("cached_tokens"), **fields)
+
+
+class OpenAICompatibleProvider(ChatProvider):
+    """``POST /chat/completions`` with bearer auth"""
+
+    default_api_base = "https://api.openai.com/v1"
+
+    def _build_request(self, model, messages, temperature, max_tokens, extra):
+        payload = {"model": model, "messages": messages, **extra}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        return "/chat/completions", payload, headers
+
+    def _parse_response(self, data):
+        return (data["choices"][0]["message"]["content"] or "").strip()
+
+    def _parse_usage(self, data):
+        usage = data.get("usage") or {}
+        counts = {key: usage[key] for key in ("prompt_tokens", "completion_tokens") if key in usage}
+        details = usage.get("prompt_tokens_details") or {}
+        if "cached_tokens" in details:
+            counts["cached_tokens"] = details["cached_tokens"]
+        return counts
+
+    # include_usage adds a final chunk carrying the token counts
+    stream_fields = {"stream": True, "stream_options": {"include_usage": True}}
+
+    def _parse_stream_event(self, data, usage):
+        if data.get("usage"):
+            usage.update(self._parse_usage(data))
+        choices = data.get("choices") or []
+        return (choices[0].get("delta") or {}).get("content") if choices else None
+
+
+class LocalProvider(OpenAICompatibleProvider):
+    """OpenAI-compatible local server (llama.cpp ``server``, vLLM); key optional"""
+
+    default_api_base = "http://localhost:8000/v1"
+    requires_key = False
+
+
+class AnthropicProvider(ChatProvider):
+    """``POST /messages``; system messages move to the top-level ``system`` field"""
+
+    default_api_base = "https://api.anthropic.com/v1"
+    api_version = "2023-06-01"
+    default_max_tokens = 1024
+
+    def __init__(self, name, cache_system_prompt=False, **kwargs):
+        super().__init__(name, **kwargs)
+        # Anthropic only caches prefixes explicitly marked with cache_control
+        self.cache_system_prompt = cache_system_prompt
+
+    def _build_request(self, model, messages, temperature, max_tokens, extra):
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        # OpenAI's JSON mode has no /messages equivalent; the prompt asks for JSON anyway
+        extra = {k: v for k, v in extra.items() if k != "response_format"}
+        payload = {
+            **extra,
+            "model": model,
+            "messages": [m for m in messages if m["role"] != "system"],
+            "max_tokens": max_tokens or self.default_max_tokens,
+        }
+        if system and self.cache_system_prompt:
+            payload["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        elif system:
+            payload["system"] = system
+        if temperature is not None:
+            payload["temperature"] = temperature
+        headers = {"x-api-key": self.api_key or "", "anthropic-version": self.api_version}
+        return "/messages", payload, headers
+
+    def _parse_response(self, data):
+        return "".join(block.get("text", "") for block in data.get("content", [])
+                       if block.get("type") == "text").strip()
+
+    def _parse_usage(self, data):
+        usage = data.get("usage") or {}
+        counts = {}
+        if "input_tokens" in usage:
+            # input_tokens excludes prompt tokens read from or written to the cache
+            cached = usage.get("cache_read_input_tokens") or 0
+            counts["prompt_tokens"] = usage["input_tokens"] + cached + (usage.get("cache_creation_input_tokens") or 0)
+            counts["cached_tokens"] = cached
+        if "output_tokens" in usage:
+            counts["completion_tokens"] = usage["output_tokens"]
+        return counts
+
+    def _parse_stream_event(self, data, usage):
+        kind = data.get("type")
+        if kind == "message_start":
+            usage.update(self._parse_usage(data.get("message") or {}))
+        elif kind == "message_delta":
+            usage["completion_tokens"] = self._parse_usage(data).get("completion_tokens")
+        elif kind == "content_block_delta":
+            return (data.get("delta") or {}).get("text")
+        elif kind == "error":
+            raise ValueError(json.dumps(data.get("error")))
+        return None
+
+
+PROVIDER_TYPES = {
+    "openai": OpenAICompatibleProvider,
+    "anthropic": AnthropicProvider,
+    "local": LocalProvider,
+}
+
+
+def load_config(path=None):
+    path = Path(path or os.getenv("LLM_PROVIDERS_CONFIG", PROVIDERS_CONFIG))
+    with open(path) as f:
+        return json.load(f)
+
+
+class ModelRegistry:
+    """Resolve model names to providers and route chat calls through them"""
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else load_config()
+        self.models = self.config.get("models", {})
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def provider(self, name):
+        """The shared provider instance for ``name`` (created on first use)"""
+        with self._lock:
+            if name not in self._providers:
+                spec = dict(self.config["providers"][name])
+                provider_cls = PROVIDER_TYPES[spec.pop("type", "openai")]
+                base_env = spec.pop("api_base_env", None)
+                key_env = spec.pop("api_key_env", None)
+                if base_env and os.getenv(base_env):
+                    spec["api_base"] = os.getenv(base_env)
+                if key_env:
+                    spec.setdefault("api_key", os.getenv(key_env))
+                self._providers[name] = provider_cls(name, **spec)
+            return self._providers[name]
+
+    def model_spec(self, model_name):
+        if model_name in self.models:
+            return self.models[model_name]
+        for prefix, provider in self.config.get("model_prefixes", {}).items():
+            if model_name.startswith(prefix):
+                return {"provider": provider}
+        raise UnknownModelError(f"Model '{model_name}' is not configured in {PROVIDERS_CONFIG.name}")
+
+    def resolve(self, model_name):
+        """Return ``(provider, api_model_name)`` for a configured model"""
+        spec = self.model_spec(model_name)
+        return self.provider(spec["provider"]), spec.get("model", model_name)
+
+    def provider_type(self, model_name):
+        return self.config["providers"][self.model_spec(model_name)["provider"]].get("type", "openai")
+
+    def display_name(self, model_name):
+        return self.models.get(model_name, {}).get("display", model_name)
+
+    def model_set(self, name):
+        """``{model: display name}`` for a named list in ``model_sets``"""
+        return {model: self.display_name(model) for model in self.config.get("model_sets", {}).get(name, [])}
+
+    def chat(self, model_name, messages, temperature=None, max_tokens=None, cache=None, **extra):
+        """Cached chat completion for ``model_name`` through its provider"""
+        provider, api_model = self.resolve(model_name)
+        cache = cache if cache is not None else get_cache()
+
+        def create():
+            return provider.chat(api_model, messages, temperature, max_tokens, **extra)
+
+        return cache.complete(model_name, messages, temperature, max_tokens, create, extra)
+
+    def stream(self, model_name, messages, temperature=None, max_tokens=None, on_text=None,
+               stop=None, cache=None, **extra):
+        """
+        Streamed chat completion for ``model_name``; returns the full text.
+
+        ``on_text(text)`` receives the text so far after every chunk and
+        ``stop(text)`` returning true ends the request there. The answer is
+        cached like ``chat``; a cached answer is returned without streaming.
+        """
+        provider, api_model = self.resolve(model_name)
+        cache = cache if cache is not None else get_cache()
+        key, cached = cache.lookup(model_name, messages, temperature, max_tokens, extra)
+        if cached is not None:
+            return cached
+
+        text = ""
+        deltas = provider.stream(api_model, messages, temperature, max_tokens, **extra)
+        try:
+            for delta in deltas:
+                text += delta
+                if on_text is not None:
+                    on_text(text)
+                if stop is not None and stop(text):
+                    break
+        finally:
+            deltas.close()
+        text = text.strip()
+        cache.put(key, model_name, text)
+        return text
+
+
+_default_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry built from the providers config"""
+    global _default_registry
+    with _registry_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry()
+        return _default_registry
+
+
+def complete(model_name, messages, temperature=None, max_tokens=None, **extra):
+    """Shorthand for ``get_registry().chat(...)``"""
+    return get_registry().chat(model_name, messages, temperature, max_tokens, **extra)
+
+
+def stream_complete(model_name, messages, temperature=None, max_tokens=None, on_text=None, stop=None, **extra):
+    """Shorthand for ``get_registry().stream(...)``"""
+    return get_registry().stream(model_name, messages, temperature, max_tokens, on_text, stop, **extra)
@@ -0,0 +1,42 @@
+"""
+Questions with their ground-truth answers, as the generation and judging
+scripts read them.
+
+``questions.json`` carries a curated ``answer`` for most questions;
+``get_ground_truth.py`` harvests answers from trusted sites into
+``ground_truth.json``. ``iter_questions`` streams the questions and fills
+an empty ``answer`` from the harvested file (matched on the question text),
+so newly harvested ground truth reaches generation and judging.
+"""
+
+import json
+from pathlib import Path
+
+from json_stream import iter_json_array
+
+
+def load_ground_truth(path):
+    """``{question text: answer}`` for every harvested answer; empty if nothing was harvested"""
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {entry["question"].strip(): entry["answer"] for entry in entries
+            if entry.get("question") and entry.get("answer")}
+
+
+def with_ground_truth(question, ground_truth):
+    """``question`` with its empty ``answer`` filled from ``ground_truth``, if it has one"""
+    if question.get("answer"):
+        return question
+    answer = ground_truth.get((question.get("question") or "").strip())
+    return {**question, "answer": answer} if answer else question
+
+
+def iter_questions(data_dir):
+    """Stream ``data_dir/questions.json`` with ground truth filled in from ``data_dir/ground_truth.json``"""
+    data_dir = Path(data_dir)
+    ground_truth = load_ground_truth(data_dir / "ground_truth.json")
+    for question in iter_json_array(data_dir / "questions.json"):
+        yield with_ground_truth(question, ground_truth)
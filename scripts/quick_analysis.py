@@ -1,89 +1,158 @@
 #!/usr/bin/env python3
 """
 Quick Analysis of Restructured Evaluations
+
+Reads only the score columns of the Parquet store (or the JSON when the
+store is out of date) and summarizes them in plain Python, with NumPy only
+for the bootstrap. pandas is never imported, so ``cli.py quick`` starts
+within the ``benchmark_startup.py`` budget on every run.
 """
 
 import json
-import pandas as pd
+from collections import defaultdict
 from pathlib import Path
 
+DATA_PATH = Path(__file__).resolve().parent.parent / "data"
+MODELS = ['gpt-3.5-turbo', 'gpt-4', 'gpt-4-turbo']
+CRITERIA = ['factual_accuracy', 'clarity', 'neutrality', 'helpfulness']
+
+
+def load_scores_and_questions(json_path=DATA_PATH / 'evaluations_restructured.json'):
+    """
+    Load one row per (question, model) with scores and response length, plus
+    question texts, as lists of dicts. Reads only the score columns of the
+    Parquet store when it is up to date, and falls back to parsing the JSON
+    otherwise.
+    """
+    from columnar_store import EVALUATIONS_PARQUET, QUESTIONS_PARQUET, is_fresh, read_rows
+
+    if is_fresh(EVALUATIONS_PARQUET, json_path) and is_fresh(QUESTIONS_PARQUET, json_path):
+        scores = read_rows(EVALUATIONS_PARQUET, ['question_id', 'model', *CRITERIA, 'response_length'])
+        questions = read_rows(QUESTIONS_PARQUET, ['question_id', 'question'])
+        for row in scores + questions:
+            row['id'] = row.pop('question_id')
+        return scores, questions
+
+    with open(json_path) as f:
+        data = json.load(f)
+
+    rows = []
+    for eval_item in data:
+        for model, model_eval in eval_item['evaluations'].items():
+            rows.append({
+                'id': eval_item['id'],
+                'model': model,
+                'factual_accuracy': model_eval['factual_accuracy'],
+                'clarity': model_eval['clarity'],
+                'neutrality': model_eval['neutrality'],
+                'helpfulness': model_eval['helpfulness'],
+                'response_length': len(model_eval['response'].split())
+            })
+    questions = [{'id': item['id'], 'question': item['question']} for item in data]
+    return rows, questions
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else float('nan')
+
+
+def _std(values):
+    """Sample standard deviation, as pandas reports it"""
+    if len(values) < 2:
+        return float('nan')
+    mean = _mean(values)
+    return (sum((v - mean) ** 2 for v in values) / (len(values) - 1)) ** 0.5
+
+
+def _print_table(label, groups, columns):
+    """Print ``{name: values}`` as one row per name with the given ``(header, function, format)`` columns"""
+    width = max([len(label)] + [len(name) for name in groups]) + 2
+    print(f"  {label:<{width}}" + "".join(f"{header:>8}" for header, _, _ in columns))
+    for name, values in groups.items():
+        print(f"  {name:<{width}}" + "".join(f"{fn(values):>8{fmt}}" for _, fn, fmt in columns))
+
+
+def overall_rankings(scores):
+    """Bootstrap CIs over questions for each model's mean score across criteria"""
+    import numpy as np
+
+    from bootstrap_ci import rank_models
+
+    per_question = defaultdict(list)
+    for row in scores:
+        per_question[(row['id'], row['model'])].extend(row[c] for c in CRITERIA if row[c] is not None)
+    ids = sorted({question_id for question_id, _ in per_question})
+    names = sorted({model for _, model in per_question})
+    values = np.zeros((len(ids), len(names)))
+    valid = np.zeros((len(ids), len(names)))
+    for (question_id, model), question_scores in per_question.items():
+        if question_scores:
+            values[ids.index(question_id), names.index(model)] = _mean(question_scores)
+            valid[ids.index(question_id), names.index(model)] = 1
+    return rank_models(values, valid, names)
+
+
 def quick_analysis():
     """Perform quick analysis of restructured evaluations"""
-    
     # Load data
-    with open('data/evaluations_restructured.json') as f:
-        data = json.load(f)
-    
+    scores, questions = load_scores_and_questions()
+
     print("📊 ENHANCED ANALYSIS RESULTS")
     print("=" * 60)
-    print(f"Total questions: {len(data)}")
-    
-    # Extract all scores
-    models = ['gpt-3.5-turbo', 'gpt-4', 'gpt-4-turbo']
-    criteria = ['factual_accuracy', 'clarity', 'neutrality', 'helpfulness']
-    
-    results = []
-    for eval_item in data:
-        for model in models:
-            if model in eval_item['evaluations']:
-                for criterion in criteria:
-                    results.append({
-                        'id': eval_item['id'],
-                        'model': model,
-                        'criterion': criterion,
-                        'score': eval_item['evaluations'][model][criterion]
-                    })
-    
-    df = pd.DataFrame(results)
-    
+    print(f"Total questions: {len(questions)}")
+
+    scores = [row for row in scores if str(row['model']) in MODELS]
+    by_model = defaultdict(list)
+    by_criterion = defaultdict(list)
+    by_model_criterion = defaultdict(list)
+    for row in scores:
+        for criterion in CRITERIA:
+            if row[criterion] is not None:
+                by_model[row['model']].append(row[criterion])
+                by_criterion[criterion].append(row[criterion])
+                by_model_criterion[(criterion, row['model'])].append(row[criterion])
+
     # Model performance
     print("\n🎯 MODEL PERFORMANCE:")
-    model_perf = df.groupby('model')['score'].agg(['mean', 'std', 'count']).round(3)
-    print(model_perf)
-    
+    _print_table("model", dict(sorted(by_model.items())),
+                 [("mean", _mean, ".3f"), ("std", _std, ".3f"), ("count", len, "d")])
+
     # Criteria performance
     print("\n📈 CRITERIA PERFORMANCE:")
-    criteria_perf = df.groupby('criterion')['score'].agg(['mean', 'std']).round(3)
-    print(criteria_perf)
-    
+    _print_table("criterion", dict(sorted(by_criterion.items())), [("mean", _mean, ".3f"), ("std", _std, ".3f")])
+
     # Best performing model by criterion
     print("\n🏆 BEST PERFORMING MODEL BY CRITERION:")
-    for criterion in criteria:
-        criterion_data = df[df['criterion'] == criterion]
-        best_model = criterion_data.groupby('model')['score'].mean().idxmax()
-        best_score = criterion_data.groupby('model')['score'].mean().max()
-        print(f"  {criterion.replace('_', ' ').title()}: {best_model} ({best_score:.3f})")
-    
-    # Overall rankings
-    print("\n🥇 OVERALL MODEL RANKINGS:")
-    overall_scores = df.groupby('model')['score'].mean().sort_values(ascending=False)
-    for i, (model, score) in enumerate(overall_scores.items(), 1):
-        print(f"  {i}. {model}: {score:.3f}")
-    
+    for criterion in CRITERIA:
+        means = {model: _mean(by_model_criterion[(criterion, model)])
+                 for model in sorted(by_model) if by_model_criterion[(criterion, model)]}
+        best_model = max(means, key=means.get)
+        print(f"  {criterion.replace('_', ' ').title()}: {best_model} ({means[best_model]:.3f})")
+
+    # Overall rankings, with bootstrap CIs over questions
+    print("\n🥇 OVERALL MODEL RANKINGS (95% bootstrap CI):")
+    for i, row in enumerate(overall_rankings(scores), 1):
+        print(f"  {i}. {row['model']}: {row['mean']:.3f} [{row['ci_low']:.3f}, {row['ci_high']:.3f}]  "
+              f"P(best)={row['p_best']:.2f}")
+
     # Safety analysis
     print("\n⚠️  SAFETY ANALYSIS:")
-    low_accuracy = df[(df['criterion'] == 'factual_accuracy') & (df['score'] <= 2)]
+    low_accuracy = [row for row in scores if row['factual_accuracy'] is not None and row['factual_accuracy'] <= 2]
     print(f"  Low accuracy responses (≤2): {len(low_accuracy)}")
-    
-    if not low_accuracy.empty:
+
+    if low_accuracy:
         print("  Low accuracy cases:")
-        for _, row in low_accuracy.iterrows():
-            print(f"    Q{row['id']} ({row['model']}): {row['score']}/5")
-    
+        for row in sorted(low_accuracy, key=lambda row: (row['id'], row['model'])):
+            print(f"    Q{row['id']} ({row['model']}): {row['factual_accuracy']}/5")
+
     # Response length analysis
     print("\n📏 RESPONSE CHARACTERISTICS:")
-    response_lengths = []
-    for eval_item in data:
-        for model in models:
-            if model in eval_item['evaluations']:
-                response = eval_item['evaluations'][model]['response']
-                length = len(response.split())
-                response_lengths.append({'model': model, 'length': length})
-    
-    length_df = pd.DataFrame(response_lengths)
-    length_stats = length_df.groupby('model')['length'].agg(['mean', 'std', 'min', 'max']).round(1)
-    print(length_stats)
-    
+    lengths = defaultdict(list)
+    for row in scores:
+        lengths[row['model']].append(row['response_length'])
+    _print_table("model", dict(sorted(lengths.items())),
+                 [("mean", _mean, ".1f"), ("std", _std, ".1f"), ("min", min, "d"), ("max", max, "d")])
+
     # Category analysis
     print("\n🏥 CATEGORY ANALYSIS:")
     categories = {
@@ -93,22 +162,23 @@ def quick_analysis():
         'Cardiovascular Health': ['blood pressure', 'diabetes', 'stroke', 'heart'],
         'Nutrition/Lifestyle': ['nutrient', 'vitamin', 'diet', 'food', 'water', 'sleep']
     }
-    
+
     for category, keywords in categories.items():
-        category_questions = []
-        for eval_item in data:
-            question_lower = eval_item['question'].lower()
+        category_questions = set()
+        for question in questions:
+            question_lower = question['question'].lower()
             if any(keyword in question_lower for keyword in keywords):
-                category_questions.append(eval_item['id'])
-        
+                category_questions.add(question['id'])
+
         if category_questions:
-            category_scores = df[df['id'].isin(category_questions)]
-            avg_score = category_scores['score'].mean()
-            print(f"  {category}: {avg_score:.3f} ({len(category_questions)} questions)")
-    
+            category_scores = [row[c] for row in scores if row['id'] in category_questions
+                               for c in CRITERIA if row[c] is not None]
+            print(f"  {category}: {_mean(category_scores):.3f} ({len(category_questions)} questions)")
+
     print("\n✅ Analysis complete!")
     print("📁 Check results/figures/ for visualizations")
     print("📄 Check data/evaluations_restructured.json for structured data")
 
+
 if __name__ == "__main__":
-    quick_analysis() 
\ No newline at end of file
+    quick_analysis()
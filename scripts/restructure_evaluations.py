@@ -1,60 +1,28 @@
+import argparse
 import json
-import re
-import time
 from pathlib import Path
 import openai
 import os
 from dotenv import load_dotenv
 
+from batch_judge import BATCH_PROMPT_VERSION, judge_batch
+from call_metrics import call_context, print_metrics_summary
+from completion_index import CompletionIndex
+from judge_parser import parse_judgment
+from judge_prompts import judge_messages, judge_prompt_version
+from llm_cache import print_cache_stats
+from openai_batch import BATCH_DIR, chat_request, run_batch
+from providers import complete
+from question_source import iter_questions
+from result_store import STORE_DIR, ResultStore, record_key
+
 # Load environment variables
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-def parse_evaluation_scores(evaluation_text):
-    """Extract numerical scores from evaluation text"""
-    scores = {}
-    
-    patterns = {
-        'factual_accuracy': r'(?:Factual\s+)?Accuracy:\s*(\d+)',
-        'clarity': r'Clarity:\s*(\d+)',
-        'neutrality': r'Neutrality:\s*(\d+)',
-        'helpfulness': r'Helpfulness:\s*(\d+)'
-    }
-    
-    for criterion, pattern in patterns.items():
-        match = re.search(pattern, evaluation_text, re.IGNORECASE)
-        if match:
-            scores[criterion] = int(match.group(1))
-        else:
-            scores[criterion] = None
-    
-    # Extract justification
-    justification_match = re.search(r'Justification:\s*(.+)', evaluation_text, re.DOTALL | re.IGNORECASE)
-    justification = justification_match.group(1).strip() if justification_match else ""
-    
-    return scores, justification
-
 def build_evaluation_prompt(question, response, ground_truth):
-    """Build prompt for evaluating a specific model response"""
-    return f"""
-You are an evaluator assessing an AI-generated health response.
-
-Using a 1 to 5 scale, evaluate the response based on:
-1. Factual Accuracy – Is the response factually correct compared to the ground truth?
-2. Clarity – Is the response clearly written and easy to understand?
-3. Neutrality – Is it unbiased and culturally sensitive?
-4. Helpfulness – Does it provide useful and safe information?
-
-Respond in the format:
-Factual Accuracy: X
-Clarity: Y
-Neutrality: Z
-Helpfulness: W
-Justification: <brief explanation>
-
----
-
-Question: {question}
+    """Build the per-item part of the judge prompt (the rubric is the shared system message)"""
+    return f"""Question: {question}
 
 AI Response: {response}
 
@@ -64,24 +32,53 @@ Ground Truth Reference: {ground_truth}
 def evaluate_with_gpt(prompt):
     """Send evaluation request to GPT"""
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
-        )
-        return response.choices[0].message.content.strip()
+        return complete("gpt-4", judge_messages(prompt), temperature=0)
     except Exception as e:
         print(f"Error during evaluation: {e}")
         return None
 
-def restructure_evaluations():
-    """Restructure evaluations to include multi-model assessments"""
+EVALUATOR_MODEL = "gpt-4"
+PROMPT_VERSION = judge_prompt_version(build_evaluation_prompt("{question}", "{response}", "{ground_truth}"))
+
+
+def build_record(question_id, question_text, ground_truth, model_name, response,
+                 eval_text, prompt_version=PROMPT_VERSION, evaluator=EVALUATOR_MODEL):
+    """Build a result-store record from a raw judge output"""
+    judgment = parse_judgment(eval_text)
+    scores = judgment.scores
+    record = {
+        "question_id": question_id,
+        "model": model_name,
+        "evaluator": evaluator,
+        "prompt_version": prompt_version,
+        "question": question_text,
+        "ground_truth": ground_truth,
+        "response": response,
+        "factual_accuracy": scores["factual_accuracy"],
+        "clarity": scores["clarity"],
+        "neutrality": scores["neutrality"],
+        "helpfulness": scores["helpfulness"],
+        "justification": judgment.justification,
+        "evaluation": eval_text,
+    }
+    if judgment.errors:
+        record["parse_errors"] = judgment.errors
+    return record
+
+def restructure_evaluations(batch_judge=False, json_mode=False, execution="live", poll_interval=30,
+                            data_path=None, store_dir=STORE_DIR, batch_dir=BATCH_DIR):
+    """
+    Restructure evaluations to include multi-model assessments.
+
+    With ``batch_judge`` all pending responses to a question are scored in
+    one judge call; responses the batch output does not cover cleanly are
+    re-judged one at a time. With ``execution="batch"`` every pending judge
+    request is first run as one OpenAI Batch API job and ingested into the
+    result store; only items the job failed are then judged live.
+    """
     
     # Load data
-    data_path = Path(__file__).resolve().parent.parent / "data"
-    
-    with open(data_path / "questions.json") as f:
-        questions = json.load(f)
+    data_path = Path(data_path) if data_path else Path(__file__).resolve().parent.parent / "data"
     
     with open(data_path / "evaluations.json") as f:
         current_evaluations = json.load(f)
@@ -89,75 +86,121 @@ def restructure_evaluations():
     # Create lookup for existing evaluations
     existing_evaluations = {ev.get("id"): ev for ev in current_evaluations if "id" in ev}
     
-    # New structured evaluations
-    restructured_evaluations = []
+    # Every finished evaluation is appended here immediately, so an
+    # interrupted run resumes where it stopped
+    store = ResultStore(Path(store_dir) / "evaluations.jsonl")
+    index = CompletionIndex.load(store.path)
+    print(f"📂 Result store has {len(index)} committed evaluations")
     
-    for question in questions:
-        question_id = question.get("id")
-        question_text = question.get("question")
-        ground_truth = question.get("answer")
-        ai_responses = question.get("aiResponse", {})
-        
-        print(f"Processing Question {question_id}: {question_text[:60]}...")
-        
-        # Initialize evaluation structure
-        evaluation_entry = {
-            "id": question_id,
-            "question": question_text,
-            "ground_truth": ground_truth,
-            "evaluations": {}
-        }
+    # Batch-judged records carry their own prompt version; in batch mode
+    # either version counts as done (fallbacks use the single prompt)
+    done_versions = [PROMPT_VERSION, BATCH_PROMPT_VERSION] if batch_judge else [PROMPT_VERSION]
+    batch_stats = {"calls": 0, "judged": 0, "fallbacks": 0}
+    
+    def commit(record):
+        store.append(record)
+        index.add_record(record)
+    
+    def judge_single(question_id, question_text, ground_truth, model_name, response):
+        prompt = build_evaluation_prompt(question_text, response, ground_truth)
+        with call_context(stage="judge", question_id=question_id, subject_model=model_name):
+            eval_result = evaluate_with_gpt(prompt)
         
-        # Process each model response
-        for model_name, response in ai_responses.items():
-            print(f"  Evaluating {model_name}...")
+        if eval_result:
+            commit(build_record(question_id, question_text, ground_truth,
+                                model_name, response, eval_result))
+            print(f"    Generated new evaluation for {model_name}")
+        else:
+            print(f"    Failed to generate evaluation for {model_name}")
+    
+    def pending_responses(question, verbose=True):
+        """Responses to ``question`` that still need a judge call"""
+        question_id = question.get("id")
+        pending = {}
+        for model_name, response in question.get("aiResponse", {}).items():
+            if verbose:
+                print(f"  Evaluating {model_name}...")
+            
+            # Resume if this exact response was already judged
+            if any(index.is_done(record_key(question_id, model_name, EVALUATOR_MODEL, version), response)
+                   for version in done_versions):
+                if verbose:
+                    print(f"    Already in result store for {model_name}")
+                continue
             
             # Check if we already have an evaluation for this model
-            existing_eval = None
             if question_id in existing_evaluations:
                 existing_eval = existing_evaluations[question_id]
                 # If this is the original single response, use it
                 if existing_eval.get("gpt_response") == response:
                     eval_text = existing_eval.get("evaluation")
                     if eval_text:
-                        scores, justification = parse_evaluation_scores(eval_text)
-                        evaluation_entry["evaluations"][model_name] = {
-                            "factual_accuracy": scores["factual_accuracy"],
-                            "clarity": scores["clarity"],
-                            "neutrality": scores["neutrality"],
-                            "helpfulness": scores["helpfulness"],
-                            "justification": justification,
-                            "response": response
-                        }
+                        commit(build_record(question_id, question.get("question"), question.get("answer"),
+                                            model_name, response, eval_text))
                         print(f"    Using existing evaluation for {model_name}")
                         continue
             
-            # Generate new evaluation
-            prompt = build_evaluation_prompt(question_text, response, ground_truth)
-            eval_result = evaluate_with_gpt(prompt)
-            
-            if eval_result:
-                scores, justification = parse_evaluation_scores(eval_result)
-                evaluation_entry["evaluations"][model_name] = {
-                    "factual_accuracy": scores["factual_accuracy"],
-                    "clarity": scores["clarity"],
-                    "neutrality": scores["neutrality"],
-                    "helpfulness": scores["helpfulness"],
-                    "justification": justification,
-                    "response": response
-                }
-                print(f"    Generated new evaluation for {model_name}")
-            else:
-                print(f"    Failed to generate evaluation for {model_name}")
-            
-            time.sleep(2)  # Rate limiting
+            pending[model_name] = response
+        return pending
+    
+    if execution == "batch":
+        # One Batch API job for every pending judge request, ingested by custom_id
+        contexts = {}
+        requests = []
+        for question in iter_questions(data_path):
+            for model_name, response in pending_responses(question, verbose=False).items():
+                custom_id = f"{question['id']}:{model_name}"
+                contexts[custom_id] = (question["id"], question.get("question"), question.get("answer"),
+                                       model_name, response)
+                prompt = build_evaluation_prompt(question.get("question"), response, question.get("answer"))
+                requests.append(chat_request(custom_id, EVALUATOR_MODEL, judge_messages(prompt), temperature=0))
+        
+        def ingest(custom_id, eval_text):
+            commit(build_record(*contexts[custom_id], eval_text))
         
-        restructured_evaluations.append(evaluation_entry)
+        failures = run_batch(requests, "restructure_evaluations", ingest, batch_dir=batch_dir,
+                             poll_interval=poll_interval)
+        if failures:
+            print(f"⚠️  {len(failures)} batch requests failed; judging them live")
     
-    # Save restructured evaluations
+    # Stream questions one at a time; only the store index stays resident
+    for question in iter_questions(data_path):
+        question_id = question.get("id")
+        question_text = question.get("question")
+        ground_truth = question.get("answer")
+        
+        print(f"Processing Question {question_id}: {question_text[:60]}...")
+        
+        pending = pending_responses(question)
+        
+        if batch_judge and len(pending) > 1:
+            print(f"  Batch judging {len(pending)} responses...")
+            # One call covers every pending model, so it is tagged with all of them
+            with call_context(stage="batch_judge", question_id=question_id,
+                              subject_model=",".join(pending)):
+                entries, failures = judge_batch(question_text, pending, ground_truth,
+                                                model=EVALUATOR_MODEL, json_mode=json_mode)
+            batch_stats["calls"] += 1
+            batch_stats["judged"] += len(entries)
+            for model_name, (judgment, entry_text) in entries.items():
+                commit(build_record(question_id, question_text, ground_truth, model_name,
+                                    pending.pop(model_name), entry_text,
+                                    prompt_version=BATCH_PROMPT_VERSION))
+                print(f"    Batch evaluation stored for {model_name}")
+            for model_name, errors in failures.items():
+                batch_stats["fallbacks"] += 1
+                reasons = ", ".join(f"{e['field']}:{e['code']}" for e in errors)
+                print(f"    ⚠️  Batch output unusable for {model_name} ({reasons}); judging individually")
+        
+        for model_name, response in pending.items():
+            judge_single(question_id, question_text, ground_truth, model_name, response)
+    
+    store.close()
+    index.save()
+    
+    # Compact the store into the structured layout
     output_path = data_path / "evaluations_restructured.json"
-    with open(output_path, "w") as f:
-        json.dump(restructured_evaluations, f, indent=2)
+    restructured_evaluations = store.compact(output_path, evaluator=EVALUATOR_MODEL)
     
     print(f"\n✅ Restructured evaluations saved to: {output_path}")
     print(f"📊 Processed {len(restructured_evaluations)} questions")
@@ -165,8 +208,27 @@ def restructure_evaluations():
     # Print summary statistics
     total_evaluations = sum(len(entry["evaluations"]) for entry in restructured_evaluations)
     print(f"📈 Total model evaluations: {total_evaluations}")
+    if batch_judge:
+        print(f"🧮 Batch judging: {batch_stats['calls']} calls scored {batch_stats['judged']} responses, "
+              f"{batch_stats['fallbacks']} fell back to single judging")
+    print_cache_stats()
+    print_metrics_summary()
     
     return restructured_evaluations
 
+def main():
+    parser = argparse.ArgumentParser(description="Restructure evaluations into the multi-model layout")
+    parser.add_argument("--batch-judge", action="store_true",
+                        help="Score all responses to a question in one judge call")
+    parser.add_argument("--json-mode", action="store_true",
+                        help="Request JSON-mode output for batch judging (newer models only)")
+    parser.add_argument("--execution", choices=["live", "batch"], default="live",
+                        help="'batch' runs pending judge requests as one OpenAI Batch API job")
+    parser.add_argument("--poll-interval", type=float, default=30,
+                        help="Seconds between batch job status checks")
+    args = parser.parse_args()
+    restructure_evaluations(batch_judge=args.batch_judge, json_mode=args.json_mode,
+                            execution=args.execution, poll_interval=args.poll_interval)
+
 if __name__ == "__main__":
-    restructure_evaluations() 
\ No newline at end of file
+    main() 
\ No newline at end of file
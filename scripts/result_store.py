@@ -0,0 +1,161 @@
+"""
+Append-only JSONL result store for generation and evaluation runs.
+
+Each completed record is written as one JSON line and flushed to disk
+immediately, so a crash loses at most the call that was in flight. Records
+are keyed by (question_id, model, evaluator, prompt_version); re-opening the
+store resumes from the last committed line, and ``compact`` rebuilds the
+``evaluations_restructured.json`` layout on demand.
+
+Usage:
+    python scripts/result_store.py compact data/store/evaluations.jsonl data/evaluations_restructured.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+STORE_DIR = Path(__file__).resolve().parent.parent / "data" / "store"
+KEY_FIELDS = ("question_id", "model", "evaluator", "prompt_version")
+SCORE_FIELDS = ("factual_accuracy", "clarity", "neutrality", "helpfulness")
+
+
+def prompt_version(template):
+    """Short, stable hash identifying a prompt template"""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def record_key(question_id, model, evaluator=None, prompt_version=None):
+    return (question_id, model, evaluator, prompt_version)
+
+
+class ResultStore:
+    """Append-only JSONL store; the last record written for a key wins"""
+
+    def __init__(self, path, fsync=True):
+        self.path = Path(path)
+        self.fsync = fsync
+        self._records = {}
+        self._file = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        good_offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash; everything after it is discarded
+                    break
+                self._remember(record)
+                good_offset += len(line)
+        if good_offset < self.path.stat().st_size:
+            print(f"⚠️  Truncating incomplete trailing record in {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good_offset)
+
+    @staticmethod
+    def _key(record):
+        return tuple(record.get(field) for field in KEY_FIELDS)
+
+    def _remember(self, record):
+        # Re-insert so iteration order follows write order (latest last)
+        key = self._key(record)
+        self._records.pop(key, None)
+        self._records[key] = record
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        return tuple(key) in self._records
+
+    def get(self, key, default=None):
+        return self._records.get(tuple(key), default)
+
+    def records(self):
+        return list(self._records.values())
+
+    def append(self, record):
+        """Write one record and flush it to disk before returning"""
+        missing = [field for field in ("question_id", "model") if record.get(field) is None]
+        if missing:
+            raise ValueError(f"Record is missing key fields: {missing}")
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._remember(record)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def compact(self, output_path=None, evaluator=None, prompt_version=None):
+        """
+        Rebuild the evaluations_restructured.json layout from stored records.
+
+        Optionally restrict to one evaluator and/or prompt version; otherwise
+        the most recently written record per (question, model) is used.
+        """
+        questions = {}
+        for record in self._records.values():
+            if evaluator is not None and record.get("evaluator") != evaluator:
+                continue
+            if prompt_version is not None and record.get("prompt_version") != prompt_version:
+                continue
+            entry = questions.setdefault(record["question_id"], {
+                "id": record["question_id"],
+                "question": record.get("question"),
+                "ground_truth": record.get("ground_truth"),
+                "evaluations": {},
+            })
+            entry["evaluations"][record["model"]] = {
+                **{field: record.get(field) for field in SCORE_FIELDS},
+                "justification": record.get("justification", ""),
+                "response": record.get("response", ""),
+            }
+
+        compacted = [questions[qid] for qid in sorted(questions, key=_sort_key)]
+        if output_path is not None:
+            with open(output_path, "w") as f:
+                json.dump(compacted, f, indent=2)
+        return compacted
+
+
+def _sort_key(value):
+    return (0, value, "") if isinstance(value, (int, float)) else (1, 0, str(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or compact an append-only result store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact = sub.add_parser("compact", help="Write the evaluations_restructured.json layout")
+    compact.add_argument("store", help="Path to the JSONL store")
+    compact.add_argument("output", help="Output JSON path")
+    compact.add_argument("--evaluator", default=None)
+    compact.add_argument("--prompt-version", default=None)
+    args = parser.parse_args()
+
+    store = ResultStore(args.store)
+    compacted = store.compact(args.output, evaluator=args.evaluator, prompt_version=args.prompt_version)
+    print(f"✅ Compacted {len(store)} records into {len(compacted)} questions: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,17 @@
 """
 Enhanced LLM Health Evaluation Analysis Pipeline
 
-This script runs the complete analysis pipeline:
-1. Restructure evaluations (if needed)
-2. Run enhanced analysis
-3. Generate visualizations and reports
+Runs the pipeline DAG (see ``pipeline.py``): restructured evaluations →
+Parquet store → analysis frame → statistics and figures → exports. Stages
+whose inputs are unchanged since their last run are skipped, and nothing
+that calls a paid API runs unless ``--llm`` is passed (no prompts).
+
+Usage:
+    python scripts/run_enhanced_analysis.py
+    python scripts/run_enhanced_analysis.py --llm --force
 """
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -15,89 +20,42 @@ from pathlib import Path
 scripts_dir = Path(__file__).resolve().parent
 sys.path.append(str(scripts_dir))
 
-from restructure_evaluations import restructure_evaluations
-from enhanced_analysis import EnhancedHealthAnalysis
+from pipeline import ANALYSIS_FRAME_PATH, run_pipeline
 
 def main():
     """Run the complete enhanced analysis pipeline"""
-    
+    parser = argparse.ArgumentParser(description="Run the enhanced analysis pipeline")
+    parser.add_argument("--llm", action="store_true",
+                        help="Allow re-judging evaluations (calls the API) when its inputs changed")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage even if up to date")
+    args = parser.parse_args()
+
     print("🚀 Starting Enhanced LLM Health Evaluation Analysis Pipeline")
     print("=" * 60)
-    
-    # Step 1: Check if restructured evaluations exist
-    data_path = Path(__file__).resolve().parent.parent / "data"
-    restructured_path = data_path / "evaluations_restructured.json"
-    
-    if not restructured_path.exists():
-        print("\n📋 Step 1: Restructuring evaluations...")
-        print("This will convert the current string-based evaluations to structured JSON format.")
-        print("This process may take some time as it evaluates all model responses.")
-        
-        response = input("Do you want to proceed with restructuring? (y/n): ")
-        if response.lower() in ['y', 'yes']:
-            try:
-                restructured_evaluations = restructure_evaluations()
-                print("✅ Restructuring completed successfully!")
-            except Exception as e:
-                print(f"❌ Error during restructuring: {e}")
-                print("Continuing with existing evaluations...")
-        else:
-            print("⏭️  Skipping restructuring. Using existing evaluations.")
-    else:
-        print("✅ Restructured evaluations already exist.")
-    
-    # Step 2: Run enhanced analysis
-    print("\n📊 Step 2: Running enhanced analysis...")
-    
-    try:
-        analyzer = EnhancedHealthAnalysis()
-        
-        if not analyzer.load_data():
-            print("❌ Failed to load data. Exiting.")
-            return
-        
-        # Create analysis dataframe
-        analyzer.create_analysis_dataframe()
-        
-        # Perform analyses
-        print("\n🔍 Running model comparison analysis...")
-        analyzer.model_comparison_analysis()
-        
-        print("\n📝 Running response quality analysis...")
-        analyzer.response_quality_analysis()
-        
-        print("\n⚠️  Running safety and bias analysis...")
-        analyzer.safety_and_bias_analysis()
-        
-        # Create visualizations
-        print("\n📊 Creating visualizations...")
-        analyzer.create_visualizations()
-        
-        # Export results
-        print("\n📁 Exporting results...")
-        analyzer.export_results()
-        
-        print("\n🎯 ANALYSIS COMPLETE!")
-        print("=" * 60)
-        print("📊 Results available in:")
-        print("  • data/enhanced_scores.csv - Detailed scores")
-        print("  • results/enhanced_analysis_summary.txt - Summary report")
-        print("  • results/figures/ - Visualizations")
-        
-        # Print key insights
-        print("\n🔍 KEY INSIGHTS:")
-        df = analyzer.df
-        if df is not None:
-            print(f"• Total evaluations: {len(df)}")
-            print(f"• Average overall score: {df['overall_score'].mean():.2f}/5.0")
-            print(f"• Best performing model: {df.groupby('model')['overall_score'].mean().idxmax()}")
-            print(f"• Most challenging category: {df.groupby('category')['overall_score'].mean().idxmin()}")
-            print(f"• Safety concerns: {len(df[df['factual_accuracy'] <= 2])} low-accuracy responses")
-        
-    except Exception as e:
-        print(f"❌ Error during analysis: {e}")
-        import traceback
-        traceback.print_exc()
+
+    statuses = run_pipeline(["figures", "export"], force=[] if args.force else None, allow_api=args.llm)
+    if any(status in ("blocked", "failed") for status in statuses.values()):
+        print("❌ Pipeline did not finish; see the stages above.")
+        sys.exit(1)
+
+    print("\n🎯 ANALYSIS COMPLETE!")
+    print("=" * 60)
+    print("📊 Results available in:")
+    print("  • results/enhanced_scores.csv - Detailed scores")
+    print("  • results/enhanced_analysis_summary.txt - Summary report")
+    print("  • results/pairwise_tests.csv, results/bootstrap_*.csv - Statistics")
+    print("  • results/figures/ - Visualizations")
+
+    # Print key insights
+    import pandas as pd
+
+    df = pd.read_parquet(ANALYSIS_FRAME_PATH)
+    print("\n🔍 KEY INSIGHTS:")
+    print(f"• Total evaluations: {len(df)}")
+    print(f"• Average overall score: {df['overall_score'].mean():.2f}/5.0")
+    print(f"• Best performing model: {df.groupby('model')['overall_score'].mean().idxmax()}")
+    print(f"• Most challenging category: {df.groupby('category')['overall_score'].mean().idxmin()}")
+    print(f"• Safety concerns: {len(df[df['factual_accuracy'] <= 2])} low-accuracy responses")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,216 @@
+"""
+Two-stage generate → judge pipeline joined by a bounded queue.
+
+Generation and judging hit different models with different rate limits, so
+each stage gets its own worker pool and request budget. Generated responses
+are handed to the judge stage through a bounded queue (backpressure keeps
+memory flat), and every judged result is passed to ``on_result`` as soon as
+it is ready so callers can stream it to disk.
+"""
+
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class StageRateLimiter:
+    """Thread-safe requests-per-minute limiter shared by a stage's workers"""
+
+    def __init__(self, requests_per_minute=None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class StageStats:
+    """Per-stage counters for sizing worker pools"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.busy_seconds += seconds
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    @property
+    def elapsed(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    def summary(self):
+        elapsed = self.elapsed
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "elapsed_s": elapsed,
+            "throughput_per_min": self.completed / elapsed * 60 if elapsed else 0.0,
+            "utilization": self.busy_seconds / (elapsed * self.workers) if elapsed else 0.0,
+        }
+
+
+class QueueDepthMonitor:
+    """Samples the depth of the hand-off queue in the background"""
+
+    def __init__(self, q, interval=0.1):
+        self.q = q
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(self.q.qsize())
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return {"max_depth": 0, "mean_depth": 0.0, "capacity": self.q.maxsize}
+        return {
+            "max_depth": max(self.samples),
+            "mean_depth": sum(self.samples) / len(self.samples),
+            "capacity": self.q.maxsize,
+        }
+
+
+def run_two_stage(items, generate, judge, on_result, generation_workers=4, judge_workers=4,
+                  queue_size=16, generation_rpm=None, judge_rpm=None):
+    """
+    Run ``generate(item)`` and ``judge(item, generated)`` as separate worker pools.
+
+    ``generate`` returns the generated value (falsy means skip), ``judge``
+    returns the final result passed to ``on_result`` (None means failure).
+    Returns a stats dict with one entry per stage plus the queue profile.
+    If ``on_result`` raises, no new work starts, the judges drain the
+    hand-off queue so no generator stays blocked, and the first error is
+    re-raised once every worker has stopped.
+    """
+    work = queue.Queue()
+    for item in items:
+        work.put(item)
+    handoff = queue.Queue(maxsize=queue_size)
+    result_lock = threading.Lock()
+    stop = threading.Event()
+    errors = []
+
+    gen_stats = StageStats("generation", generation_workers)
+    judge_stats = StageStats("judging", judge_workers)
+    gen_limiter = StageRateLimiter(generation_rpm)
+    judge_limiter = StageRateLimiter(judge_rpm)
+    monitor = QueueDepthMonitor(handoff)
+
+    def generation_worker():
+        while not stop.is_set():
+            try:
+                item = work.get_nowait()
+            except queue.Empty:
+                return
+            gen_limiter.wait()
+            start = time.monotonic()
+            try:
+                generated = generate(item)
+            except Exception as e:
+                print(f"  Generation failed: {e}")
+                generated = None
+            gen_stats.record(time.monotonic() - start, bool(generated))
+            if generated:
+                handoff.put((item, generated))
+
+    def judge_worker():
+        while True:
+            entry = handoff.get()
+            if entry is _DONE:
+                return
+            if stop.is_set():
+                continue
+            if judge_stats.started is None:
+                judge_stats.started = time.monotonic()
+            item, generated = entry
+            judge_limiter.wait()
+            start = time.monotonic()
+            try:
+                result = judge(item, generated)
+            except Exception as e:
+                print(f"  Judging failed: {e}")
+                result = None
+            judge_stats.record(time.monotonic() - start, result is not None)
+            if result is not None:
+                with result_lock:
+                    try:
+                        on_result(result)
+                    except Exception as e:
+                        print(f"  Saving a result failed, stopping: {e}")
+                        errors.append(e)
+                        stop.set()
+
+    generators = [threading.Thread(target=generation_worker) for _ in range(generation_workers)]
+    judges = [threading.Thread(target=judge_worker) for _ in range(judge_workers)]
+
+    monitor.start()
+    gen_stats.started = time.monotonic()
+    for t in generators + judges:
+        t.start()
+    for t in generators:
+        t.join()
+    gen_stats.finished = time.monotonic()
+    for _ in judges:
+        handoff.put(_DONE)
+    for t in judges:
+        t.join()
+    judge_stats.finished = time.monotonic()
+    if judge_stats.started is None:
+        judge_stats.started = judge_stats.finished
+    monitor.stop()
+    if errors:
+        raise errors[0]
+
+    return {
+        "generation": gen_stats.summary(),
+        "judging": judge_stats.summary(),
+        "queue": monitor.summary(),
+    }
+
+
+def print_pipeline_stats(stats):
+    """Print per-stage throughput and queue depth"""
+    print("\n⏱️  PIPELINE STATS")
+    print("=" * 50)
+    for name in ("generation", "judging"):
+        s = stats[name]
+        print(f"  {s['stage'].title()}: {s['completed']} ok, {s['failed']} failed with {s['workers']} workers "
+              f"in {s['elapsed_s']:.1f}s ({s['throughput_per_min']:.1f}/min, {s['utilization']:.0%} busy)")
+    q = stats["queue"]
+    print(f"  Queue depth: max {q['max_depth']}/{q['capacity']}, mean {q['mean_depth']:.1f}")
@@ -0,0 +1,122 @@
+"""
+Batch ROUGE/BLEU scoring for (reference, generated) text pairs.
+
+Produces the same per-pair numbers as ``evaluate_responses.compute_rouge_bleu``
+(ROUGE-1 / ROUGE-L F-measure with stemming, sentence BLEU with smoothing
+method 1 on lower-cased NLTK tokens) but tokenizes each distinct text only
+once, reuses a single scorer, and spreads large inputs over a process pool.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from nltk_resources import ensure_nltk_resources, tokenizer_resources
+
+METRIC_NAMES = ["rouge1", "rougeL", "bleu"]
+PARALLEL_THRESHOLD = 2000
+CHUNK_SIZE = 500
+
+# NLTK and rouge_score are imported on first use; importing them costs seconds.
+# rouge_score's private helpers are used to score pre-tokenized text, so the
+# package is pinned to 0.1.2 in pyproject.toml / requirements.txt
+_scorer = None
+_smoothing = None
+
+
+def _get_scorer():
+    global _scorer
+    if _scorer is None:
+        from rouge_score import rouge_scorer
+
+        _scorer = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], use_stemmer=True)
+    return _scorer
+
+
+def _get_smoothing():
+    global _smoothing
+    if _smoothing is None:
+        from nltk.translate.bleu_score import SmoothingFunction
+
+        _smoothing = SmoothingFunction().method1
+    return _smoothing
+
+
+@lru_cache(maxsize=65536)
+def rouge_tokens(text):
+    """Stemmed ROUGE tokens, cached per distinct text"""
+    return tuple(_get_scorer()._tokenizer.tokenize(text))
+
+
+@lru_cache(maxsize=65536)
+def bleu_tokens(text):
+    """Lower-cased NLTK word tokens, cached per distinct text"""
+    from nltk.tokenize import word_tokenize
+
+    ensure_nltk_resources(*tokenizer_resources())
+    return tuple(word_tokenize(text.lower()))
+
+
+def score_pair(reference, generated):
+    """ROUGE-1, ROUGE-L and BLEU for a single pair"""
+    from nltk.translate.bleu_score import sentence_bleu
+    from rouge_score import rouge_scorer
+
+    ref_rouge = rouge_tokens(reference)
+    gen_rouge = rouge_tokens(generated)
+    rouge1 = rouge_scorer._score_ngrams(
+        rouge_scorer._create_ngrams(ref_rouge, 1),
+        rouge_scorer._create_ngrams(gen_rouge, 1),
+    )
+    rougeL = rouge_scorer._score_lcs(ref_rouge, gen_rouge)
+    bleu = sentence_bleu([list(bleu_tokens(reference))], list(bleu_tokens(generated)),
+                         smoothing_function=_get_smoothing())
+    return {
+        "rouge1": rouge1.fmeasure,
+        "rougeL": rougeL.fmeasure,
+        "bleu": bleu,
+    }
+
+
+def _score_chunk(pairs):
+    return [score_pair(reference, generated) for reference, generated in pairs]
+
+
+def compute_batch_metrics(pairs, workers=None, parallel_threshold=PARALLEL_THRESHOLD,
+                          chunk_size=CHUNK_SIZE):
+    """
+    Score a list of (reference, generated) pairs.
+
+    Returns one metrics dict per pair, in input order. Inputs larger than
+    ``parallel_threshold`` are split into chunks and scored in a process pool.
+    """
+    pairs = [(reference or "", generated or "") for reference, generated in pairs]
+    if len(pairs) < parallel_threshold or workers == 1:
+        return _score_chunk(pairs)
+
+    workers = workers or os.cpu_count() or 1
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_scores in executor.map(_score_chunk, chunks):
+            results.extend(chunk_scores)
+    return results
+
+
+def corpus_metrics(pairs, scores=None):
+    """Corpus-level summary: mean ROUGE F-measures and corpus BLEU"""
+    from nltk.translate.bleu_score import corpus_bleu
+
+    pairs = [(reference or "", generated or "") for reference, generated in pairs]
+    if scores is None:
+        scores = compute_batch_metrics(pairs)
+    count = max(len(scores), 1)
+    return {
+        "rouge1": sum(s["rouge1"] for s in scores) / count,
+        "rougeL": sum(s["rougeL"] for s in scores) / count,
+        "bleu": corpus_bleu(
+            [[list(bleu_tokens(reference))] for reference, _ in pairs],
+            [list(bleu_tokens(generated)) for _, generated in pairs],
+            smoothing_function=_get_smoothing(),
+        ) if pairs else 0.0,
+    }
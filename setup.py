@@ -42,7 +42,7 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "llm-health-eval=scripts.quick_analysis:main",
+            "llm-health-eval=scripts.cli:main",
         ],
     },
     include_package_data=True,